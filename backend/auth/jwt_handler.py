@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta
 # Import the timezone module to handle timezones correctly
 from datetime import timezone
+# Import hashlib to key the verified-token cache
+import hashlib
+import time
 # Import types for type hinting
 from typing import Optional, Dict
 
@@ -8,6 +11,12 @@ from typing import Optional, Dict
 from jose import jwt, JWTError
 # Import config settings to access secret keys
 from config import settings
+# Import the shared TTL cache
+from utils.cache import TTLCache
+
+# Decoded payloads of tokens that already passed signature verification, keyed by sha256(token).
+# Each entry lives until the token's own 'exp', so expiry is enforced exactly as jwt.decode would.
+_verified_tokens = TTLCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 # Function to create a new access token
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -33,11 +42,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 # Function to verify and decode an access token
 def verify_token(token: str) -> Optional[Dict]:
+    # Repeat requests with the same token skip the HMAC check and JSON decode
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        return payload
     try:
         # Attempt to decode the token using the secret key and algorithm
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        # Return the payload if successful
-        return payload
     except JWTError:
-        # Return None if the token is invalid or expired
+        # Return None if the token is invalid or expired (failures are never cached)
         return None
+    # Cache until expiry; tokens without an 'exp' claim are not cached
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            _verified_tokens.set(key, payload, ttl=remaining)
+    # Return the payload if successful
+    return payload
+
+def token_cache_stats() -> Dict:
+    return _verified_tokens.stats()
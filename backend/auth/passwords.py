@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from config import settings
+from utils.metrics import registry, span
+
+# Dedicated pool so bcrypt never competes with model inference for the default executor.
+# bcrypt releases the GIL while hashing, so these threads run truly in parallel.
+_executor = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots: Optional[asyncio.Semaphore] = None
+_in_flight = 0
+registry.gauge("auth_hashes_in_flight", "bcrypt hashes queued or running.", lambda: _in_flight)
+
+def _get_hashable_password(password: str) -> str:
+    """Pre-hash password with SHA-256 to bypass bcrypt's 72-byte limit."""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Helper function to hash passwords
+def get_password_hash(password: str):
+    # Pre-hash to bypass 72-byte limit and convert to bytes
+    password_bytes = _get_hashable_password(password).encode('utf-8')
+    # Generate salt and hash
+    salt = bcrypt.gensalt()
+    hashed = bcrypt.hashpw(password_bytes, salt)
+    return hashed.decode('utf-8')
+
+# Helper function to verify passwords
+def verify_password(plain_password: str, hashed_password: str):
+    password_bytes = _get_hashable_password(plain_password).encode('utf-8')
+    hashed_password_bytes = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(password_bytes, hashed_password_bytes)
+
+async def _run_hashing(fn, *args):
+    """
+    Run a bcrypt call off the event loop with a cap on in-flight hashes.
+    During a login storm excess callers wait briefly, then get 503 instead of piling up.
+    """
+    global _slots, _in_flight
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.AUTH_HASH_MAX_CONCURRENCY)
+    try:
+        await asyncio.wait_for(_slots.acquire(), timeout=settings.AUTH_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    try:
+        with span("auth.bcrypt"):
+            return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _in_flight -= 1
+        _slots.release()
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, hashed_password)
@@ -0,0 +1,329 @@
+"""
+Offline benchmarks for the ML, geospatial and dedup hot paths.
+
+Runs without network access: Hugging Face is forced offline (weights must already
+be in the local cache), the Supabase client used by find_duplicate_group is replaced
+by an in-memory fake, and inputs come from the seeded corpus in benchmarks/corpus.py.
+
+For every benchmark and batch size it reports p50/p95/p99 latency per call,
+items/sec, and the process's peak RSS after the run. Results are compared with a
+baseline JSON; a throughput drop or p95 rise beyond --tolerance exits non-zero.
+Baselines are machine specific, so generate one on the machine that runs the check.
+
+Usage (from backend/):
+    python benchmarks/bench_hotpaths.py --update-baseline
+    python benchmarks/bench_hotpaths.py
+    python benchmarks/bench_hotpaths.py --only classify,ward --sizes 1,32 --repeat 10
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Never reach the network: model weights come from the local cache
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+# database.py builds a client at import; it is swapped for a fake before use
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+
+# Allow imports of backend modules when run as a script
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BACKEND_DIR)
+
+from benchmarks import corpus
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = (1, 8, 32)
+
+
+class FakeSupabase:
+    """Answers the select chain in find_duplicate_group from a fixed candidate list."""
+
+    class _Query:
+        def __init__(self, rows):
+            self._rows = rows
+            self._limit = None
+
+        def select(self, *args, **kwargs):
+            return self
+
+        def eq(self, *args, **kwargs):
+            return self
+
+        def order(self, *args, **kwargs):
+            return self
+
+        def limit(self, n):
+            self._limit = n
+            return self
+
+        def execute(self):
+            rows = self._rows[: self._limit] if self._limit else self._rows
+            return type("Response", (), {"data": rows})()
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+
+    def table(self, name: str):
+        return self._Query(self.rows)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Benchmark:
+    """
+    'setup' imports the module under test (loading its model) and returns
+    run(batch) -> result; 'inputs(n)' builds a batch of n items.
+    """
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[list], Any]], inputs: Callable[[int], list]):
+        self.name = name
+        self.setup = setup
+        self.inputs = inputs
+
+
+def _loop(fn: Callable[[Any], Any]) -> Callable[[list], list]:
+    """Per-item API called once per item of the batch."""
+    return lambda batch: [fn(item) for item in batch]
+
+
+def build_benchmarks(media_dir: str) -> Dict[str, Benchmark]:
+    # Media files are generated on first use so text-only runs need no Pillow
+    image_path = os.path.join(media_dir, "bench.jpg")
+    audio_path = os.path.join(media_dir, "bench.wav")
+
+    def setup_classify():
+        from ml.classifier import classify_complaint
+        return _loop(classify_complaint)
+
+    def setup_classify_batch():
+        from ml.classifier import classify_complaints
+        return classify_complaints
+
+    def setup_urgency():
+        from ml.urgency import calculate_urgency
+        return _loop(calculate_urgency)
+
+    def setup_urgency_batch():
+        from ml.urgency import calculate_urgency_batch
+        return calculate_urgency_batch
+
+    def setup_embedding():
+        from ml.duplicates import get_embedding
+        return _loop(get_embedding)
+
+    def setup_embedding_batch():
+        from ml.duplicates import get_embeddings
+        return get_embeddings
+
+    def setup_dedup():
+        import ml.duplicates as duplicates
+        candidate_texts = corpus.texts(20, seed=corpus.SEED + 1)
+        duplicates.supabase = FakeSupabase(corpus.candidates(duplicates.get_embeddings(candidate_texts)))
+        return _loop(lambda text: duplicates.find_duplicate_group(text, "sanitation"))
+
+    def setup_ward():
+        from utils.geospatial import WardDetector
+        detector = WardDetector()
+        if not detector.loaded:
+            raise RuntimeError("ward boundaries (data/mumbai_wards.json) are not available")
+        return _loop(lambda point: detector.get_ward(*point))
+
+    def setup_ward_batch():
+        from utils.geospatial import WardDetector
+        detector = WardDetector()
+        if not detector.loaded:
+            raise RuntimeError("ward boundaries (data/mumbai_wards.json) are not available")
+        return lambda batch: detector.get_wards([p[0] for p in batch], [p[1] for p in batch])
+
+    def setup_vision():
+        from ml.vision import analyze_image
+        corpus.ensure_media(media_dir)
+        return _loop(analyze_image)
+
+    def setup_voice():
+        from ml.voice import transcribe_audio
+        corpus.ensure_media(media_dir)
+
+        def run(item):
+            # transcribe_audio swallows errors; a None result means nothing was measured
+            if transcribe_audio(item) is None:
+                raise RuntimeError("transcription failed (is ffmpeg installed?)")
+        return _loop(run)
+
+    return {
+        "classify": Benchmark("classify", setup_classify, corpus.texts),
+        "classify_batch": Benchmark("classify_batch", setup_classify_batch, corpus.texts),
+        "urgency": Benchmark("urgency", setup_urgency, corpus.texts),
+        "urgency_batch": Benchmark("urgency_batch", setup_urgency_batch, corpus.texts),
+        "embedding": Benchmark("embedding", setup_embedding, corpus.texts),
+        "embedding_batch": Benchmark("embedding_batch", setup_embedding_batch, corpus.texts),
+        "dedup": Benchmark("dedup", setup_dedup, corpus.texts),
+        "ward": Benchmark("ward", setup_ward, corpus.points),
+        "ward_batch": Benchmark("ward_batch", setup_ward_batch, corpus.points),
+        "vision": Benchmark("vision", setup_vision, lambda n: [image_path] * n),
+        "voice": Benchmark("voice", setup_voice, lambda n: [audio_path] * n),
+    }
+
+
+def run_benchmark(bench: Benchmark, sizes: List[int], repeat: int, warmup: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    run = bench.setup()
+    results: Dict[str, Any] = {"setup_s": round(time.perf_counter() - started, 3), "sizes": {}}
+    for size in sizes:
+        batch = bench.inputs(size)
+        for _ in range(warmup):
+            run(batch)
+        latencies = []
+        for _ in range(repeat):
+            call_started = time.perf_counter()
+            run(batch)
+            latencies.append(time.perf_counter() - call_started)
+        median = statistics.median(latencies)
+        results["sizes"][str(size)] = {
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "items_per_sec": round(size / median, 2) if median > 0 else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    info = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+    try:
+        import torch
+        info["torch"] = torch.__version__
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every metric that regressed beyond the tolerance."""
+    regressions = []
+    for name, bench in results["benchmarks"].items():
+        base_bench = baseline.get("benchmarks", {}).get(name)
+        if not base_bench or "sizes" not in bench or "sizes" not in base_bench:
+            continue
+        for size, current in bench["sizes"].items():
+            base = base_bench["sizes"].get(size)
+            if not base:
+                continue
+            if base.get("items_per_sec") and current.get("items_per_sec") is not None:
+                if current["items_per_sec"] < base["items_per_sec"] * (1 - tolerance):
+                    regressions.append(
+                        f"{name}@{size}: {current['items_per_sec']:.1f} items/s vs baseline {base['items_per_sec']:.1f}"
+                    )
+            if base.get("p95_ms") and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name}@{size}: p95 {current['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f} ms")
+    return regressions
+
+
+def print_table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    print(f"{'benchmark':<16} {'size':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'items/s':>10} {'vs base':>8} {'rss MB':>8}")
+    for name, bench in results["benchmarks"].items():
+        if "error" in bench:
+            print(f"{name:<16} skipped: {bench['error']}")
+            continue
+        for size, r in bench["sizes"].items():
+            delta = ""
+            base = (baseline or {}).get("benchmarks", {}).get(name, {}).get("sizes", {}).get(size)
+            if base and base.get("items_per_sec") and r["items_per_sec"]:
+                delta = f"{(r['items_per_sec'] / base['items_per_sec'] - 1) * 100:+.0f}%"
+            print(
+                f"{name:<16} {size:>5} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['p99_ms']:>10.2f} "
+                f"{r['items_per_sec'] or 0:>10.1f} {delta:>8} {r['peak_rss_mb']:>8.0f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for ML, geospatial and dedup hot paths")
+    parser.add_argument("--only", help="Comma-separated benchmark names (default: all)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per batch size")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per batch size")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--output", help="Also write the results JSON here")
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks(os.path.join(tempfile.gettempdir(), "civicsense-bench"))
+    names = args.only.split(",") if args.only else list(benchmarks)
+    unknown = [name for name in names if name not in benchmarks]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}; choose from {', '.join(benchmarks)}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    results: Dict[str, Any] = {"environment": environment(), "repeat": args.repeat, "benchmarks": {}}
+    for name in names:
+        print(f" [BENCH] {name} ...", flush=True)
+        try:
+            results["benchmarks"][name] = run_benchmark(benchmarks[name], sizes, args.repeat, args.warmup)
+        except Exception as e:
+            results["benchmarks"][name] = {"error": str(e)}
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != results["environment"]:
+            print(" [!] Baseline was recorded on a different environment; comparisons are indicative only.")
+
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f" [BENCH] Baseline written to {args.baseline}")
+        return
+
+    failed = [name for name, bench in results["benchmarks"].items() if "error" in bench]
+    if baseline is None:
+        print(f" [BENCH] No baseline at {args.baseline}; run with --update-baseline to create one.")
+    else:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n [REGRESSION] {len(regressions)} metric(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"\n [BENCH] No regressions beyond {args.tolerance:.0%}.")
+    if failed:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
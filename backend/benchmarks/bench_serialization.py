@@ -0,0 +1,107 @@
+"""
+Per-row cost of serializing GET /complaints/ rows.
+
+Compares the old path (validate every row into ComplaintRead via response_model,
+dump to JSON-compatible Python, json.dumps) with the orjson fast path used by
+utils.serialization.rows_response, with and without alias fields.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py --rows 5000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+# Allow imports of backend modules when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import orjson
+from pydantic import TypeAdapter
+
+from models.complaint import ComplaintRead
+from utils.serialization import with_aliases
+
+
+def make_rows(n: int) -> List[dict]:
+    """Rows shaped like PostgREST output for the explicit complaint column list."""
+    random.seed(7)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "text": "Garbage not collected near the market for three days, stench is unbearable.",
+            "category": random.choice(["sanitation", "water", "roads_infra", "electricity"]),
+            "urgency": random.choice(["low", "medium", "high", "critical"]),
+            "department": random.choice(["sanitation", "water", "roads", "electricity"]),
+            "status": "submitted",
+            "timestamp": (start + timedelta(minutes=i)).isoformat(),
+            "location": "Dadar West",
+            "image_url": None,
+            "audio_url": None,
+            "latitude": 19.0 + random.random() / 10,
+            "longitude": 72.8 + random.random() / 10,
+            "ward": "G/N",
+            "area": "Dadar",
+            "duplicate_group_id": str(uuid.uuid4()) if i % 5 == 0 else None,
+            "sla_eta": "24 Hours",
+            "duplicate_count": i % 3,
+            "user_id": str(uuid.uuid4()),
+            "rejection_reason": None,
+            "resolution_note": None,
+            "resolution_image_url": None,
+        })
+    return rows
+
+
+def pydantic_path(rows, adapter):
+    models = adapter.validate_python(rows)
+    return json.dumps(adapter.dump_python(models, mode="json")).encode("utf-8")
+
+
+def orjson_path(rows):
+    return orjson.dumps(rows)
+
+
+def orjson_alias_path(rows):
+    return orjson.dumps([with_aliases(row) for row in rows])
+
+
+def measure(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark complaint list serialization")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    adapter = TypeAdapter(List[ComplaintRead])
+
+    results = {
+        "response_model (pydantic + json)": measure(lambda: pydantic_path(rows, adapter), args.repeat),
+        "orjson rows": measure(lambda: orjson_path(rows), args.repeat),
+        "orjson rows + aliases": measure(lambda: orjson_alias_path(rows), args.repeat),
+    }
+    baseline = results["response_model (pydantic + json)"]
+    print(f"{args.rows} rows, best of {args.repeat}:")
+    for name, seconds in results.items():
+        per_row_us = seconds / args.rows * 1e6
+        print(f"  {name:<34} {seconds * 1000:8.1f} ms  {per_row_us:6.2f} us/row  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
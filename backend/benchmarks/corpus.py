@@ -0,0 +1,99 @@
+"""
+Fixed synthetic inputs for the offline benchmarks: complaint texts, Mumbai
+coordinates, dedup candidates, a street-scene-sized image and a short WAV clip.
+Everything is generated from a seed so runs are comparable across machines.
+"""
+import math
+import os
+import random
+import struct
+import wave
+from typing import List, Tuple
+
+SEED = 1337
+
+TEMPLATES = [
+    "Huge pothole on {street} near {landmark}, two-wheelers are skidding every evening.",
+    "Garbage has not been collected on {street} for {days} days, the stench is unbearable.",
+    "No water supply in our building near {landmark} since {days} days.",
+    "Street light outside {landmark} is not working, the lane is completely dark at night.",
+    "Sewage overflowing onto {street}, children walk through it to reach school.",
+    "Live electric wire hanging low near {landmark} after the rain, very dangerous.",
+    "Illegal parking on {street} blocks the ambulance route every morning.",
+    "Water logging near {landmark} after heavy rain, shops are flooded.",
+    "Tree branch fell on {street} and is blocking one lane of traffic.",
+    "Drain cover missing near {landmark}, someone could fall in.",
+]
+STREETS = ["SV Road", "LBS Marg", "Linking Road", "Carter Road", "Tulsi Pipe Road", "Hill Road", "JP Road"]
+LANDMARKS = ["Dadar station", "Andheri market", "Borivali bus depot", "Kurla west", "Bandra talao", "Sion circle"]
+
+# Rough bounding box of the BMC area; some points fall outside on purpose
+LAT_RANGE = (18.89, 19.27)
+LNG_RANGE = (72.77, 72.99)
+
+
+def texts(n: int, seed: int = SEED) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(
+            street=rng.choice(STREETS), landmark=rng.choice(LANDMARKS), days=rng.randint(2, 9)
+        )
+        for _ in range(n)
+    ]
+
+
+def points(n: int, seed: int = SEED) -> List[Tuple[float, float]]:
+    rng = random.Random(seed)
+    return [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(n)]
+
+
+def candidates(embeddings: List[List[float]], seed: int = SEED) -> List[dict]:
+    """Dedup candidate rows in the shape PostgREST returns (embedding as a JSON string)."""
+    rng = random.Random(seed)
+    rows = []
+    for i, embedding in enumerate(embeddings):
+        rows.append({
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "text": "",
+            "embedding": "[" + ",".join(f"{v:.6f}" for v in embedding) + "]",
+            "duplicate_group_id": None if rng.random() < 0.7 else f"00000000-0000-0000-0001-{i:012d}",
+        })
+    return rows
+
+
+def write_image(path: str, width: int = 640, height: int = 480, seed: int = SEED) -> str:
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height))
+    image.putdata([
+        (rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(width * height)
+    ])
+    image.save(path, format="JPEG", quality=85)
+    return path
+
+
+def write_wav(path: str, seconds: float = 3.0, rate: int = 16000) -> str:
+    """Mono 16-bit tone sweep; transcription output is irrelevant, only the cost is measured."""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        sample = 0.3 * math.sin(2 * math.pi * (220 + 200 * t) * t)
+        frames += struct.pack("<h", int(sample * 32767))
+    with wave.open(path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(bytes(frames))
+    return path
+
+
+def ensure_media(directory: str) -> Tuple[str, str]:
+    os.makedirs(directory, exist_ok=True)
+    image = os.path.join(directory, "bench.jpg")
+    audio = os.path.join(directory, "bench.wav")
+    if not os.path.exists(audio):
+        write_wav(audio)
+    if not os.path.exists(image):
+        write_image(image)
+    return image, audio
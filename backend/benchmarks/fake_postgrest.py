@@ -0,0 +1,198 @@
+"""
+In-memory stand-in for Supabase's PostgREST API, plugged into the app's async pool
+with pool.use_transport(FakePostgrest().transport()).
+
+Covers what db/ actually sends: eq/neq/in/is/lt/lte/gt/gte filters, or=(...) logic
+trees (keyset cursors), order, limit/offset, select projection, Prefer count=exact,
+return=minimal and resolution=ignore-duplicates, PATCH, and rpc/ calls (empty result).
+An optional per-request latency models the network round trip.
+"""
+import asyncio
+import json
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+_OPERATORS = {"eq", "neq", "in", "is", "lt", "lte", "gt", "gte", "like", "ilike"}
+
+
+def _coerce(value: Any, literal: str) -> Tuple[Any, Any]:
+    """Compare numbers as numbers and everything else as strings."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return value, float(literal)
+        except ValueError:
+            pass
+    return str(value), literal
+
+
+def _condition(column: str, expression: str) -> Predicate:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, literal = expression.partition(".")
+    if op not in _OPERATORS:
+        raise ValueError(f"unsupported operator '{op}'")
+    if len(literal) >= 2 and literal[0] == '"' and literal[-1] == '"':
+        literal = literal[1:-1].replace('\\"', '"')
+
+    def check(row: Dict[str, Any]) -> bool:
+        value = row.get(column)
+        if op == "is":
+            result = value is None if literal == "null" else str(value).lower() == literal
+        elif op == "in":
+            options = [item.strip().strip('"') for item in literal.strip("()").split(",")]
+            result = value is not None and str(value) in options
+        elif value is None:
+            result = False
+        elif op in ("like", "ilike"):
+            pattern = "^" + re.escape(literal).replace("\\*", ".*").replace("%", ".*") + "$"
+            result = re.match(pattern, str(value), re.IGNORECASE if op == "ilike" else 0) is not None
+        else:
+            left, right = _coerce(value, literal)
+            result = {
+                "eq": left == right, "neq": left != right,
+                "lt": left < right, "lte": left <= right,
+                "gt": left > right, "gte": left >= right,
+            }[op]
+        return not result if negate else result
+
+    return check
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split 'a,b(c,d),"e,f"' on commas that are not nested or quoted."""
+    parts, depth, quoted, current = [], 0, False, []
+    for i, char in enumerate(text):
+        if char == '"' and (i == 0 or text[i - 1] != "\\"):
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _logic(kind: str, body: str) -> Predicate:
+    """Parse the inside of or=(...) / and=(...) into a predicate."""
+    children = []
+    for part in _split_top_level(body):
+        match = re.match(r"^(and|or)\((.*)\)$", part)
+        if match:
+            children.append(_logic(match.group(1), match.group(2)))
+        else:
+            column, _, expression = part.partition(".")
+            children.append(_condition(column, expression))
+    if kind == "or":
+        return lambda row: any(child(row) for child in children)
+    return lambda row: all(child(row) for child in children)
+
+
+class FakePostgrest:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def seed(self, table: str, rows: List[Dict[str, Any]]):
+        self.tables.setdefault(table, []).extend(rows)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.requests += 1
+        path = request.url.path.split("/rest/v1/", 1)[-1]
+        if path.startswith("rpc/"):
+            return httpx.Response(200, json=[])
+        try:
+            with self._lock:
+                return self._handle_table(path, request)
+        except ValueError as e:
+            return httpx.Response(400, json={"message": str(e)})
+
+    def _handle_table(self, table: str, request: httpx.Request) -> httpx.Response:
+        rows = self.tables.setdefault(table, [])
+        prefer = request.headers.get("prefer", "")
+        params = list(request.url.params.multi_items())
+        control = {key: value for key, value in params if key in ("select", "order", "limit", "offset", "on_conflict", "columns")}
+        predicates: List[Predicate] = []
+        for key, value in params:
+            if key in control:
+                continue
+            if key in ("or", "and"):
+                predicates.append(_logic(key, value.strip()[1:-1]))
+            else:
+                predicates.append(_condition(key, value))
+        matched = [row for row in rows if all(p(row) for p in predicates)]
+
+        if request.method == "POST":
+            body = json.loads(request.content or b"[]")
+            body = body if isinstance(body, list) else [body]
+            existing = {row.get("id") for row in rows}
+            created = []
+            for record in body:
+                record = dict(record)
+                record.setdefault("id", str(uuid.uuid4()))
+                record.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+                if record["id"] in existing:
+                    if "resolution=ignore-duplicates" in prefer:
+                        continue
+                    return httpx.Response(409, json={"message": "duplicate key value violates unique constraint"})
+                rows.append(record)
+                existing.add(record["id"])
+                created.append(record)
+            if "return=minimal" in prefer:
+                return httpx.Response(201)
+            return httpx.Response(201, json=self._project(created, control.get("select")))
+
+        if request.method == "PATCH":
+            changes = json.loads(request.content or b"{}")
+            for row in matched:
+                row.update(changes)
+            headers = {"content-range": f"*/{len(matched)}"}
+            if "return=minimal" in prefer:
+                return httpx.Response(204, headers=headers)
+            return httpx.Response(200, json=self._project(matched, control.get("select")), headers=headers)
+
+        if request.method == "DELETE":
+            self.tables[table] = [row for row in rows if row not in matched]
+            return httpx.Response(204)
+
+        total = len(matched)
+        if control.get("order"):
+            for term in reversed(control["order"].split(",")):
+                column, _, direction = term.partition(".")
+                descending = direction.startswith("desc")
+                matched.sort(key=lambda row: (row.get(column) is None, str(row.get(column) or "")), reverse=descending)
+        offset = int(control.get("offset", 0))
+        limit = int(control["limit"]) if "limit" in control else None
+        page = matched[offset: offset + limit if limit is not None else None]
+        headers = {}
+        if "count=exact" in prefer:
+            end = offset + len(page) - 1
+            headers["content-range"] = f"{offset}-{end}/{total}" if page else f"*/{total}"
+        return httpx.Response(200, json=self._project(page, control.get("select")), headers=headers)
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], select: Optional[str]) -> List[Dict[str, Any]]:
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = [column.strip() for column in select.split(",")]
+        return [{column: row.get(column) for column in columns} for row in rows]
@@ -0,0 +1,447 @@
+"""
+End-to-end load test of the FastAPI app against an in-memory PostgREST stand-in.
+
+The real app (middleware, auth, routes, pipeline, WebSocket fan-out) runs under
+uvicorn in a background thread of this process; its database pool is pointed at
+benchmarks/fake_postgrest.py and the reverse geocoder at an offline fake, so nothing
+touches Supabase or Nominatim. With --stub-ml the models are replaced by constant-time
+stand-ins (optionally sleeping --stub-ml-ms) to size the web tier on its own.
+
+Virtual users replay a weighted mix of login, complaint create (text only, with an
+image, or voice: transcribe then create), list and PATCH, while WebSocket clients
+subscribe to the admin channel. Reported per endpoint: throughput, p50/p95/p99 and
+error rate; for WebSockets: delivery lag from broadcast to client receipt.
+
+Load generator and server share one process (and GIL), so absolute numbers are a
+lower bound on what the server alone could do; use them to compare changes.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py --stub-ml --duration 30 --users 32 --ws 20
+    python benchmarks/loadtest.py --mix login=1,create=3,create_image=1,list=10,patch=2 --db-latency-ms 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("SUPABASE_URL", "http://fake-postgrest.local")
+os.environ.setdefault("SUPABASE_KEY", "loadtest")
+os.environ.setdefault("JWT_SECRET", "loadtest-secret")
+# Keep the outbox of this run away from the real one
+os.environ.setdefault("OUTBOX_PATH", os.path.join(os.path.dirname(__file__), "loadtest_outbox.db"))
+
+# Allow imports of backend modules when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks import corpus
+from benchmarks.bench_hotpaths import percentile
+from benchmarks.fake_postgrest import FakePostgrest
+
+DEFAULT_MIX = "login=1,create=3,create_image=1,create_voice=1,list=10,patch=2"
+PASSWORD = "loadtest-password"
+
+
+STUB_CATEGORIES = [
+    ("garbage", "sanitation"), ("sewage", "sanitation"), ("drain", "sanitation"),
+    ("water", "water"), ("pothole", "roads_infra"), ("tree", "roads_infra"),
+    ("light", "electricity"), ("electric", "electricity"), ("parking", "traffic"),
+]
+
+
+def stub_category(text: str) -> str:
+    text_lower = text.lower()
+    return next((category for keyword, category in STUB_CATEGORIES if keyword in text_lower), "other")
+
+
+def install_ml_stubs(delay: float):
+    """Replace the model modules before the app imports them."""
+    def stub(name: str, **attrs):
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+    def work():
+        if delay:
+            time.sleep(delay)
+
+    def classify(text, embedding=None):
+        work()
+        return {"category": stub_category(text), "confidence": 0.9}
+
+    def urgency(text):
+        work()
+        return {"urgency": "high" if "dangerous" in text else "medium", "reason": "stub"}
+
+    def embedding(text):
+        work()
+        rng = random.Random(text)
+        return [rng.uniform(-1, 1) for _ in range(384)]
+
+    def analyze_image(path):
+        work()
+        return []
+
+    def transcribe(path):
+        work()
+        return corpus.texts(1)[0]
+
+    stub(
+        "ml.classifier",
+        CANDIDATE_LABELS=["sanitation", "roads_infra", "water", "electricity", "safety", "traffic", "other"],
+        classify_complaint=classify,
+        classify_by_keywords=lambda text: {"category": stub_category(text), "confidence": 0.5},
+        classify_complaints=lambda texts, batch_size=8, embeddings=None: [classify(t) for t in texts],
+    )
+    stub(
+        "ml.urgency",
+        calculate_urgency=urgency,
+        keyword_urgency=lambda text: {"urgency": "high" if "dangerous" in text else "medium", "reason": "stub"},
+        calculate_urgency_batch=lambda texts: [urgency(t) for t in texts],
+    )
+    stub(
+        "ml.duplicates",
+        get_embedding=embedding,
+        get_embeddings=lambda texts, batch_size=32: [embedding(t) for t in texts],
+        match_duplicate=lambda emb, candidates, threshold=0.85: None,
+        find_duplicate_group=lambda text, category, threshold=0.85: None,
+        group_duplicates=lambda ids, embeddings, categories, candidates, threshold=0.85: [None] * len(ids),
+    )
+    stub("ml.vision", analyze_image=analyze_image, get_visual_urgency_boost=lambda detections: 0)
+    stub("ml.voice", transcribe_audio=transcribe)
+
+
+class FakeGeolocator:
+    """Offline reverse geocoder with a fixed cost per lookup."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def reverse(self, point, exactly_one=True, timeout=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return types.SimpleNamespace(raw={"address": {"suburb": random.choice(corpus.LANDMARKS).split()[0]}})
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed_database(fake: FakePostgrest, users: int, complaints: int) -> List[str]:
+    from auth.passwords import get_password_hash
+
+    hashed = get_password_hash(PASSWORD)
+    fake.seed("users", [
+        {"id": str(uuid.uuid4()), "email": f"user{i}@loadtest.example.com", "hashed_password": hashed,
+         "role": "citizen", "department": None}
+        for i in range(users)
+    ])
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    texts = corpus.texts(complaints)
+    points = corpus.points(complaints)
+    rows = []
+    for i, (text, (lat, lng)) in enumerate(zip(texts, points)):
+        rows.append({
+            "id": str(uuid.uuid4()), "text": text, "category": stub_category(text),
+            "urgency": random.choice(["low", "medium", "high", "critical"]),
+            "department": random.choice(["sanitation", "water", "roads", "electricity"]),
+            "status": "submitted", "timestamp": (start + timedelta(seconds=i * 60)).isoformat(),
+            "location": None, "image_url": None, "audio_url": None, "latitude": lat, "longitude": lng,
+            "ward": "G/N", "area": "Dadar", "duplicate_group_id": None, "sla_eta": "24 Hours",
+            "duplicate_count": 0, "user_id": None, "embedding": None,
+        })
+    fake.seed("complaints", rows)
+    return [row["id"] for row in rows]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+
+    def record(self, name: str, seconds: float, ok: bool, detail: str = ""):
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+            self.error_samples.setdefault(name, detail[:200])
+
+
+class LoadTest:
+    def __init__(self, args, base_url: str, complaint_ids: List[str], published: Dict[str, float]):
+        from auth.jwt_handler import create_access_token
+
+        self.args = args
+        self.base_url = base_url
+        self.complaint_ids = complaint_ids
+        self.published = published
+        self.recorder = Recorder()
+        self.lags: List[float] = []
+        self.ws_received = 0
+        self.ws_errors = 0
+        self.mix = self._parse_mix(args.mix)
+        self.texts = corpus.texts(500, seed=corpus.SEED + 2)
+        self.points = corpus.points(500, seed=corpus.SEED + 2)
+        self.citizen = {"Authorization": "Bearer " + create_access_token(
+            {"sub": str(uuid.uuid4()), "email": "citizen@loadtest.example.com", "role": "citizen", "department": None})}
+        self.admin = {"Authorization": "Bearer " + create_access_token(
+            {"sub": str(uuid.uuid4()), "email": "admin@loadtest.example.com", "role": "city_admin", "department": None})}
+        media = tempfile.mkdtemp(prefix="loadtest-")
+        self.audio_bytes = open(corpus.write_wav(os.path.join(media, "voice.wav"), seconds=2.0), "rb").read()
+        # Image content is irrelevant with stubbed vision; real YOLO gets a valid JPEG when Pillow exists
+        try:
+            self.image_bytes = open(corpus.write_image(os.path.join(media, "photo.jpg"), 320, 240), "rb").read()
+        except ImportError:
+            self.image_bytes = b"\xff\xd8\xff\xe0" + os.urandom(2048)
+
+    @staticmethod
+    def _parse_mix(mix: str) -> Dict[str, float]:
+        weights = {}
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            weights[name.strip()] = float(weight or 1)
+        unknown = set(weights) - {"login", "create", "create_image", "create_voice", "list", "patch"}
+        if unknown:
+            raise SystemExit(f"unknown traffic type(s): {', '.join(sorted(unknown))}")
+        return weights
+
+    async def _timed(self, name: str, call):
+        started = time.perf_counter()
+        try:
+            response = await call
+            ok = response.status_code < 400
+            self.recorder.record(name, time.perf_counter() - started, ok, "" if ok else f"{response.status_code} {response.text}")
+            return response if ok else None
+        except Exception as e:
+            self.recorder.record(name, time.perf_counter() - started, False, repr(e))
+            return None
+
+    def _complaint_form(self) -> Dict[str, str]:
+        i = random.randrange(len(self.texts))
+        lat, lng = self.points[i]
+        return {"text": self.texts[i], "latitude": str(lat), "longitude": str(lng)}
+
+    async def login(self, client):
+        email = f"user{random.randrange(self.args.seed_users)}@loadtest.example.com"
+        await self._timed("POST /auth/login", client.post("/auth/login", json={"email": email, "password": PASSWORD}))
+
+    async def create(self, client):
+        response = await self._timed("POST /complaints/", client.post("/complaints/", data=self._complaint_form(), headers=self.citizen))
+        if response is not None and response.status_code == 200:
+            self.complaint_ids.append(response.json()["id"])
+
+    async def create_image(self, client):
+        files = {"image": ("photo.jpg", self.image_bytes, "image/jpeg")}
+        response = await self._timed(
+            "POST /complaints/ +image",
+            client.post("/complaints/", data=self._complaint_form(), files=files, headers=self.citizen),
+        )
+        if response is not None and response.status_code == 200:
+            self.complaint_ids.append(response.json()["id"])
+
+    async def create_voice(self, client):
+        files = {"file": ("voice.wav", self.audio_bytes, "audio/wav")}
+        response = await self._timed("POST /voice/transcribe", client.post("/voice/transcribe", files=files))
+        if response is None:
+            return
+        form = self._complaint_form()
+        form["text"] = response.json().get("text") or form["text"]
+        await self._timed("POST /complaints/ (voice)", client.post("/complaints/", data=form, headers=self.citizen))
+
+    async def list(self, client):
+        await self._timed("GET /complaints/", client.get("/complaints/", params={"limit": 50}, headers=self.admin))
+
+    async def patch(self, client):
+        complaint_id = random.choice(self.complaint_ids)
+        status = random.choice(["in_progress", "resolved", "submitted"])
+        await self._timed(
+            "PATCH /complaints/{id}",
+            client.patch(f"/complaints/{complaint_id}", json={"status": status}, headers=self.admin),
+        )
+
+    async def virtual_user(self, client, deadline: float):
+        names, weights = list(self.mix), list(self.mix.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, random.choices(names, weights)[0])(client)
+            if self.args.think_ms:
+                await asyncio.sleep(random.expovariate(1000 / self.args.think_ms))
+
+    def _observe_event(self, event: Dict[str, Any], received: float):
+        if event.get("type") == "BATCH":
+            for inner in event.get("events", []):
+                self._observe_event(inner, received)
+            return
+        data = event.get("data") or {}
+        sent = self.published.get(data.get("id")) if isinstance(data, dict) else None
+        if sent is not None:
+            self.lags.append(received - sent)
+
+    async def ws_subscriber(self, stop: asyncio.Event):
+        import websockets
+
+        url = self.base_url.replace("http://", "ws://") + "/ws/admin"
+        try:
+            async with websockets.connect(url, max_queue=None) as ws:
+                while not stop.is_set():
+                    try:
+                        text = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    received = time.perf_counter()
+                    self.ws_received += 1
+                    self._observe_event(json.loads(text), received)
+        except Exception as e:
+            self.ws_errors += 1
+            print(f" [LOAD] WebSocket subscriber failed: {e!r}", file=sys.__stdout__)
+
+    async def run(self) -> float:
+        import httpx
+
+        stop = asyncio.Event()
+        subscribers = [asyncio.create_task(self.ws_subscriber(stop)) for _ in range(self.args.ws)]
+        await asyncio.sleep(0.5 if subscribers else 0)
+        limits = httpx.Limits(max_connections=self.args.users, max_keepalive_connections=self.args.users)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60) as client:
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            await asyncio.gather(*(self.virtual_user(client, deadline) for _ in range(self.args.users)))
+            elapsed = time.perf_counter() - started
+        # Let in-flight broadcasts land before closing the subscribers
+        await asyncio.sleep(0.5)
+        stop.set()
+        await asyncio.gather(*subscribers)
+        return elapsed
+
+
+def report(test: LoadTest, elapsed: float, output: Optional[str]):
+    recorder = test.recorder
+    summary: Dict[str, Any] = {"elapsed_s": round(elapsed, 2), "endpoints": {}}
+    print(f"\n{'endpoint':<28} {'count':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    total = 0
+    for name, latencies in sorted(recorder.latencies.items()):
+        total += len(latencies)
+        errors = recorder.errors.get(name, 0)
+        row = {
+            "count": len(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "error_rate": round(errors / len(latencies), 4),
+        }
+        summary["endpoints"][name] = row
+        print(
+            f"{name:<28} {row['count']:>7} {row['rps']:>8.1f} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>8.1%}"
+        )
+    summary["total_rps"] = round(total / elapsed, 2)
+    print(f"{'total':<28} {total:>7} {summary['total_rps']:>8.1f}")
+
+    if test.args.ws:
+        summary["websocket"] = {
+            "subscribers": test.args.ws,
+            "frames_received": test.ws_received,
+            "subscriber_errors": test.ws_errors,
+        }
+        if test.lags:
+            summary["websocket"].update({
+                "lag_p50_ms": round(percentile(test.lags, 0.50) * 1000, 2),
+                "lag_p95_ms": round(percentile(test.lags, 0.95) * 1000, 2),
+                "lag_p99_ms": round(percentile(test.lags, 0.99) * 1000, 2),
+            })
+        ws = summary["websocket"]
+        print(
+            f"\nWebSocket: {ws['subscribers']} subscribers, {ws['frames_received']} frames, "
+            f"lag p50/p95/p99 = {ws.get('lag_p50_ms', '-')}/{ws.get('lag_p95_ms', '-')}/{ws.get('lag_p99_ms', '-')} ms"
+        )
+    for name, sample in recorder.error_samples.items():
+        print(f" [!] {name}: {sample}")
+    if output:
+        with open(output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API against an in-memory PostgREST stand-in")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--users", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--ws", type=int, default=10, help="WebSocket subscribers on the admin channel")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Traffic weights, e.g. list=10,create=2")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a user's requests")
+    parser.add_argument("--db-latency-ms", type=float, default=5, help="Simulated PostgREST round trip")
+    parser.add_argument("--geocode-latency-ms", type=float, default=0, help="Simulated reverse-geocoding cost")
+    parser.add_argument("--stub-ml", action="store_true", help="Replace models with constant-time stand-ins")
+    parser.add_argument("--stub-ml-ms", type=float, default=0, help="Sleep per stubbed model call")
+    parser.add_argument("--seed-users", type=int, default=50)
+    parser.add_argument("--seed-complaints", type=int, default=2000)
+    parser.add_argument("--output", help="Write the summary JSON here")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own log output")
+    args = parser.parse_args()
+
+    if args.stub_ml:
+        install_ml_stubs(args.stub_ml_ms / 1000)
+
+    # Silence the app's per-request prints unless asked; the report goes to the real stdout
+    app_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with app_output:
+        import uvicorn
+        from db import pool
+        import utils.geospatial as geospatial
+
+        fake = FakePostgrest(latency=args.db_latency_ms / 1000)
+        pool.use_transport(fake.transport())
+        geospatial.geolocator = FakeGeolocator(args.geocode_latency_ms / 1000)
+        complaint_ids = seed_database(fake, args.seed_users, args.seed_complaints)
+
+        import main as app_module
+        from sockets import manager
+
+        # Stamp every NEW_COMPLAINT broadcast so subscribers can compute delivery lag
+        published: Dict[str, float] = {}
+        broadcast = manager.broadcast_to_channel
+
+        async def stamped_broadcast(channel, message, include_admin=True):
+            data = message.get("data")
+            if message.get("type") == "NEW_COMPLAINT" and isinstance(data, dict):
+                published[data.get("id")] = time.perf_counter()
+            await broadcast(channel, message, include_admin)
+
+        manager.broadcast_to_channel = stamped_broadcast
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        test = LoadTest(args, f"http://127.0.0.1:{port}", complaint_ids, published)
+        print(f" [LOAD] {args.users} users, {args.ws} subscribers, {args.duration:g}s, mix {args.mix}", file=sys.__stdout__)
+        elapsed = asyncio.run(test.run())
+
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    report(test, elapsed, args.output)
+    print(f"\nFake PostgREST served {fake.requests} requests.")
+    for suffix in ("", "-wal", "-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.environ["OUTBOX_PATH"] + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import asyncio
+import errno
+import os
+import socket
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from config import settings
+
+Handler = Callable[[Any], None]
+
+# Upper bound on a received datagram (the default Linux socket send buffer)
+_MAX_DATAGRAM = 212992
+
+# Topics that carry state other workers cannot recover from a later message
+# (cache invalidations, SLA index updates, hotspot counts); these are retried, not dropped
+RELIABLE_TOPICS = ("cache", "sla", "hotspots")
+
+
+class Broker(ABC):
+    """
+    Topic-based pub/sub underneath the WebSocket manager and the caches.
+    publish() never blocks: handlers run synchronously in this process and
+    implementations forward the message to other worker processes.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers[topic].append(handler)
+
+    def _dispatch(self, topic: str, payload: Any):
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f" [BROKER] Handler for '{topic}' failed: {e}")
+
+    @abstractmethod
+    def publish(self, topic: str, payload: Any, local: bool = True):
+        """Deliver to every subscriber; local=False skips this process's own handlers."""
+
+    @abstractmethod
+    async def start(self):
+        """Start receiving from other processes; call from the running event loop."""
+
+    @abstractmethod
+    async def close(self):
+        """Flush what can still be sent and stop receiving."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"type": type(self).__name__, "published": self.published, "received": self.received}
+
+
+class InProcessBroker(Broker):
+    """Single-process deployments: publishing is a direct call to the handlers."""
+
+    def publish(self, topic: str, payload: Any, local: bool = True):
+        self.published += 1
+        if local:
+            self._dispatch(topic, payload)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class UnixSocketBroker(Broker):
+    """
+    Peer-to-peer fan-out between worker processes on one host.
+    Every worker binds a datagram socket in a shared directory and sends to all
+    the others. Publishes are batched for 'batch_window' seconds into as few
+    datagrams as possible, since the kernel queues only a few datagrams per socket.
+
+    WebSocket events are best effort: a peer whose queue is full misses the batch.
+    Messages on 'reliable_topics' are packed separately and, when a peer's queue is
+    full, kept in a per-peer backlog that is retried in order every 'retry_interval'
+    seconds for up to 'retry_seconds' before being dropped. Drops are logged at most
+    once per second per reason.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        batch_window: float = 0.005,
+        max_datagram_bytes: int = 60000,
+        reliable_topics: Iterable[str] = RELIABLE_TOPICS,
+        retry_interval: float = 0.02,
+        retry_seconds: float = 5.0,
+        max_backlog: int = 1024,
+    ):
+        super().__init__()
+        self.directory = directory
+        self.batch_window = batch_window
+        self.max_datagram_bytes = max_datagram_bytes
+        self.reliable_topics = frozenset(reliable_topics)
+        self.retry_interval = retry_interval
+        self.retry_seconds = retry_seconds
+        self.max_backlog = max_backlog
+        self.path: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[bytes] = []
+        self._pending_reliable: List[bytes] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # peer -> (datagram, first attempt) waiting for room in the peer's queue
+        self._backlog: Dict[str, Deque[Tuple[bytes, float]]] = defaultdict(deque)
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+        self.dropped = 0
+        self.retried = 0
+        self.stale_peers = 0
+        # reason -> (drops since the last log line, time of that line)
+        self._unlogged: Dict[str, Tuple[int, float]] = {}
+
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._loop = asyncio.get_running_loop()
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        print(f" [BROKER] Listening on {self.path}")
+
+    async def close(self):
+        if self._sock is None:
+            return
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush()
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        # One last try for anything still waiting on a slow peer
+        self._retry()
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        backlog = sum(len(queue) for queue in self._backlog.values())
+        if backlog:
+            self._drop("still queued at shutdown", backlog)
+        self._backlog.clear()
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def publish(self, topic: str, payload: Any, local: bool = True):
+        self.published += 1
+        if local:
+            self._dispatch(topic, payload)
+        if self._sock is None:
+            return
+        pending = self._pending_reliable if topic in self.reliable_topics else self._pending
+        pending.append(orjson.dumps([topic, payload], default=str))
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.batch_window, self._flush)
+
+    def _pack(self, items: List[bytes]) -> List[bytes]:
+        """Group encoded messages into JSON-array datagrams under the size limit."""
+        datagrams, current, size = [], [], 2
+        for item in items:
+            if current and size + len(item) + 1 > self.max_datagram_bytes:
+                datagrams.append(b"[" + b",".join(current) + b"]")
+                current, size = [], 2
+            current.append(item)
+            size += len(item) + 1
+        if current:
+            datagrams.append(b"[" + b",".join(current) + b"]")
+        return datagrams
+
+    def _peers(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(self.directory, name) for name in names
+            if name.endswith(".sock") and os.path.join(self.directory, name) != self.path
+        ]
+
+    def _drop(self, reason: str, count: int = 1):
+        """Count dropped datagrams and log them, at most once per second per reason."""
+        self.dropped += count
+        unlogged, logged_at = self._unlogged.get(reason, (0, 0.0))
+        unlogged += count
+        now = time.monotonic()
+        if now - logged_at >= 1.0:
+            print(f" [BROKER] Dropped {unlogged} datagram(s): {reason}")
+            unlogged, logged_at = 0, now
+        self._unlogged[reason] = (unlogged, logged_at)
+
+    def _remove_peer(self, peer: str):
+        # Socket file left behind by a worker that died; nobody will read it
+        self.stale_peers += 1
+        self._backlog.pop(peer, None)
+        try:
+            os.unlink(peer)
+        except OSError:
+            pass
+
+    def _send(self, peer: str, datagram: bytes) -> str:
+        """'sent', 'full' (retry later), 'gone' (peer removed) or 'failed' (dropped)."""
+        try:
+            self._sock.sendto(datagram, peer)
+            return "sent"
+        except (ConnectionRefusedError, FileNotFoundError):
+            self._remove_peer(peer)
+            return "gone"
+        except BlockingIOError:
+            return "full"
+        except OSError as e:
+            if e.errno == errno.EMSGSIZE:
+                self._drop(f"{len(datagram)} byte datagram is too large")
+            else:
+                self._drop(f"send to {peer} failed: {e}")
+            return "failed"
+
+    def _enqueue(self, peer: str, datagram: bytes, since: float):
+        backlog = self._backlog[peer]
+        if len(backlog) >= self.max_backlog:
+            self._drop(f"backlog for {peer} is full")
+            return
+        backlog.append((datagram, since))
+        if self._retry_handle is None:
+            self._retry_handle = self._loop.call_later(self.retry_interval, self._retry)
+
+    def _flush(self):
+        self._flush_handle = None
+        items, self._pending = self._pending, []
+        reliable_items, self._pending_reliable = self._pending_reliable, []
+        if (not items and not reliable_items) or self._sock is None:
+            return
+        datagrams = self._pack(items)
+        reliable = self._pack(reliable_items)
+        now = time.monotonic()
+        for peer in self._peers():
+            result = "sent"
+            for datagram in reliable:
+                # Keep reliable messages in order behind anything already waiting
+                if self._backlog.get(peer):
+                    self._enqueue(peer, datagram, now)
+                    continue
+                result = self._send(peer, datagram)
+                if result == "gone":
+                    break
+                if result == "full":
+                    self._enqueue(peer, datagram, now)
+            if result == "gone":
+                continue
+            for index, datagram in enumerate(datagrams):
+                result = self._send(peer, datagram)
+                if result == "gone":
+                    break
+                if result == "full":
+                    self._drop(f"queue of {peer} is full", len(datagrams) - index)
+                    break
+
+    def _retry(self):
+        self._retry_handle = None
+        if self._sock is None:
+            return
+        now = time.monotonic()
+        for peer in list(self._backlog):
+            backlog = self._backlog.get(peer)
+            while backlog:
+                datagram, since = backlog[0]
+                result = self._send(peer, datagram)
+                if result == "full":
+                    if now - since < self.retry_seconds:
+                        break
+                    result = "expired"
+                    self._drop(f"{peer} stayed full for {self.retry_seconds:.0f}s")
+                if result == "gone":
+                    break
+                backlog.popleft()
+                if result == "sent":
+                    self.retried += 1
+            if not self._backlog.get(peer):
+                self._backlog.pop(peer, None)
+        if self._backlog:
+            self._retry_handle = self._loop.call_later(self.retry_interval, self._retry)
+
+    def _on_readable(self):
+        while self._sock is not None:
+            try:
+                # A single oversized event is sent alone, so allow more than the packing target
+                data = self._sock.recv(_MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                messages = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                print(" [BROKER] Ignoring malformed datagram")
+                continue
+            for topic, payload in messages:
+                self.received += 1
+                self._dispatch(topic, payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "path": self.path,
+            "peers": len(self._peers()) if self._sock is not None else 0,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "backlog": sum(len(queue) for queue in self._backlog.values()),
+            "stale_peers": self.stale_peers,
+        }
+
+
+def create_broker(kind: str, directory: Optional[str] = None, batch_window: float = 0.005) -> Broker:
+    if kind == "inprocess":
+        return InProcessBroker()
+    if kind == "unix":
+        return UnixSocketBroker(directory or os.path.join(tempfile.gettempdir(), "complaints-broker"), batch_window)
+    raise ValueError(f"Unknown broker '{kind}'")
+
+
+broker = create_broker(settings.BROKER, settings.BROKER_DIR or None, settings.BROKER_BATCH_MS / 1000)
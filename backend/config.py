@@ -10,4 +10,88 @@ class Settings:
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Async PostgREST connection pool (see db/pool.py)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_POOL_KEEPALIVE: int = int(os.getenv("DB_POOL_KEEPALIVE", "10"))
+    DB_KEEPALIVE_EXPIRY: float = float(os.getenv("DB_KEEPALIVE_EXPIRY", "30"))
+    DB_CONNECT_TIMEOUT: float = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+    DB_QUERY_TIMEOUT: float = float(os.getenv("DB_QUERY_TIMEOUT", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+    DB_SLOW_QUERY_MS: float = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+    # Ingestion: "sync" runs the pipeline inside the request, "async" queues it (see workers/)
+    # Clients can also opt in per request with "Prefer: respond-async"
+    INGEST_MODE: str = os.getenv("INGEST_MODE", "sync")
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+    INGEST_UPLOAD_DIR: str = os.getenv("INGEST_UPLOAD_DIR", "ingest_uploads")
+    OUTBOX_PATH: str = os.getenv("OUTBOX_PATH", "outbox.db")
+    OUTBOX_LEASE_SECONDS: float = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+    OUTBOX_RETENTION_HOURS: float = float(os.getenv("OUTBOX_RETENTION_HOURS", "72"))
+
+    # Bulk NDJSON ingestion (POST /complaints/bulk)
+    BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", "64"))
+    BULK_INSERT_CHUNK: int = int(os.getenv("BULK_INSERT_CHUNK", "500"))
+    BULK_MAX_LINE_BYTES: int = int(os.getenv("BULK_MAX_LINE_BYTES", "65536"))
+
+    # Read-through complaint cache (see db/complaints.py)
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+    CACHE_MAX_ITEMS: int = int(os.getenv("CACHE_MAX_ITEMS", "4096"))
+    CACHE_MAX_LISTS: int = int(os.getenv("CACHE_MAX_LISTS", "256"))
+
+    # Auth hot path (see auth/passwords.py and auth/jwt_handler.py)
+    AUTH_HASH_WORKERS: int = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    AUTH_HASH_MAX_CONCURRENCY: int = int(os.getenv("AUTH_HASH_MAX_CONCURRENCY", "16"))
+    AUTH_HASH_QUEUE_TIMEOUT: float = float(os.getenv("AUTH_HASH_QUEUE_TIMEOUT", "5"))
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_USER_CACHE_TTL: float = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+    AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+
+    # WebSocket fan-out (see sockets.py)
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+    WS_SLOW_CONSUMER_POLICY: str = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+    WS_SEND_TIMEOUT: float = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+    WS_REPLAY_BUFFER: int = int(os.getenv("WS_REPLAY_BUFFER", "1000"))
+    WS_MAX_COALESCE_MS: float = float(os.getenv("WS_MAX_COALESCE_MS", "5000"))
+
+    # Pub/sub between worker processes (see broker.py): "inprocess" or "unix"
+    # Use "unix" whenever uvicorn runs with more than one worker
+    BROKER: str = os.getenv("BROKER", "inprocess")
+    BROKER_DIR: str = os.getenv("BROKER_DIR", "")
+    BROKER_BATCH_MS: float = float(os.getenv("BROKER_BATCH_MS", "5"))
+    # Only the worker holding this file lock broadcasts SLA and hotspot events (see utils/leader.py)
+    LEADER_LOCK: str = os.getenv("LEADER_LOCK", "leader.lock")
+
+    # Instrumentation (see utils/metrics.py); Server-Timing exposes internal stage names to clients
+    METRICS_SERVER_TIMING: bool = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
+
+    # Priority admission in front of the model pipeline (see services/admission.py)
+    ADMISSION_CONCURRENCY: int = int(os.getenv("ADMISSION_CONCURRENCY", "2"))
+    ADMISSION_DEGRADE_QUEUE: int = int(os.getenv("ADMISSION_DEGRADE_QUEUE", "32"))
+    ADMISSION_DEGRADE_P95_MS: float = float(os.getenv("ADMISSION_DEGRADE_P95_MS", "5000"))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+    # Images of complaints whose vision pass was deferred, kept for scripts/reprocess_degraded.py
+    DEFERRED_UPLOAD_DIR: str = os.getenv("DEFERRED_UPLOAD_DIR", "deferred_uploads")
+
+    # Distilled complaint classifier (see ml/distilled.py): artifact directory or "latest"; unset = zero-shot BART
+    CLASSIFIER_HEAD: str = os.getenv("CLASSIFIER_HEAD", "")
+
+    # SLA deadline tracking and breach alerts (see services/sla.py)
+    # SLA_AT_RISK fires once this share of the resolution window remains
+    SLA_AT_RISK_FRACTION: float = float(os.getenv("SLA_AT_RISK_FRACTION", "0.2"))
+    SLA_REBUILD_PAGE: int = int(os.getenv("SLA_REBUILD_PAGE", "5000"))
+
+    # Streaming hotspot detection over new complaints (see services/hotspots.py)
+    HOTSPOT_CELL_METRES: float = float(os.getenv("HOTSPOT_CELL_METRES", "500"))
+    HOTSPOT_WINDOW_MINUTES: float = float(os.getenv("HOTSPOT_WINDOW_MINUTES", "60"))
+    HOTSPOT_BASELINE_HOURS: float = float(os.getenv("HOTSPOT_BASELINE_HOURS", "168"))
+    # A cell is a hotspot at this many recent complaints and this multiple of its baseline
+    HOTSPOT_MIN_COUNT: int = int(os.getenv("HOTSPOT_MIN_COUNT", "5"))
+    HOTSPOT_RATIO: float = float(os.getenv("HOTSPOT_RATIO", "3"))
+    # History replayed at startup to learn baselines
+    HOTSPOT_HISTORY_DAYS: float = float(os.getenv("HOTSPOT_HISTORY_DAYS", "21"))
+
+    # On-demand sampling profiler (GET /admin/profile, see utils/profiler.py)
+    PROFILER_MAX_SECONDS: float = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
 settings = Settings()
@@ -4,4 +4,6 @@ from config import settings
 url: str = settings.SUPABASE_URL
 key: str = settings.SUPABASE_KEY
 
+# Synchronous client for scripts and offline jobs.
+# Request handlers go through the async, pooled repositories in db/ instead.
 supabase: Client = create_client(url, key)
@@ -0,0 +1,4 @@
+from .pool import pool, DatabaseError
+from .complaints import complaints_repo
+from .users import users_repo
+from .analytics import analytics_repo
@@ -0,0 +1,58 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from db.pool import PostgrestPool, pool
+
+# Dimensions of the complaint_rollups table that can be broken down by
+DIMENSIONS = ("ward", "category", "urgency", "status")
+
+
+class AnalyticsRepository:
+    """Reads pre-aggregated counters from complaint_rollups via PostgREST RPC."""
+
+    def __init__(self, pool: PostgrestPool):
+        self.pool = pool
+
+    @staticmethod
+    def _args(since: Optional[date], until: Optional[date], filters: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        args = {
+            "p_since": since.isoformat() if since else None,
+            "p_until": until.isoformat() if until else None,
+        }
+        for dimension in DIMENSIONS:
+            args[f"p_{dimension}"] = filters.get(dimension)
+        return args
+
+    async def breakdown(
+        self,
+        dimension: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        limit: Optional[int] = None,
+        **filters: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        """Counts grouped by one dimension, largest first."""
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{dimension}'")
+        response = await self.pool.request(
+            "POST", "rpc/analytics_breakdown", "analytics.breakdown",
+            params={"limit": limit} if limit else None,
+            json={"p_dimension": dimension, **self._args(since, until, filters)},
+        )
+        return response.json()
+
+    async def timeseries(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        **filters: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        """Daily counts, oldest first."""
+        response = await self.pool.request(
+            "POST", "rpc/analytics_timeseries", "analytics.timeseries",
+            json=self._args(since, until, filters),
+        )
+        return response.json()
+
+
+analytics_repo = AnalyticsRepository(pool)
@@ -0,0 +1,339 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+from db.pool import PostgrestPool, parse_count, pool
+from db.versions import ChangeVersions
+from utils.cache import TTLCache
+from utils.metrics import registry
+
+TABLE = "complaints"
+
+# Every column except 'embedding' (384 floats serialized as text), which never leaves the backend
+COMPLAINT_COLUMNS = [
+    "id", "text", "category", "urgency", "department", "status", "timestamp",
+    "location", "image_url", "audio_url", "latitude", "longitude", "ward", "area",
+    "duplicate_group_id", "sla_eta", "sla_deadline", "duplicate_count", "user_id",
+    "rejection_reason", "resolution_note", "resolution_image_url", "degraded",
+]
+COMPLAINT_SELECT = ",".join(COMPLAINT_COLUMNS)
+
+# Keyset cursor columns; always selected so the next cursor can be built
+CURSOR_COLUMNS = ["timestamp", "id"]
+
+
+def _quote(value: str) -> str:
+    """Quote a value for use inside a PostgREST logical filter, e.g. or=(...)."""
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+def keyset_after(after: Tuple[str, str]) -> str:
+    """Filter for rows strictly after (timestamp, id) in 'timestamp desc, id desc' order."""
+    ts, row_id = _quote(after[0]), _quote(after[1])
+    return f"(timestamp.lt.{ts},and(timestamp.eq.{ts},id.lt.{row_id}))"
+
+
+# Equality filters of list queries; used to decide which cached lists a changed row can appear in
+_MATCH_FILTERS = ("department", "urgency", "status", "user_id", "ward")
+
+
+def _could_contain(filters: Dict[str, Any], row: Dict[str, Any]) -> bool:
+    for name in _MATCH_FILTERS:
+        wanted = filters.get(name)
+        if wanted and str(row.get(name)) != str(wanted):
+            return False
+    # Time ranges and cursors are treated as matching: a new row shifts every later page
+    return True
+
+
+class ComplaintRepository:
+    """
+    Typed async access to the 'complaints' table.
+    Single-complaint reads and list queries are served read-through from bounded TTL
+    caches; writes made through this repository invalidate exactly the affected entries.
+    """
+
+    def __init__(self, pool: PostgrestPool, cache_ttl: float = 30.0, max_items: int = 4096, max_lists: int = 256):
+        self.pool = pool
+        self.item_cache = TTLCache(max_items, cache_ttl)
+        # value: (filters, rows, ids in rows)
+        self.list_cache = TTLCache(max_lists, cache_ttl)
+        self.versions = ChangeVersions(max_age=cache_ttl)
+        # Set at startup to forward invalidations to other worker processes
+        self.on_invalidate: Optional[Callable[[List[Dict[str, Any]], bool], None]] = None
+
+    def invalidate(self, rows: Sequence[Dict[str, Any]], reassigned: bool = False, propagate: bool = True):
+        """
+        Drop cached entries a changed row affects: its own entry, any list that
+        contained it, and any list whose filters it now matches.
+        Also bumps the change versions behind list ETags.
+        """
+        if not rows:
+            return
+        if propagate and self.on_invalidate is not None:
+            # Only the fields invalidation looks at
+            self.on_invalidate([{k: row.get(k) for k in ("id",) + _MATCH_FILTERS} for row in rows], reassigned)
+        self.versions.bump((row.get("department") for row in rows), all_departments=reassigned)
+        ids = {str(row["id"]) for row in rows if row.get("id")}
+        for complaint_id in ids:
+            self.item_cache.delete(complaint_id)
+
+        def affected(key, value) -> bool:
+            filters, _, member_ids = value
+            return bool(member_ids & ids) or any(_could_contain(filters, row) for row in rows)
+
+        self.list_cache.delete_where(affected)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"items": self.item_cache.stats(), "lists": self.list_cache.stats()}
+
+    async def insert_complaint(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self.pool.request(
+            "POST", TABLE, "complaints.insert",
+            params={"select": COMPLAINT_SELECT},
+            json=data, prefer=["return=representation"],
+        )
+        rows = response.json()
+        self.invalidate(rows)
+        return rows[0] if rows else None
+
+    async def insert_complaint_once(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Idempotent insert keyed by data['id'].
+        A redelivered insert leaves the stored row untouched and returns it.
+        """
+        response = await self.pool.request(
+            "POST", TABLE, "complaints.insert_once",
+            params={"select": COMPLAINT_SELECT, "on_conflict": "id"},
+            json=data, prefer=["return=representation", "resolution=ignore-duplicates"],
+        )
+        rows = response.json()
+        if rows:
+            self.invalidate(rows)
+            return rows[0]
+        return await self.get_complaint(data["id"])
+
+    async def insert_complaints(self, rows: List[Dict[str, Any]], chunk_size: int = 500) -> int:
+        """Bulk insert in chunks, one round trip (and one transaction) per chunk. Returns rows written."""
+        written = 0
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            await self.pool.request(
+                "POST", TABLE, "complaints.insert_bulk",
+                json=chunk, prefer=["return=minimal"],
+            )
+            self.invalidate(chunk)
+            written += len(chunk)
+        return written
+
+    async def get_complaint(self, complaint_id: str) -> Optional[Dict[str, Any]]:
+        cached = self.item_cache.get(complaint_id)
+        if cached is not None:
+            return cached
+
+        response = await self.pool.request(
+            "GET", TABLE, "complaints.get",
+            params={"select": COMPLAINT_SELECT, "id": f"eq.{complaint_id}", "limit": 1},
+        )
+        rows = response.json()
+        if not rows:
+            return None
+        self.item_cache.set(complaint_id, rows[0])
+        return rows[0]
+
+    async def list_complaints(
+        self,
+        department: Optional[str] = None,
+        urgency: Optional[str] = None,
+        status: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str, str]] = None,
+        fields: Optional[Sequence[str]] = None,
+        ward: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        List complaints newest first using keyset pagination on (timestamp, id).
+        'fields' narrows the projection; cursor columns are always included.
+        """
+        filters = {
+            "department": department, "urgency": urgency, "status": status, "user_id": user_id,
+            "ward": ward, "since": since, "until": until,
+        }
+        cache_key = None
+        if use_cache:
+            cache_key = (tuple(sorted(filters.items())), limit, after, tuple(fields) if fields else None)
+            cached = self.list_cache.get(cache_key)
+            if cached is not None:
+                return cached[1]
+
+        columns = COMPLAINT_COLUMNS
+        if fields:
+            columns = CURSOR_COLUMNS + [f for f in fields if f not in CURSOR_COLUMNS]
+
+        params = [("select", ",".join(columns))]
+        if department: params.append(("department", f"eq.{department}"))
+        if urgency: params.append(("urgency", f"eq.{urgency}"))
+        if status: params.append(("status", f"eq.{status}"))
+        if user_id: params.append(("user_id", f"eq.{user_id}"))
+        if ward: params.append(("ward", f"eq.{ward}"))
+        if since: params.append(("timestamp", f"gte.{since}"))
+        if until: params.append(("timestamp", f"lt.{until}"))
+        if after: params.append(("or", keyset_after(after)))
+        params.append(("order", "timestamp.desc,id.desc"))
+        if limit: params.append(("limit", limit))
+
+        response = await self.pool.request("GET", TABLE, "complaints.list", params=params)
+        rows = response.json()
+        if cache_key is not None:
+            self.list_cache.set(cache_key, (filters, rows, frozenset(str(row["id"]) for row in rows)))
+        return rows
+
+    async def iter_complaints(self, page_size: int = 1000, **filters: Any) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the filtered table page by page (newest first) using the keyset cursor,
+        so callers can walk millions of rows with one page in memory.
+        """
+        after = None
+        while True:
+            rows = await self.list_complaints(limit=page_size, after=after, use_cache=False, **filters)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]["timestamp"], rows[-1]["id"])
+
+    async def update_complaint(self, complaint_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self.pool.request(
+            "PATCH", TABLE, "complaints.update",
+            params={"select": COMPLAINT_SELECT, "id": f"eq.{complaint_id}"},
+            json=changes, prefer=["return=representation"],
+        )
+        rows = response.json()
+        self.invalidate(rows, reassigned="department" in changes)
+        if not rows:
+            return None
+        self.item_cache.set(complaint_id, rows[0])
+        return rows[0]
+
+    async def find_complaints(self, selection: Sequence[Tuple[str, str]], fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """'fields' of every row matching the PostgREST filters; bypasses the caches."""
+        response = await self.pool.request(
+            "GET", TABLE, "complaints.find",
+            params=[("select", ",".join(dict.fromkeys(["id", *fields]))), *selection],
+        )
+        return response.json()
+
+    async def update_complaints(
+        self, selection: Sequence[Tuple[str, str]], changes: Dict[str, Any], fields: Sequence[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Apply the same changes to every row matching the PostgREST filters in one
+        set-based PATCH, returning 'fields' of the updated rows.
+        """
+        if not selection:
+            raise ValueError("Refusing to update complaints without a filter")
+        columns = list(dict.fromkeys(["id", *_MATCH_FILTERS, *fields]))
+        response = await self.pool.request(
+            "PATCH", TABLE, "complaints.update_many",
+            params=[("select", ",".join(columns)), *selection],
+            json=changes, prefer=["return=representation"],
+        )
+        rows = response.json()
+        self.invalidate(rows, reassigned="department" in changes)
+        return rows
+
+    async def degraded_page(self, after_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Next page of complaints analysed in degraded mode, in id order."""
+        params = [
+            ("select", "id,text,latitude,longitude,image_url,urgency,department,status,timestamp"),
+            ("degraded", "is.true"),
+            ("order", "id"),
+            ("limit", limit),
+        ]
+        if after_id:
+            params.append(("id", f"gt.{after_id}"))
+        response = await self.pool.request("GET", TABLE, "complaints.degraded_page", params=params)
+        return response.json()
+
+    async def iter_labelled(self, page_size: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Every complaint with its text, labels and stored embedding, in id order.
+        Training export for scripts/train_classifier.py; bypasses the caches.
+        """
+        after_id = None
+        while True:
+            params = [
+                ("select", "id,text,category,urgency,department,status,degraded,embedding"),
+                ("category", "not.is.null"),
+                ("order", "id"),
+                ("limit", page_size),
+            ]
+            if after_id:
+                params.append(("id", f"gt.{after_id}"))
+            response = await self.pool.request("GET", TABLE, "complaints.iter_labelled", params=params)
+            rows = response.json()
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after_id = rows[-1]["id"]
+
+    async def iter_open(self, page_size: int = 5000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Every unresolved complaint with what the SLA tracker needs, in id order.
+        Startup rebuild for services/sla.py; bypasses the caches.
+        """
+        after_id = None
+        while True:
+            params = [
+                ("select", "id,urgency,department,ward,category,status,timestamp,sla_deadline"),
+                ("status", "not.in.(resolved,rejected)"),
+                ("order", "id"),
+                ("limit", page_size),
+            ]
+            if after_id:
+                params.append(("id", f"gt.{after_id}"))
+            response = await self.pool.request("GET", TABLE, "complaints.iter_open", params=params)
+            rows = response.json()
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after_id = rows[-1]["id"]
+
+    async def count_duplicates(self, duplicate_group_id: str) -> int:
+        response = await self.pool.request(
+            "GET", TABLE, "complaints.count_duplicates",
+            params={"select": "id", "duplicate_group_id": f"eq.{duplicate_group_id}", "limit": 1},
+            prefer=["count=exact"],
+        )
+        return parse_count(response)
+
+    async def recent_by_category(self, category: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Latest complaints in a category with their embeddings, used as dedup candidates."""
+        response = await self.pool.request(
+            "GET", TABLE, "complaints.recent_by_category",
+            params={
+                "select": "id,text,embedding,duplicate_group_id",
+                "category": f"eq.{category}",
+                "order": "timestamp.desc",
+                "limit": limit,
+            },
+        )
+        return response.json()
+
+
+complaints_repo = ComplaintRepository(
+    pool,
+    cache_ttl=settings.CACHE_TTL_SECONDS,
+    max_items=settings.CACHE_MAX_ITEMS,
+    max_lists=settings.CACHE_MAX_LISTS,
+)
+
+registry.gauge(
+    "cache_hit_ratio", "Hit ratio of the complaint read-through caches.",
+    lambda: {name: stats["hit_ratio"] for name, stats in complaints_repo.cache_stats().items()}, label="cache",
+)
@@ -0,0 +1,150 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+from config import settings
+from utils.metrics import add_timing, registry
+
+# Query params may repeat a key (e.g. two filters on "timestamp"), so accept tuples too
+Params = Union[Dict[str, Any], Sequence[Tuple[str, Any]]]
+
+
+class DatabaseError(Exception):
+    """Raised when PostgREST answers with an error status."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"Database error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+query_seconds = registry.histogram("db_query_duration_seconds", "PostgREST round trip time by query.")
+query_errors = registry.counter("db_query_errors", "PostgREST requests that failed or returned an error status.")
+
+
+class QueryStats:
+    """Per-query timing, keyed by a short label such as 'complaints.list'."""
+
+    def __init__(self, slow_query_ms: float):
+        self.slow_query_ms = slow_query_ms
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, label: str, elapsed_ms: float, ok: bool):
+        entry = self._stats.setdefault(label, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        if not ok:
+            entry["errors"] += 1
+            query_errors.inc(query=label)
+        query_seconds.observe(elapsed_ms / 1000, query=label)
+        add_timing("db", elapsed_ms / 1000)
+        if elapsed_ms >= self.slow_query_ms:
+            print(f" [DB] Slow query {label}: {elapsed_ms:.0f}ms")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            label: {**entry, "avg_ms": entry["total_ms"] / entry["count"] if entry["count"] else 0.0}
+            for label, entry in self._stats.items()
+        }
+
+
+class PostgrestPool:
+    """
+    Async, keep-alive connection pool to Supabase's PostgREST API.
+    One instance is shared by every request handler; it is opened on app startup
+    and closed on shutdown, but will lazily open itself if used earlier (scripts).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        pool_size: int = 20,
+        keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        query_timeout: float = 10.0,
+        pool_timeout: float = 5.0,
+        slow_query_ms: float = 500.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = f"{(base_url or '').rstrip('/')}/rest/v1"
+        self.api_key = api_key
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(query_timeout, connect=connect_timeout, pool=pool_timeout)
+        self.transport = transport
+        self.stats = QueryStats(slow_query_ms)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def use_transport(self, transport: httpx.AsyncBaseTransport):
+        """Swap the underlying transport (e.g. an in-process fake). Must be called before start()."""
+        self.transport = transport
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "apikey": self.api_key or "",
+                    "Authorization": f"Bearer {self.api_key or ''}",
+                },
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self,
+        method: str,
+        table: str,
+        label: str,
+        params: Optional[Params] = None,
+        json: Any = None,
+        prefer: Optional[List[str]] = None,
+    ) -> httpx.Response:
+        if self._client is None:
+            await self.start()
+
+        headers = {"Prefer": ",".join(prefer)} if prefer else None
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = await self._client.request(method, f"/{table}", params=params, json=json, headers=headers)
+            ok = response.status_code < 400
+        finally:
+            self.stats.record(label, (time.perf_counter() - started) * 1000, ok)
+
+        if not ok:
+            raise DatabaseError(response.status_code, response.text)
+        return response
+
+
+def parse_count(response: httpx.Response) -> int:
+    """Read the total from a 'Content-Range: 0-24/3573' header (requires Prefer: count=exact)."""
+    content_range = response.headers.get("content-range", "")
+    total = content_range.rsplit("/", 1)[-1]
+    return int(total) if total.isdigit() else 0
+
+
+pool = PostgrestPool(
+    settings.SUPABASE_URL,
+    settings.SUPABASE_KEY,
+    pool_size=settings.DB_POOL_SIZE,
+    keepalive=settings.DB_POOL_KEEPALIVE,
+    keepalive_expiry=settings.DB_KEEPALIVE_EXPIRY,
+    connect_timeout=settings.DB_CONNECT_TIMEOUT,
+    query_timeout=settings.DB_QUERY_TIMEOUT,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    slow_query_ms=settings.DB_SLOW_QUERY_MS,
+)
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Optional
+
+from config import settings
+from db.pool import PostgrestPool, pool
+from utils.cache import TTLCache
+
+TABLE = "users"
+
+
+class UserRepository:
+    """
+    Typed async access to the 'users' table.
+    Lookups by email are cached briefly so repeated logins skip the round trip;
+    only found users are cached, so a fresh registration is visible immediately.
+    """
+
+    def __init__(self, pool: PostgrestPool, cache_ttl: float = 60, max_items: int = 1024):
+        self.pool = pool
+        self.cache = TTLCache(max_items, cache_ttl)
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        cached = self.cache.get(email)
+        if cached is not None:
+            return cached
+        response = await self.pool.request(
+            "GET", TABLE, "users.get_by_email",
+            params={"select": "*", "email": f"eq.{email}", "limit": 1},
+        )
+        rows = response.json()
+        if not rows:
+            return None
+        self.cache.set(email, rows[0])
+        return rows[0]
+
+    async def insert_user(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        self.cache.delete(data.get("email"))
+        response = await self.pool.request(
+            "POST", TABLE, "users.insert",
+            json=data, prefer=["return=representation"],
+        )
+        rows = response.json()
+        return rows[0] if rows else None
+
+
+users_repo = UserRepository(pool, cache_ttl=settings.AUTH_USER_CACHE_TTL, max_items=settings.AUTH_USER_CACHE_SIZE)
@@ -0,0 +1,45 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable
+
+
+class ChangeVersions:
+    """
+    Monotonic change counters: one global and one per department.
+    They are bumped on every write made through the repository, so a list's
+    version can be checked without querying the database. The epoch changes
+    on every process start, so counters that restart at zero never repeat an ETag.
+
+    Writes this process never hears about (scripts, SQL, a dropped broker message)
+    do not bump the counters, so every token also carries the current 'max_age'
+    time bucket: a missed bump can serve stale 304s for at most 'max_age' seconds,
+    the same bound the read-through caches already have.
+    """
+
+    def __init__(self, max_age: float = 30.0):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._global = 0
+        self._by_department: Dict[str, int] = defaultdict(int)
+
+    def bump(self, departments: Iterable[str], all_departments: bool = False):
+        with self._lock:
+            self._global += 1
+            if all_departments:
+                # Reassignment: the row left a department we may not know about
+                for department in list(self._by_department):
+                    self._by_department[department] += 1
+                self._by_department["*"] += 1
+            for department in set(departments):
+                self._by_department[department] += 1
+
+    def current(self, department: str = None) -> str:
+        """Version token for everything, or for one department's view."""
+        bucket = int(time.time() // self.max_age)
+        with self._lock:
+            if department is None:
+                return f"{self.epoch}.{bucket}.{self._global}"
+            return f"{self.epoch}.{bucket}.{self._by_department['*']}.{self._by_department[department]}"
@@ -1,9 +1,22 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from utils.compression import CompressionMiddleware
+from utils.metrics import TimingMiddleware, registry
 import os
+from typing import Optional
 from dotenv import load_dotenv
-from routes import auth, complaints, voice
+from routes import auth, complaints, voice, analytics, admin
 from sockets import manager
+from broker import broker
+from db import pool, complaints_repo, users_repo
+from auth.jwt_handler import token_cache_stats
+from workers import outbox, enrichment_workers
+from services.admission import admission
+from services.sla import sla_tracker
+from services.hotspots import hotspot_detector
+from utils.leader import leader
+from config import settings
 
 load_dotenv()
 
@@ -22,11 +35,72 @@ app.add_middleware(
     allow_credentials=False, # JWT auth doesn't need credentials/cookies
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+# Negotiated br/gzip for large JSON bodies (dashboard list and analytics payloads)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Request latency per route, and the per-stage breakdown as Server-Timing when enabled
+app.add_middleware(TimingMiddleware, server_timing=settings.METRICS_SERVER_TIMING)
+
+@app.on_event("startup")
+async def open_db_pool():
+    await pool.start()
+
+@app.on_event("startup")
+async def start_broker():
+    await broker.start()
+    # Writes in another worker invalidate this worker's complaint caches and ETags too
+    broker.subscribe("cache", lambda event: complaints_repo.invalidate(event["rows"], event["reassigned"], propagate=False))
+    complaints_repo.on_invalidate = lambda rows, reassigned: broker.publish(
+        "cache", {"rows": rows, "reassigned": reassigned}, local=False
+    )
+
+@app.on_event("startup")
+async def start_sla_tracker():
+    # Rebuilds from the database in the background; the at-risk query reports 'ready'
+    sla_tracker.start()
+
+@app.on_event("startup")
+async def start_hotspot_detector():
+    # Replays recent history to learn per-cell baselines, then follows new complaints
+    hotspot_detector.start()
+
+@app.on_event("startup")
+async def start_enrichment_workers():
+    pruned = outbox.prune(settings.OUTBOX_RETENTION_HOURS * 3600)
+    if pruned:
+        print(f" [INGEST] Pruned {pruned} finished outbox jobs.")
+    enrichment_workers.start()
+
+@app.on_event("shutdown")
+async def stop_enrichment_workers():
+    await enrichment_workers.stop()
+
+@app.on_event("shutdown")
+async def stop_sla_tracker():
+    await sla_tracker.stop()
+
+@app.on_event("shutdown")
+async def stop_hotspot_detector():
+    await hotspot_detector.stop()
+    # Hand event broadcasting to another worker right away
+    leader.release()
+
+@app.on_event("shutdown")
+async def close_broker():
+    await broker.close()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await pool.close()
+
 app.include_router(auth.router)
 app.include_router(complaints.router)
+app.include_router(analytics.router)
 app.include_router(voice.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -41,15 +115,54 @@ async def root():
 async def health_check():
     return {"status": "ok", "message": "CivicSense API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: stage/DB/request histograms, counters and queue depths."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/db")
+async def db_health():
+    """Per-query timing collected by the async DB pool."""
+    return {"queries": pool.stats.snapshot()}
+
+@app.get("/health/cache")
+async def cache_health():
+    """Hit ratio and eviction stats of the complaint and auth caches."""
+    return {
+        **complaints_repo.cache_stats(),
+        "users": users_repo.cache.stats(),
+        "tokens": token_cache_stats(),
+    }
+
+@app.get("/health/ws")
+async def ws_health():
+    """Connected clients per channel and slow-consumer drop counts."""
+    return manager.stats()
+
+@app.get("/health/admission")
+async def admission_health():
+    """Inference queue depth, recent p95 and whether low-priority work is degraded."""
+    return admission.stats()
+
+@app.get("/health/sla")
+async def sla_health():
+    """Open complaints tracked, how many are overdue, and whether this worker fires SLA events."""
+    return sla_tracker.stats()
+
 @app.websocket("/ws/{channel}")
-async def websocket_endpoint(websocket: WebSocket, channel: str):
-    await manager.connect(websocket, channel)
+async def websocket_endpoint(websocket: WebSocket, channel: str, since: Optional[int] = None, epoch: Optional[str] = None):
+    # Reconnecting clients pass the last seq/epoch they saw to receive only what they missed
+    connection = await manager.connect(websocket, channel, since=since, epoch=epoch)
     try:
         while True:
-            # Keep connection alive, though we mainly broadcast
+            # SUBSCRIBE control messages; anything else just keeps the connection alive
             data = await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, channel)
+            manager.handle_message(connection, data)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the writer already reaped and closed this socket
+        pass
+    finally:
+        manager.disconnect(connection)
 
 if __name__ == "__main__":
     import uvicorn
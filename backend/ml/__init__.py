@@ -1,3 +1,14 @@
-from .classifier import classify_complaint
-from .urgency import calculate_urgency
-from .router import route_complaint
+# Each submodule loads its model at import, so the package re-exports lazily:
+# importing ml.duplicates (or anything light) does not pull in BART and DistilBERT.
+_EXPORTS = {
+    "classify_complaint": "classifier",
+    "calculate_urgency": "urgency",
+    "route_complaint": "router",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
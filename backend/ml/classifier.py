@@ -1,9 +1,10 @@
 from transformers import pipeline
-from typing import List
+from typing import List, Optional
+import re
 
-# Use BART-large-MNLI for zero-shot classification
-# This model is robust for classifying text into arbitrary labels without fine-tuning
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+from config import settings
+from ml.keywords import CATEGORY_KEYWORDS
+from ml.distilled import find_artifact, load_artifact
 
 # Define the candidate labels based on the project requirements
 CANDIDATE_LABELS = [
@@ -16,12 +17,34 @@ CANDIDATE_LABELS = [
     "other"
 ]
 
-def classify_complaint(text: str) -> dict:
+# A distilled head over MiniLM embeddings (see scripts/train_classifier.py) replaces the
+# zero-shot model when CLASSIFIER_HEAD is set; BART is then never loaded
+_head_path = find_artifact(settings.CLASSIFIER_HEAD)
+head = load_artifact(_head_path) if _head_path else None
+if head is not None:
+    unknown = set(head.labels) - set(CANDIDATE_LABELS)
+    if unknown:
+        raise ValueError(f"Classifier head {_head_path} has unknown labels: {sorted(unknown)}")
+    print(f"Loaded distilled classifier head v{head.version} from {_head_path}")
+    classifier = None
+else:
+    # Use BART-large-MNLI for zero-shot classification
+    # This model is robust for classifying text into arbitrary labels without fine-tuning
+    classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+
+def classify_complaint(text: str, embedding: Optional[List[float]] = None) -> dict:
     """
     Classifies the complaint text into one of the predefined categories.
     Returns a dictionary with the label and confidence score.
+    With the distilled head, a precomputed MiniLM 'embedding' of the text skips re-encoding.
     """
     try:
+        if head is not None:
+            if embedding is None:
+                from ml.duplicates import get_embedding
+                embedding = get_embedding(text)
+            return head.predict([embedding])[0]
+
         # Perform classification
         result = classifier(text, CANDIDATE_LABELS)
         
@@ -40,3 +63,42 @@ def classify_complaint(text: str) -> dict:
             "category": "other",
             "confidence": 0.0
         }
+
+def classify_by_keywords(text: str) -> dict:
+    """
+    Cheap fallback used when inference is degraded: the category with the most keyword hits.
+    Confidence is that category's share of all hits, 0.0 (and 'other') when nothing matched.
+    """
+    text_lower = text.lower()
+    hits = {
+        category: sum(1 for word in words if re.search(r'\b' + re.escape(word) + r's?\b', text_lower))
+        for category, words in CATEGORY_KEYWORDS.items()
+    }
+    total = sum(hits.values())
+    if not total:
+        return {"category": "other", "confidence": 0.0}
+    category = max(hits, key=hits.get)
+    return {"category": category, "confidence": hits[category] / total}
+
+def classify_complaints(
+    texts: List[str], batch_size: int = 8, embeddings: Optional[List[List[float]]] = None
+) -> List[dict]:
+    """
+    Batch variant of classify_complaint: one pipeline call for the whole list.
+    With the distilled head, precomputed MiniLM 'embeddings' of the texts skip re-encoding.
+    """
+    if not texts:
+        return []
+    try:
+        if head is not None:
+            if embeddings is None:
+                from ml.duplicates import get_embeddings
+                embeddings = get_embeddings(texts)
+            return head.predict(embeddings)
+        results = classifier(texts, CANDIDATE_LABELS, batch_size=batch_size)
+        if isinstance(results, dict):
+            results = [results]
+        return [{"category": r["labels"][0], "confidence": r["scores"][0]} for r in results]
+    except Exception as e:
+        print(f"Error during batch classification: {e}")
+        return [{"category": "other", "confidence": 0.0} for _ in texts]
@@ -0,0 +1,95 @@
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import torch
+
+# Artifacts live in <root>/<name>-v<N>/ as head.pt (state dict) + meta.json
+ARTIFACT_ROOT = os.path.join(os.path.dirname(__file__), "artifacts")
+ARTIFACT_NAME = "complaint-head"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+class ComplaintHead(torch.nn.Module):
+    """
+    Softmax classifier over sentence embeddings: linear when hidden=0, otherwise
+    one ReLU hidden layer. Embeddings are L2-normalised first, matching how
+    MiniLM vectors are compared everywhere else.
+    """
+
+    def __init__(self, dim: int, labels: Sequence[str], hidden: int = 0, dropout: float = 0.1):
+        super().__init__()
+        self.labels = list(labels)
+        self.hidden = hidden
+        if hidden:
+            self.net = torch.nn.Sequential(
+                torch.nn.Linear(dim, hidden), torch.nn.ReLU(), torch.nn.Dropout(dropout),
+                torch.nn.Linear(hidden, len(self.labels)),
+            )
+        else:
+            self.net = torch.nn.Linear(dim, len(self.labels))
+
+    def forward(self, embeddings: torch.Tensor) -> torch.Tensor:
+        return self.net(torch.nn.functional.normalize(embeddings, dim=-1))
+
+    @torch.inference_mode()
+    def predict(self, embeddings: Sequence[Sequence[float]]) -> List[Dict[str, Any]]:
+        probabilities = torch.softmax(self(torch.as_tensor(embeddings, dtype=torch.float32)), dim=-1)
+        scores, indices = probabilities.max(dim=-1)
+        return [
+            {"category": self.labels[int(i)], "confidence": float(s)}
+            for s, i in zip(scores, indices)
+        ]
+
+
+def next_version(root: str = ARTIFACT_ROOT) -> int:
+    versions = [
+        int(match.group(1))
+        for entry in (os.listdir(root) if os.path.isdir(root) else [])
+        for match in [re.fullmatch(rf"{ARTIFACT_NAME}-v(\d+)", entry)] if match
+    ]
+    return max(versions, default=0) + 1
+
+
+def save_artifact(head: ComplaintHead, dim: int, metrics: Dict[str, Any], root: str = ARTIFACT_ROOT) -> str:
+    version = next_version(root)
+    path = os.path.join(root, f"{ARTIFACT_NAME}-v{version}")
+    os.makedirs(path)
+    torch.save(head.state_dict(), os.path.join(path, "head.pt"))
+    meta = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": EMBEDDING_MODEL,
+        "dim": dim,
+        "hidden": head.hidden,
+        "labels": head.labels,
+        "metrics": metrics,
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+def load_artifact(path: str) -> ComplaintHead:
+    """Load a head saved by save_artifact. 'path' is the versioned directory."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["embedding_model"] != EMBEDDING_MODEL:
+        raise ValueError(f"Artifact was trained on {meta['embedding_model']}, expected {EMBEDDING_MODEL}")
+    head = ComplaintHead(meta["dim"], meta["labels"], hidden=meta["hidden"])
+    head.load_state_dict(torch.load(os.path.join(path, "head.pt"), map_location="cpu", weights_only=True))
+    head.eval()
+    head.version = meta["version"]
+    return head
+
+
+def find_artifact(spec: Optional[str], root: str = ARTIFACT_ROOT) -> Optional[str]:
+    """'latest' picks the highest version under root; anything else is a path."""
+    if not spec:
+        return None
+    if spec == "latest":
+        version = next_version(root) - 1
+        return os.path.join(root, f"{ARTIFACT_NAME}-v{version}") if version else None
+    return spec
@@ -1,6 +1,6 @@
 from sentence_transformers import SentenceTransformer, util
 import torch
-from typing import List, Optional
+from typing import Dict, List, Optional
 from database import supabase
 
 # Load a lightweight model (384-dimensional embeddings)
@@ -16,22 +16,67 @@ def get_embedding(text: str) -> List[float]:
     embedding = model.encode(text, convert_to_tensor=False)
     return embedding.tolist()
 
+def get_embeddings(texts: List[str], batch_size: int = 32) -> List[List[float]]:
+    """
+    Batch variant of get_embedding.
+    """
+    if not texts:
+        return []
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_tensor=False)
+    return embeddings.tolist()
+
+def match_duplicate(embedding: List[float], candidates: List[dict], threshold: float = 0.85) -> Optional[str]:
+    """
+    Compare an embedding against candidate complaint records (id, embedding, duplicate_group_id).
+    Returns the duplicate_group_id (or existing complaint ID) of the first match above threshold.
+    """
+    for record in candidates:
+        emb = record.get("embedding")
+        if not emb:
+            continue
+            
+        # SUPREME DEFENSE: Ensure emb is a list of floats
+        try:
+            if isinstance(emb, str):
+                import json
+                emb = json.loads(emb)
+            
+            # If it's a list, ensure elements are floats (not strings from a bad parse)
+            if isinstance(emb, list):
+                emb = [float(x) for x in emb]
+            else:
+                print(f"Skipping record {record['id']} - unknown embedding type: {type(emb)}")
+                continue
+        except Exception as parse_err:
+            print(f"Failed to parse embedding for {record['id']}: {parse_err}")
+            continue
+        
+        # Compare embeddings
+        try:
+            # Ensure both are tensors of same dtype
+            t1 = torch.tensor(embedding, dtype=torch.float32)
+            t2 = torch.tensor(emb, dtype=torch.float32)
+            score = util.cos_sim(t1, t2)
+            
+            if score > threshold:
+                return record.get("duplicate_group_id") or record["id"]
+        except Exception as tensor_err:
+            print(f"Tensor comparison failed for {record['id']}: {tensor_err}")
+            continue
+            
+    return None
+
 def find_duplicate_group(text: str, category: str, threshold: float = 0.85) -> Optional[str]:
     """
     Search Supabase for visually/semantically similar complaints within the same category.
     Returns the duplicate_group_id (or existing complaint ID) if match found.
+    Request handlers fetch candidates asynchronously and call match_duplicate directly.
     """
     try:
         # Generate embedding for current complaint
         current_embedding = get_embedding(text)
         
-        # Query Supabase using pgvector similarity
-        # We look for complaints in the same category within the last 7 days
-        # We use a raw SQL-like approach via RPC or direct match if possible
-        # However, standard Supabase python client doesn't support vector search easily 
-        # without an RPC function. Let's assume we have an RPC 'match_complaints'.
-        
-        # If not using RPC, we can fetch candidates and compare in-memory (slower but works for MVP)
+        # Fetch recent candidates in the same category and compare in-memory (slower but works for MVP)
         response = supabase.table("complaints") \
             .select("id, text, embedding, duplicate_group_id") \
             .eq("category", category) \
@@ -42,44 +87,65 @@ def find_duplicate_group(text: str, category: str, threshold: float = 0.85) -> O
         if not response.data:
             return None
             
-        for record in response.data:
-            emb = record.get("embedding")
-            if not emb:
-                continue
-                
-            # SUPREME DEFENSE: Ensure emb is a list of floats
-            try:
-                if isinstance(emb, str):
-                    import json
-                    emb = json.loads(emb)
-                
-                # If it's a list, ensure elements are floats (not strings from a bad parse)
-                if isinstance(emb, list):
-                    emb = [float(x) for x in emb]
-                else:
-                    print(f"Skipping record {record['id']} - unknown embedding type: {type(emb)}")
-                    continue
-            except Exception as parse_err:
-                print(f"Failed to parse embedding for {record['id']}: {parse_err}")
-                continue
-            
-            # Compare embeddings
-            try:
-                # Ensure both are tensors of same dtype
-                t1 = torch.tensor(current_embedding, dtype=torch.float32)
-                t2 = torch.tensor(emb, dtype=torch.float32)
-                score = util.cos_sim(t1, t2)
-                
-                if score > threshold:
-                    return record.get("duplicate_group_id") or record["id"]
-            except Exception as tensor_err:
-                print(f"Tensor comparison failed for {record['id']}: {tensor_err}")
-                continue
-                
-        return None
+        return match_duplicate(current_embedding, response.data, threshold)
         
     except Exception as e:
         import traceback
         print(f"Deduplication CRITICAL error: {e}")
         traceback.print_exc()
         return None
+
+def _parse_embedding(emb) -> Optional[List[float]]:
+    try:
+        if isinstance(emb, str):
+            import json
+            emb = json.loads(emb)
+        if isinstance(emb, list):
+            return [float(x) for x in emb]
+    except Exception:
+        pass
+    return None
+
+def group_duplicates(
+    ids: List[str],
+    embeddings: List[List[float]],
+    categories: List[str],
+    candidates_by_category: Dict[str, List[dict]],
+    threshold: float = 0.85,
+) -> List[Optional[str]]:
+    """
+    Batch deduplication. Each item is matched first against existing complaints of its
+    category (as match_duplicate would), then against earlier items of the same batch.
+    Returns the duplicate_group_id per item (None for a new signal).
+    """
+    if not ids:
+        return []
+    batch = util.normalize_embeddings(torch.tensor(embeddings, dtype=torch.float32))
+    groups: List[Optional[str]] = [None] * len(ids)
+
+    # Against existing data: one similarity matrix per category
+    for category in set(categories):
+        candidates = [c for c in candidates_by_category.get(category, []) if _parse_embedding(c.get("embedding"))]
+        if not candidates:
+            continue
+        members = [i for i, c in enumerate(categories) if c == category]
+        existing = util.normalize_embeddings(torch.tensor(
+            [_parse_embedding(c["embedding"]) for c in candidates], dtype=torch.float32
+        ))
+        scores = batch[members] @ existing.T
+        for row, i in enumerate(members):
+            above = (scores[row] > threshold).nonzero()
+            if len(above):
+                record = candidates[int(above[0])]
+                groups[i] = record.get("duplicate_group_id") or record["id"]
+
+    # Within the batch: join the group of the first earlier match
+    scores = batch @ batch.T
+    for i in range(len(ids)):
+        if groups[i] is not None:
+            continue
+        for j in range(i):
+            if categories[j] == categories[i] and scores[i, j] > threshold:
+                groups[i] = groups[j] or ids[j]
+                break
+    return groups
@@ -0,0 +1,30 @@
+# Kept apart from ml/urgency.py so callers can use the lists without loading the sentiment model
+
+# Keywords that indicate high urgency or danger
+# Focused on life safety, immediate hazards, and severe infrastructure failure
+CRITICAL_KEYWORDS = [
+    "fire", "explosion", "spark", "electric shock", "wire exposed", "fallen", 
+    "blood", "injury", "accident", "collapse", "drowning", "flood", 
+    "gas leak", "attack", "fight", "weapon", "emergency", "school"
+]
+
+HIGH_KEYWORDS = [
+    "blocked", "stuck", "broken", "overflow", "sewage", "stench", 
+    "dark", "unsafe", "robbery", "theft", "crash", "urgent", "immediate"
+]
+
+MEDIUM_KEYWORDS = [
+    "pothole", "garbage", "litter", "water leak", "no water", 
+    "streetlight", "sign", "traffic jam", "noise", "dirty"
+]
+
+# Category cues for the keyword-only classifier used when inference is degraded under load.
+# Cues match whole words with an optional plural 's'; other inflections are listed explicitly.
+CATEGORY_KEYWORDS = {
+    "sanitation": ["garbage", "litter", "sewage", "drain", "drainage", "dustbin", "waste", "toilet", "stench", "dirty", "dump"],
+    "roads_infra": ["pothole", "road", "footpath", "pavement", "bridge", "speed breaker", "manhole", "crack"],
+    "water": ["water", "pipeline", "tap", "leak", "leaking", "leakage", "supply", "tanker"],
+    "electricity": ["electric", "electricity", "electrical", "power", "streetlight", "light", "wire", "wiring", "transformer", "outage"],
+    "safety": ["unsafe", "theft", "robbery", "fight", "harassment", "attack", "weapon", "dog", "collapse"],
+    "traffic": ["traffic", "signal", "parking", "jam", "hawker", "congestion", "bus", "buses"],
+}
@@ -1,54 +1,47 @@
 from transformers import pipeline
+from typing import List, Optional
 import re
 
+from ml.keywords import CRITICAL_KEYWORDS, HIGH_KEYWORDS, MEDIUM_KEYWORDS
+
 # Use a lightweight model for sentiment analysis to gauge negativity/stress
 sentiment_analyzer = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
 
-# Keywords that indicate high urgency or danger
-# Focused on life safety, immediate hazards, and severe infrastructure failure
-CRITICAL_KEYWORDS = [
-    "fire", "explosion", "spark", "electric shock", "wire exposed", "fallen", 
-    "blood", "injury", "accident", "collapse", "drowning", "flood", 
-    "gas leak", "attack", "fight", "weapon", "emergency", "school"
-]
-
-HIGH_KEYWORDS = [
-    "blocked", "stuck", "broken", "overflow", "sewage", "stench", 
-    "dark", "unsafe", "robbery", "theft", "crash", "urgent", "immediate"
-]
+def _find_keyword(text_lower: str, keywords: List[str]) -> Optional[str]:
+    for word in keywords:
+        if re.search(r'\b' + re.escape(word) + r'\b', text_lower):
+            return word
+    return None
 
-MEDIUM_KEYWORDS = [
-    "pothole", "garbage", "litter", "water leak", "no water", 
-    "streetlight", "sign", "traffic jam", "noise", "dirty"
-]
+def _sentiment(text: str) -> Optional[dict]:
+    try:
+        return sentiment_analyzer(text, truncation=True)[0]
+    except Exception as e:
+        print(f"Sentiment analysis failed: {e}")
+        return None
 
-def calculate_urgency(text: str) -> dict:
-    """
-    Determines the urgency level based on keyword severity and sentiment analysis.
-    Returns a dictionary with urgency level and reasoning.
-    """
-    text_lower = text.lower()
-    
+def _keyword_urgency(text_lower: str) -> Optional[dict]:
     # 1. Check for Critical Keywords (Highest Priority)
-    for word in CRITICAL_KEYWORDS:
-        if re.search(r'\b' + re.escape(word) + r'\b', text_lower):
-            return {
-                "urgency": "critical",
-                "reason": f"Critical keyword detected: '{word}'"
-            }
+    word = _find_keyword(text_lower, CRITICAL_KEYWORDS)
+    if word:
+        return {
+            "urgency": "critical",
+            "reason": f"Critical keyword detected: '{word}'"
+        }
             
     # 2. Check for High Urgency Keywords
-    for word in HIGH_KEYWORDS:
-        if re.search(r'\b' + re.escape(word) + r'\b', text_lower):
-            return {
-                "urgency": "high",
-                "reason": f"High urgency keyword detected: '{word}'"
-            }
-            
+    word = _find_keyword(text_lower, HIGH_KEYWORDS)
+    if word:
+        return {
+            "urgency": "high",
+            "reason": f"High urgency keyword detected: '{word}'"
+        }
+    return None
+
+def _sentiment_or_medium(text_lower: str, sentiment: Optional[dict]) -> dict:
     # 3. Sentiment Analysis for Nuance
     # If the sentiment is overwhelmingly negative, bump up urgency
-    try:
-        sentiment = sentiment_analyzer(text)[0]
+    if sentiment:
         is_negative = sentiment["label"] == "NEGATIVE"
         score = sentiment["score"]
         
@@ -57,19 +50,54 @@ def calculate_urgency(text: str) -> dict:
                 "urgency": "high",
                 "reason": f"Extremely negative sentiment ({score:.2f})"
             }
-    except Exception as e:
-        print(f"Sentiment analysis failed: {e}")
 
     # 4. Check for Medium Urgency Keywords
-    for word in MEDIUM_KEYWORDS:
-        if re.search(r'\b' + re.escape(word) + r'\b', text_lower):
-            return {
-                "urgency": "medium",
-                "reason": f"Medium urgency keyword detected: '{word}'"
-            }
+    word = _find_keyword(text_lower, MEDIUM_KEYWORDS)
+    if word:
+        return {
+            "urgency": "medium",
+            "reason": f"Medium urgency keyword detected: '{word}'"
+        }
             
     # Default to Low Urgency
     return {
         "urgency": "low",
         "reason": "No urgent keywords or sufficient negative sentiment detected"
     }
+
+def keyword_urgency(text: str) -> dict:
+    """
+    Keyword tiers only, no sentiment model: microseconds instead of a forward pass.
+    Used to pre-score priority before inference and as the degraded-mode result.
+    """
+    text_lower = text.lower()
+    return _keyword_urgency(text_lower) or _sentiment_or_medium(text_lower, None)
+
+def calculate_urgency(text: str) -> dict:
+    """
+    Determines the urgency level based on keyword severity and sentiment analysis.
+    Returns a dictionary with urgency level and reasoning.
+    """
+    return calculate_urgency_batch([text])[0]
+
+def calculate_urgency_batch(texts: List[str]) -> List[dict]:
+    """
+    Batch variant of calculate_urgency.
+    Keyword tiers are checked per text; sentiment runs once for the texts that still need it.
+    """
+    lowered = [text.lower() for text in texts]
+    results: List[Optional[dict]] = [_keyword_urgency(text_lower) for text_lower in lowered]
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    sentiments: List[Optional[dict]] = [None] * len(pending)
+    if pending:
+        try:
+            sentiments = sentiment_analyzer([texts[i] for i in pending], truncation=True)
+        except Exception as e:
+            # Retry one by one so a single bad text only loses its own sentiment
+            print(f"Batch sentiment analysis failed, retrying per text: {e}")
+            sentiments = [_sentiment(texts[i]) for i in pending]
+
+    for i, sentiment in zip(pending, sentiments):
+        results[i] = _sentiment_or_medium(lowered[i], sentiment)
+    return results
@@ -33,6 +33,26 @@ class ComplaintUpdate(BaseModel):
     resolution_note: Optional[str] = None
     resolution_image_url: Optional[str] = None
 
+# Column filters for bulk updates; every given field must match
+class ComplaintFilter(BaseModel):
+    status: Optional[str] = None
+    urgency: Optional[str] = None
+    category: Optional[str] = None
+    ward: Optional[str] = None
+    department: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+# Schema for bulk updates: one set of changes applied to exactly one selection
+class ComplaintBulkUpdate(BaseModel):
+    # Explicit complaints
+    ids: Optional[List[UUID]] = Field(None, max_length=1000)
+    # A duplicate cluster, including the complaint it formed around
+    duplicate_group_id: Optional[UUID] = None
+    # Everything matching the filter
+    filter: Optional[ComplaintFilter] = None
+    changes: ComplaintUpdate
+
 # Schema for reading a complaint (output)
 class ComplaintRead(ComplaintBase):
     id: UUID
@@ -47,10 +67,13 @@ class ComplaintRead(ComplaintBase):
     duplicate_group_id: Optional[UUID] = None
     # Enriched metadata for citizen response
     sla_eta: Optional[str] = None
+    sla_deadline: Optional[datetime] = None
     duplicate_count: Optional[int] = 0
     rejection_reason: Optional[str] = None
     resolution_note: Optional[str] = None
     resolution_image_url: Optional[str] = None
+    # Analysed on the overload fast path; re-run by scripts/reprocess_degraded.py
+    degraded: Optional[bool] = False
 
     @computed_field
     @property
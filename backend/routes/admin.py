@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import asyncio
+
+# Import the in-process sampling profiler
+from utils import profiler
+# Import auth dependency for admin-only access
+from auth.dependencies import allow_admin
+from config import settings
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+@router.get("/profile")
+async def profile_process(
+    seconds: float = Query(10, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(10, ge=1, le=1000, description="Sampling period"),
+    format: str = Query("speedscope", description="speedscope (JSON) or collapsed (folded stacks)"),
+    thread: Optional[str] = Query(None, description="Only threads whose name starts with this, e.g. MainThread"),
+    include_idle: bool = Query(False, description="Keep samples of threads parked in select/wait/queue.get"),
+    memory: bool = Query(False, description="Also trace allocations and return the top allocating lines"),
+    current_user: dict = Depends(allow_admin)
+):
+    """
+    Sample the stacks of every thread in this worker process (event loop, inference
+    and bcrypt executors) for the given number of seconds and return the aggregate.
+    Open the speedscope output at https://www.speedscope.app; feed the collapsed
+    output to flamegraph.pl. With memory=true the speedscope document gains a
+    "memory" list of the largest allocations made while profiling.
+    Only the worker that serves this request is profiled.
+    """
+    if format not in ("speedscope", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be 'speedscope' or 'collapsed'")
+    if memory and format != "speedscope":
+        raise HTTPException(status_code=400, detail="memory=true requires format=speedscope")
+    try:
+        profiler.acquire()
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    sampler = profiler.SamplingProfiler(interval_ms / 1000, thread_filter=thread, include_idle=include_idle)
+    try:
+        sampler.start(trace_memory=memory)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+        if format == "collapsed":
+            return PlainTextResponse(sampler.collapsed())
+        result = sampler.speedscope()
+        if memory:
+            result["memory"] = await asyncio.to_thread(sampler.top_allocations)
+        return result
+    finally:
+        # Also runs when the client disconnects mid-profile
+        sampler.close()
+        profiler.release()
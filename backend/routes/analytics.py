@@ -0,0 +1,130 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import Optional
+from datetime import date
+
+# Import rollup-backed analytics repository
+from db.analytics import analytics_repo, DIMENSIONS
+# Change versions are bumped by every complaint write
+from db import complaints_repo
+# Import conditional GET helpers
+from utils.http_cache import make_etag, not_modified, set_etag
+# Import the streaming hotspot detector
+from services.hotspots import hotspot_detector
+# Import auth dependency for admin-only access
+from auth.dependencies import allow_admin, allow_officer
+
+router = APIRouter(prefix="/complaints/analytics", tags=["Analytics"])
+
+class RollupFilters:
+    """Common query filters shared by every rollup endpoint."""
+    def __init__(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        ward: Optional[str] = None,
+        category: Optional[str] = None,
+        urgency: Optional[str] = None,
+        status: Optional[str] = None,
+    ):
+        self.since = since
+        self.until = until
+        self.dimensions = {"ward": ward, "category": category, "urgency": urgency, "status": status}
+
+def analytics_etag(request: Request, current_user: dict) -> str:
+    # Rollups only change when complaints do, so the global complaint version covers them
+    return make_etag(request, complaints_repo.versions.current(), current_user.get("role"))
+
+@router.get("/ward-summary")
+async def get_ward_summary(request: Request, response: Response, current_user: dict = Depends(allow_admin)):
+    """
+    Get complaint distribution by ward for admin analytics.
+    """
+    etag = analytics_etag(request, current_user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    try:
+        rows = await analytics_repo.breakdown("ward")
+        return [{"ward": row["key"], "count": row["count"]} for row in rows]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/breakdown")
+async def get_breakdown(
+    request: Request,
+    response: Response,
+    dimension: str = Query("ward", description=f"One of: {', '.join(DIMENSIONS)}"),
+    filters: RollupFilters = Depends(),
+    current_user: dict = Depends(allow_admin)
+):
+    """
+    Complaint counts grouped by ward, category, urgency or status.
+    """
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of: {', '.join(DIMENSIONS)}")
+    etag = analytics_etag(request, current_user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    try:
+        rows = await analytics_repo.breakdown(dimension, filters.since, filters.until, **filters.dimensions)
+        return [{dimension: row["key"], "count": row["count"]} for row in rows]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/timeseries")
+async def get_timeseries(
+    request: Request,
+    response: Response,
+    filters: RollupFilters = Depends(),
+    current_user: dict = Depends(allow_admin)
+):
+    """
+    Daily complaint counts (Asia/Kolkata days), optionally filtered.
+    """
+    etag = analytics_etag(request, current_user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    try:
+        return await analytics_repo.timeseries(filters.since, filters.until, **filters.dimensions)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/top-wards")
+async def get_top_wards(
+    request: Request,
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    filters: RollupFilters = Depends(),
+    current_user: dict = Depends(allow_admin)
+):
+    """
+    The N wards with the most complaints matching the filters.
+    """
+    etag = analytics_etag(request, current_user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    try:
+        rows = await analytics_repo.breakdown("ward", filters.since, filters.until, limit=limit, **filters.dimensions)
+        return [{"ward": row["key"], "count": row["count"]} for row in rows]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/hotspots")
+async def get_hotspots(
+    category: Optional[str] = None,
+    ward: Optional[str] = None,
+    current_user: dict = Depends(allow_officer)
+):
+    """
+    Grid cells where complaints of one category are arriving well above that cell's
+    learned baseline right now, largest first. The same detector pushes HOTSPOT and
+    HOTSPOT_CLEARED events over the WebSocket as cells flare up and cool down.
+    """
+    return hotspot_detector.current(category=category, ward=ward)
@@ -1,43 +1,23 @@
 # Import FastAPI tools
 from fastapi import APIRouter, HTTPException, status, Depends
 # Import OAuth2PasswordRequestForm if we wanted standard form login, but we use JSON body here
-# Import database client
-from database import supabase
+# Import async data access layer
+from db import users_repo
 # Import models
 from models.user import UserCreate, UserLogin, UserRead, Token
 # Import auth handler utils
 from auth.jwt_handler import create_access_token
-# Import password hashing utils
-import bcrypt
-import hashlib
+# Import password hashing utils (run off the event loop)
+from auth.passwords import hash_password_async, verify_password_async
 
 # Create a router for auth endpoints
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-def _get_hashable_password(password: str) -> str:
-    """Pre-hash password with SHA-256 to bypass bcrypt's 72-byte limit."""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Helper function to hash passwords
-def get_password_hash(password: str):
-    # Pre-hash to bypass 72-byte limit and convert to bytes
-    password_bytes = _get_hashable_password(password).encode('utf-8')
-    # Generate salt and hash
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
-
-# Helper function to verify passwords
-def verify_password(plain_password: str, hashed_password: str):
-    password_bytes = _get_hashable_password(plain_password).encode('utf-8')
-    hashed_password_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_password_bytes)
-
 # Endpoint for user registration
 @router.post("/register", response_model=UserRead)
 async def register(user: UserCreate):
     # Hash the password before storing
-    hashed_pw = get_password_hash(user.password)
+    hashed_pw = await hash_password_async(user.password)
     
     # SECURITY: Only 'citizen' role can be registered via public signup.
     # Officer and Admin roles are seeded by the system only.
@@ -54,14 +34,14 @@ async def register(user: UserCreate):
 
     try:
         # Attempt to insert into Supabase 'users' table
-        response = supabase.table("users").insert(user_data).execute()
+        created = await users_repo.insert_user(user_data)
         
         # Check if we got data back
-        if not response.data:
+        if not created:
             raise HTTPException(status_code=400, detail="Registration failed")
             
-        # Return the created user (first item in data list)
-        return response.data[0]
+        # Return the created user
+        return created
         
     except Exception as e:
         # Handle unique constraint violations or other DB errors
@@ -73,20 +53,17 @@ async def register(user: UserCreate):
 async def login(user: UserLogin):
     try:
         # Query Supabase for the user with this email
-        response = supabase.table("users").select("*").eq("email", user.email).execute()
+        db_user = await users_repo.get_user_by_email(user.email)
         
         # If no user found
-        if not response.data:
+        if not db_user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, 
                 detail="Incorrect email or password"
             )
-            
-        # Get the user record
-        db_user = response.data[0]
         
         # Verify the password
-        if not verify_password(user.password, db_user["hashed_password"]):
+        if not await verify_password_async(user.password, db_user["hashed_password"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, 
                 detail="Incorrect email or password"
@@ -111,6 +88,9 @@ async def login(user: UserLogin):
             "department": db_user.get("department")
         }
         
+    except HTTPException:
+        # 401/503 raised above must reach the client as-is
+        raise
     except Exception as e:
         # Handle unexpected errors
         raise HTTPException(status_code=500, detail=str(e))
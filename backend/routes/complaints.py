@@ -1,228 +1,423 @@
-from fastapi import APIRouter, HTTPException, Depends, status, File, UploadFile, Form
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, status, File, UploadFile, Form, Query, Response, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime
+import asyncio
 import shutil
 import os
 import uuid
 
-# Import database client
-from database import supabase
+# Import async data access layer
+from db import complaints_repo
+from db.complaints import COMPLAINT_COLUMNS
 # Import Pydantic models
-from models.complaint import ComplaintRead, ComplaintUpdate
-# Import ML pipeline functions
-from ml.classifier import classify_complaint
-from ml.urgency import calculate_urgency
-from ml.router import route_complaint
-from ml.duplicates import get_embedding, find_duplicate_group
-from ml.vision import analyze_image, get_visual_urgency_boost
+from models.complaint import ComplaintRead, ComplaintUpdate, ComplaintBulkUpdate
+# Import the shared analysis pipeline
+from services.complaint_pipeline import (
+    SLA_MAP, normalize_text, build_complaint, publish_new_complaint, publish_complaint_updated, publish_complaints_updated
+)
+from services.sla import sla_deadline, sla_tracker
+from services.bulk_ingest import stream_bulk_ingest
+from services.export import EXPORT_FORMATS, ExportFormatError, make_encoder, export_complaints
+# Import the durable ingestion queue and its workers
+from workers import outbox, enrichment_workers
+# Import fast row serialization
+from utils.serialization import rows_response
+# Import conditional GET helpers
+from utils.http_cache import make_etag, not_modified, CACHE_CONTROL
 # Import auth dependency to get current user
-from auth.dependencies import get_current_user
-# Import Geospatial utilities
-from utils.geospatial import get_mumbai_ward, get_mumbai_area
-# Import WebSocket manager
-from sockets import manager
+from auth.dependencies import get_current_user, allow_officer
+from config import settings
 
 router = APIRouter(prefix="/complaints", tags=["Complaints"])
 
-@router.post("/", response_model=ComplaintRead)
+def wants_async(prefer: Optional[str]) -> bool:
+    if prefer and "respond-async" in prefer.lower():
+        return True
+    return settings.INGEST_MODE == "async"
+
+@router.post("/", response_model=ComplaintRead, responses={202: {"description": "Queued for background enrichment"}})
 async def create_complaint(
     text: str = Form(...),
     location: Optional[str] = Form(None),
     latitude: Optional[float] = Form(None),
     longitude: Optional[float] = Form(None),
     image: Optional[UploadFile] = File(None),
+    prefer: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Submit a new complaint. AI classifies, prioritizes and routes it automatically.
     Supports optional image upload for visual triage.
+
+    With "Prefer: respond-async" (or INGEST_MODE=async) the raw complaint is queued
+    durably and 202 is returned immediately with a job id to poll at /complaints/jobs/{id}.
     """
     # All authenticated users can submit reports (citizens, officers, admins)
     # Role-based filtering happens on the GET endpoint
 
+    if wants_async(prefer):
+        return await enqueue_complaint(text, location, latitude, longitude, image, idempotency_key, current_user)
+
+    temp_path = None
     try:
-        # 0. Pre-Processing (Normalization & Noise Removal)
         print(f"DEBUG: Processing complaint from user {current_user.get('sub')}")
-        text = text.strip().replace("\n", " ")
-        
-        # 1. AI Analysis (NLP)
-        print(" [NEURAL] Initiating Multi-modal Analysis Protocol...")
-        print(" [NLP] Executing Zero-Shot Classification & Urgency Calculation...")
-        cat_result = classify_complaint(text)
-        urg_result = calculate_urgency(text)
-        
-        category = cat_result["category"]
-        urgency = urg_result["urgency"]
-        department = route_complaint(category, urgency)
-        print(f" [ANALYSIS] Category: {category} | Urgency: {urgency} | Dispatch: {department}")
-        
-        # 1.1 Geospatial Enrichment
-        ward = "General"
-        area = "Mumbai"
-        if latitude and longitude:
-            print(f"DEBUG: Performing geosearch for {latitude}, {longitude}")
-            ward = get_mumbai_ward(latitude, longitude)
-            area = get_mumbai_area(latitude, longitude)
-            print(f"DEBUG: Geo Result - Ward: {ward}, Area: {area}")
-
-        # 1.2 Multi-modal analysis (If image provided)
-        detections = []
-        image_url = None
+        text = normalize_text(text)
+
+        image_name = None
         if image:
-            print(f" [VISION] Processing visual signal: {image.filename}")
+            image_name = image.filename
             temp_filename = f"temp_{uuid.uuid4()}_{image.filename}"
             temp_path = os.path.join("temp_uploads", temp_filename)
             os.makedirs("temp_uploads", exist_ok=True)
             
             with open(temp_path, "wb") as buffer:
                 shutil.copyfileobj(image.file, buffer)
-            
-            detections = analyze_image(temp_path)
-            boost = get_visual_urgency_boost(detections)
-            if boost > 0 and urgency != 'critical':
-                urgency = 'high'
-            
-            image_url = f"uploads/{image.filename}"
-            
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            print(" [VISION] Visual triage cycle complete.")
-
-        # 1.2 Deduplication Check
-        print(" [DEDUPLICATION] Checking for existing clusters...")
-        embedding = get_embedding(text)
-        duplicate_group_id = find_duplicate_group(text, category)
-        print(f" [DEDUPLICATION] Cluster analysis result: {duplicate_group_id or 'New Signal'}")
-        
-        # 2. Prepare Data for Database
-        complaint_data = {
-            "text": text,
-            "location": location,
-            "image_url": image_url,
-            "category": category,
-            "urgency": urgency,
-            "department": department,
-            "status": "submitted",
-            "latitude": latitude,
-            "longitude": longitude,
-            "ward": ward,
-            "area": area,
-            "user_id": current_user.get("sub"),
-            "timestamp": datetime.now().isoformat(),
-            "embedding": embedding,
-            "duplicate_group_id": duplicate_group_id,
-        }
-
-        # 2.1 Calculate SLA SLA Estimation
-        # HIGH/CRITICAL -> 2 hrs, MEDIUM -> 24 hrs, LOW -> 3 days
-        sla_map = {
-            "critical": "2 Hours",
-            "high": "2 Hours",
-            "medium": "24 Hours",
-            "low": "3 Days"
-        }
-        sla_eta = sla_map.get(urgency.lower(), "24 Hours")
-        complaint_data["sla_eta"] = sla_eta
-
-        # 2.2 Determine Duplicate Count
-        duplicate_count = 0
-        if duplicate_group_id:
-            try:
-                dup_resp = supabase.table("complaints").select("id", count="exact").eq("duplicate_group_id", str(duplicate_group_id)).execute()
-                if dup_resp.count:
-                    duplicate_count = dup_resp.count
-            except Exception:
-                pass
-        complaint_data["duplicate_count"] = duplicate_count
+
+        complaint_data = await build_complaint(
+            text, location, latitude, longitude, current_user.get("sub"),
+            image_path=temp_path, image_name=image_name
+        )
         
         # 3. Insert into Database
         print(" [STORAGE] Persisting state to Supabase...")
-        # Use str() for safety if some values are complex types
-        response = supabase.table("complaints").insert(complaint_data).execute()
+        created = await complaints_repo.insert_complaint(complaint_data)
         
-        if not response.data:
-            print(f" [ERROR] DB persistence failed. Response: {response}")
+        if not created:
+            print(" [ERROR] DB persistence failed. No row returned.")
             raise HTTPException(status_code=500, detail="Failed to create complaint record")
             
         print(" [PROTOCOL] Complaint registered and dispatched successfully.")
         # 4. Broadcast Real-time Alert
-        await manager.broadcast_to_channel(department, {
-            "type": "NEW_COMPLAINT",
-            "data": {
-                "id": response.data[0]["id"],
-                "category": category,
-                "ward": ward,
-                "urgency": urgency
-            }
-        })
-
-        return response.data[0]
+        await publish_new_complaint(created)
+
+        return created
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"CRITICAL COMPLAINT ERROR: {str(e)}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing complaint: {str(e)}")
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+async def enqueue_complaint(
+    text: str,
+    location: Optional[str],
+    latitude: Optional[float],
+    longitude: Optional[float],
+    image: Optional[UploadFile],
+    idempotency_key: Optional[str],
+    current_user: dict
+) -> JSONResponse:
+    """Persist the raw complaint to the outbox and answer 202 without running any model."""
+    image_path = None
+    image_name = None
+    if image:
+        # Kept until the worker has processed the job
+        image_name = image.filename
+        os.makedirs(settings.INGEST_UPLOAD_DIR, exist_ok=True)
+        image_path = os.path.join(settings.INGEST_UPLOAD_DIR, f"{uuid.uuid4()}_{image.filename}")
+        with open(image_path, "wb") as buffer:
+            shutil.copyfileobj(image.file, buffer)
+
+    payload = {
+        "text": normalize_text(text),
+        "location": location,
+        "latitude": latitude,
+        "longitude": longitude,
+        "user_id": current_user.get("sub"),
+        "timestamp": datetime.now().isoformat(),
+        "image_path": image_path,
+        "image_name": image_name,
+    }
+    # Scope keys per user so two users can't collide on the same key
+    scoped_key = f"{current_user.get('sub')}:{idempotency_key}" if idempotency_key else None
+
+    try:
+        job, created = await asyncio.to_thread(outbox.enqueue, payload, scoped_key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing complaint: {str(e)}")
+
+    if created:
+        enrichment_workers.notify()
+    elif image_path and os.path.exists(image_path):
+        # Replayed request: the original upload is already queued
+        os.remove(image_path)
+
+    status_url = f"/complaints/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"id": job["id"], "status": job["status"], "status_url": status_url},
+        headers={"Location": status_url},
+    )
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that does not listen for client disconnects.
+    The stock one consumes receive() concurrently, which would steal the request
+    body chunks that a bulk upload is still reading while results stream back.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@router.post("/bulk")
+async def bulk_create_complaints(request: Request, current_user: dict = Depends(allow_officer)):
+    """
+    Ingest a streamed NDJSON body, one complaint object per line
+    (text, location, latitude, longitude, image_url, audio_url).
+
+    Records are classified, scored, embedded, ward-resolved and deduplicated in batches
+    and bulk-inserted. Results stream back as NDJSON, one line per input line
+    ({"line", "status", "id", ...}), followed by a {"summary": ...} line.
+    Clients sending very large files should read the response while uploading.
+    """
+    stream = stream_bulk_ingest(
+        request.stream(),
+        current_user.get("sub"),
+        batch_size=settings.BULK_BATCH_SIZE,
+        insert_chunk=settings.BULK_INSERT_CHUNK,
+        max_line_bytes=settings.BULK_MAX_LINE_BYTES,
+    )
+    return DuplexStreamingResponse(stream, media_type="application/x-ndjson")
+
+# Columns returned by a bulk update: enough for the coalesced event, cache invalidation and SLA tracking
+BULK_UPDATE_FIELDS = ["category", "timestamp", "duplicate_group_id", "sla_deadline"]
+
+@router.patch("/bulk")
+async def bulk_update_complaints(update: ComplaintBulkUpdate, current_user: dict = Depends(allow_officer)):
+    """
+    Apply one set of changes (status, department, resolution) to many complaints in a
+    single database statement. Select them with exactly one of: an explicit 'ids' list,
+    a 'duplicate_group_id' (the whole cluster, including the complaint it formed around),
+    or a 'filter' on status/urgency/category/ward/department/since/until.
+    Officers can only update their own department. Returns the number of complaints
+    updated and emits one COMPLAINTS_UPDATED_BULK event per department.
+    """
+    changes = {k: v for k, v in update.changes.model_dump().items() if v is not None}
+    if not changes:
+        raise HTTPException(status_code=400, detail="No data provided")
+    if "urgency" in changes:
+        # The SLA deadline runs from each complaint's own timestamp, so it is not one value
+        raise HTTPException(status_code=400, detail="Change urgency one complaint at a time with PATCH /complaints/{id}")
+    if sum(selector is not None for selector in (update.ids, update.duplicate_group_id, update.filter)) != 1:
+        raise HTTPException(status_code=400, detail="Provide exactly one of ids, duplicate_group_id or filter")
+
+    selection: List[Tuple[str, str]] = []
+    if update.ids is not None:
+        if not update.ids:
+            raise HTTPException(status_code=400, detail="ids must not be empty")
+        selection.append(("id", f"in.({','.join(str(complaint_id) for complaint_id in update.ids)})"))
+    elif update.duplicate_group_id is not None:
+        group = str(update.duplicate_group_id)
+        selection.append(("or", f"(duplicate_group_id.eq.{group},id.eq.{group})"))
+    else:
+        criteria = update.filter.model_dump(exclude_none=True)
+        if not criteria:
+            raise HTTPException(status_code=400, detail="filter needs at least one field")
+        since, until = criteria.pop("since", None), criteria.pop("until", None)
+        selection.extend((column, f"eq.{value}") for column, value in criteria.items())
+        if since:
+            selection.append(("timestamp", f"gte.{since.isoformat()}"))
+        if until:
+            selection.append(("timestamp", f"lt.{until.isoformat()}"))
+
+    if current_user.get("role") == "officer" and current_user.get("department"):
+        if update.filter is not None and update.filter.department not in (None, current_user["department"]):
+            raise HTTPException(status_code=403, detail="Officers can only update their own department")
+        if update.filter is None or update.filter.department is None:
+            selection.append(("department", f"eq.{current_user['department']}"))
+
+    try:
+        previous_departments = None
+        if "department" in changes:
+            previous = await complaints_repo.find_complaints(selection, ["department"])
+            previous_departments = {str(row["id"]): row["department"] for row in previous}
+
+        updated = await complaints_repo.update_complaints(selection, changes, BULK_UPDATE_FIELDS)
+        if updated:
+            await publish_complaints_updated(updated, changes, previous_departments)
+        return {"updated": len(updated), "ids": [row["id"] for row in updated]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/jobs/{job_id}")
+async def get_ingest_job(job_id: UUID, current_user: dict = Depends(get_current_user)):
+    """
+    Poll an asynchronously submitted complaint. 'complaint' is set once status is 'done'.
+    """
+    job = await asyncio.to_thread(outbox.get, str(job_id))
+    if not job or (
+        current_user.get("role") != "city_admin" and job["payload"].get("user_id") != current_user.get("sub")
+    ):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "error": job["error"] if job["status"] == "failed" else None,
+        "complaint": job["result"],
+    }
 
 def uuid_name():
     import uuid
     return str(uuid.uuid4())[:8]
 
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+def parse_cursor(after: str) -> Tuple[str, str]:
+    """Parse an '<timestamp>,<id>' keyset cursor as returned in X-Next-Cursor."""
+    try:
+        ts, row_id = after.rsplit(",", 1)
+        # A '+' in an unencoded query string arrives as a space
+        ts = ts.strip().replace(" ", "+")
+        datetime.fromisoformat(ts)
+        return ts, str(UUID(row_id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor, expected 'after=<timestamp>,<id>'")
+
+def parse_fields(fields: str) -> List[str]:
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in COMPLAINT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
 @router.get("/", response_model=List[ComplaintRead])
 async def get_complaints(
+    request: Request,
     department: Optional[str] = None,
     urgency: Optional[str] = None,
     status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Keyset cursor '<timestamp>,<id>' from X-Next-Cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated column projection"),
+    aliases: bool = Query(False, description="Include legacy alias fields (classification, cluster, ...)"),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    List complaints newest first, one page at a time.
+    The cursor for the next page is returned in the X-Next-Cursor header (absent on the last page).
+    Responses carry an ETag; a matching If-None-Match is answered with 304 without a DB query.
+    Alias fields (classification, classification_label, assigned_department, urgency_score,
+    cluster) are only included with aliases=true.
+    """
+    cursor = parse_cursor(after) if after else None
+    projection = parse_fields(fields) if fields else None
+
     try:
-        query = supabase.table("complaints").select("*")
-        if department: query = query.eq("department", department)
-        if urgency: query = query.eq("urgency", urgency)
-        if status: query = query.eq("status", status)
-            
         user_role = current_user.get("role")
         user_id = current_user.get("sub")
         user_dept = current_user.get("department")
         
+        owner_id = None
         if user_role == "citizen":
-            query = query.eq("user_id", user_id)
+            owner_id = user_id
         elif user_role == "officer" and user_dept:
             # STRICT SEGREGATION: Officers only see their own department's issues
-            query = query.eq("department", user_dept)
+            if department and department != user_dept:
+                return []
+            department = user_dept
+
+        # Officers only see their department, so only its writes change their view
+        version = complaints_repo.versions.current(user_dept if user_role == "officer" and user_dept else None)
+        etag = make_etag(request, version, f"{user_role}:{user_id}:{user_dept}")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
             
-        response = query.order("timestamp", desc=True).execute()
-        return response.data
+        rows = await complaints_repo.list_complaints(
+            department=department, urgency=urgency, status=status, user_id=owner_id,
+            limit=limit, after=cursor, fields=projection
+        )
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if len(rows) == limit:
+            headers["X-Next-Cursor"] = f"{rows[-1]['timestamp']},{rows[-1]['id']}"
+
+        # Rows are encoded as returned by the database; response_model only documents the shape
+        return rows_response(rows, aliases=aliases, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/analytics/ward-summary")
-async def get_ward_summary(current_user: dict = Depends(get_current_user)):
+@router.get("/export")
+async def export_complaints_endpoint(
+    format: str = Query("ndjson", description="ndjson, csv or parquet"),
+    department: Optional[str] = None,
+    ward: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user: dict = Depends(allow_officer)
+):
     """
-    Get complaint distribution by ward for admin analytics.
+    Stream complaint history as NDJSON, CSV or Parquet (one row group per page),
+    optionally gzip-compressed. Officers can only export their own department.
     """
-    if current_user.get("role") != "city_admin":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+    if current_user.get("role") == "officer" and current_user.get("department"):
+        if department and department != current_user["department"]:
+            raise HTTPException(status_code=403, detail="Officers can only export their own department")
+        department = current_user["department"]
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
     try:
-        response = supabase.table("complaints").select("ward").execute()
-        stats = {}
-        for item in response.data:
-            ward = item.get("ward") or "Unknown"
-            stats[ward] = stats.get(ward, 0) + 1
-        
-        return [{"ward": k, "count": v} for k, v in stats.items()]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        encoder = make_encoder(format)
+    except ExportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"complaints.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+
+    stream = export_complaints(
+        encoder, gzip=gzip, department=department, ward=ward,
+        since=since.isoformat() if since else None,
+        until=until.isoformat() if until else None,
+    )
+    return StreamingResponse(
+        stream, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/sla/at-risk")
+async def sla_at_risk(
+    within_minutes: float = Query(60, ge=0, description="Include complaints due within this many minutes"),
+    department: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(allow_officer)
+):
+    """
+    Open complaints already past their SLA deadline or due within the window, earliest
+    deadline first, with overdue/at-risk totals. Served from the in-memory SLA index,
+    so it stays cheap with hundreds of thousands of open complaints.
+    Officers only see their own department.
+    """
+    if current_user.get("role") == "officer" and current_user.get("department"):
+        if department and department != current_user["department"]:
+            raise HTTPException(status_code=403, detail="Officers can only view their own department")
+        department = current_user["department"]
+    return sla_tracker.at_risk(within_minutes * 60, department=department, limit=limit)
 
 @router.get("/{complaint_id}", response_model=ComplaintRead)
 async def get_complaint(complaint_id: UUID, current_user: dict = Depends(get_current_user)):
     try:
-        response = supabase.table("complaints").select("*").eq("id", str(complaint_id)).execute()
-        if not response.data:
+        complaint = await complaints_repo.get_complaint(str(complaint_id))
+        if not complaint:
             raise HTTPException(status_code=404, detail="Complaint not found")
-        return response.data[0]
+        return complaint
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -241,9 +436,22 @@ async def update_complaint(
         if not data_to_update:
              raise HTTPException(status_code=400, detail="No data provided")
 
-        response = supabase.table("complaints").update(data_to_update).eq("id", str(complaint_id)).execute()
-        if not response.data:
+        previous = None
+        if "department" in data_to_update or "urgency" in data_to_update:
+            previous = await complaints_repo.get_complaint(str(complaint_id))
+        previous_department = previous["department"] if previous and "department" in data_to_update else None
+        if "urgency" in data_to_update and previous:
+            # The SLA window follows urgency but still runs from when the complaint was filed
+            urgency = data_to_update["urgency"].lower()
+            data_to_update["sla_eta"] = SLA_MAP.get(urgency, "24 Hours")
+            data_to_update["sla_deadline"] = sla_deadline(urgency, previous["timestamp"])
+
+        updated = await complaints_repo.update_complaint(str(complaint_id), data_to_update)
+        if not updated:
             raise HTTPException(status_code=404, detail="Complaint not found")
-        return response.data[0]
+        await publish_complaint_updated(updated, previous_department)
+        return updated
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
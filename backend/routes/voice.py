@@ -3,6 +3,7 @@ import shutil
 import os
 import uuid
 from ml.voice import transcribe_audio
+from utils.metrics import span
 
 router = APIRouter(prefix="/voice", tags=["Voice"])
 
@@ -29,7 +30,8 @@ async def transcribe_endpoint(file: UploadFile = File(...)):
             shutil.copyfileobj(file.file, buffer)
             
         # Transcribe
-        text = transcribe_audio(temp_path)
+        with span("transcribe"):
+            text = transcribe_audio(temp_path)
         
         if text is None:
             raise HTTPException(status_code=500, detail="Failed to transcribe audio")
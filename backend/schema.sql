@@ -30,13 +30,136 @@ CREATE TABLE IF NOT EXISTS complaints (
     embedding VECTOR(384), -- For semantic similarity (assuming 384 dim model)
     duplicate_group_id UUID,
     sla_eta TEXT,           -- Duration like '2 Hours'
+    sla_deadline TIMESTAMP WITH TIME ZONE, -- timestamp + the urgency's resolution window
     duplicate_count INTEGER DEFAULT 0,
     user_id UUID REFERENCES users(id),
     resolution_note TEXT,
-    resolution_image_url TEXT
+    resolution_image_url TEXT,
+    degraded BOOLEAN NOT NULL DEFAULT FALSE -- analysed on the overload fast path, pending re-processing
 );
 
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_complaints_department ON complaints(department);
 CREATE INDEX IF NOT EXISTS idx_complaints_urgency ON complaints(urgency);
 CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints(status);
+
+-- Keyset pagination for GET /complaints (ORDER BY timestamp DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_complaints_timestamp_id ON complaints(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_complaints_department_timestamp_id ON complaints(department, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_complaints_user_timestamp_id ON complaints(user_id, timestamp DESC, id DESC);
+
+-- Re-processing queue for degraded analyses (scripts/reprocess_degraded.py walks it by id)
+CREATE INDEX IF NOT EXISTS idx_complaints_degraded_id ON complaints(id) WHERE degraded;
+
+-- SLA tracker rebuild (services/sla.py) walks open complaints by id
+CREATE INDEX IF NOT EXISTS idx_complaints_open_id ON complaints(id) WHERE status NOT IN ('resolved', 'rejected');
+
+-- Analytics rollups: one counter per (day, ward, category, urgency, status).
+-- Maintained incrementally by trigger so dashboards never scan the complaints table.
+CREATE TABLE IF NOT EXISTS complaint_rollups (
+    day DATE NOT NULL,
+    ward TEXT NOT NULL,
+    category TEXT NOT NULL,
+    urgency TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, ward, category, urgency, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_complaint_rollups_ward_day ON complaint_rollups(ward, day);
+
+CREATE OR REPLACE FUNCTION bump_complaint_rollup(
+    p_ts TIMESTAMP WITH TIME ZONE, p_ward TEXT, p_category TEXT, p_urgency TEXT, p_status TEXT, p_delta INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO complaint_rollups (day, ward, category, urgency, status, count)
+    VALUES (
+        (COALESCE(p_ts, NOW()) AT TIME ZONE 'Asia/Kolkata')::DATE,
+        COALESCE(p_ward, 'Unknown'),
+        COALESCE(p_category, 'other'),
+        COALESCE(p_urgency, 'low'),
+        COALESCE(p_status, 'submitted'),
+        p_delta
+    )
+    ON CONFLICT (day, ward, category, urgency, status)
+    DO UPDATE SET count = complaint_rollups.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION complaints_rollup_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND (OLD.timestamp, OLD.ward, OLD.category, OLD.urgency, OLD.status)
+           IS NOT DISTINCT FROM (NEW.timestamp, NEW.ward, NEW.category, NEW.urgency, NEW.status) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_complaint_rollup(OLD.timestamp, OLD.ward, OLD.category, OLD.urgency, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_complaint_rollup(NEW.timestamp, NEW.ward, NEW.category, NEW.urgency, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_complaints_rollup ON complaints;
+CREATE TRIGGER trg_complaints_rollup
+    AFTER INSERT OR DELETE OR UPDATE OF timestamp, ward, category, urgency, status ON complaints
+    FOR EACH ROW EXECUTE FUNCTION complaints_rollup_trigger();
+
+-- One-off rebuild (run once after creating the trigger on an existing table)
+CREATE OR REPLACE FUNCTION rebuild_complaint_rollups() RETURNS VOID AS $$
+BEGIN
+    DELETE FROM complaint_rollups;
+    INSERT INTO complaint_rollups (day, ward, category, urgency, status, count)
+    SELECT (COALESCE(timestamp, NOW()) AT TIME ZONE 'Asia/Kolkata')::DATE,
+           COALESCE(ward, 'Unknown'), COALESCE(category, 'other'),
+           COALESCE(urgency, 'low'), COALESCE(status, 'submitted'), COUNT(*)
+    FROM complaints
+    GROUP BY 1, 2, 3, 4, 5;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Read side, called through PostgREST /rpc. Cost depends on the rollup size, not the complaints table.
+CREATE OR REPLACE FUNCTION analytics_breakdown(
+    p_dimension TEXT,
+    p_since DATE DEFAULT NULL, p_until DATE DEFAULT NULL,
+    p_ward TEXT DEFAULT NULL, p_category TEXT DEFAULT NULL,
+    p_urgency TEXT DEFAULT NULL, p_status TEXT DEFAULT NULL
+) RETURNS TABLE(key TEXT, count BIGINT) AS $$
+    SELECT CASE p_dimension
+               WHEN 'ward' THEN r.ward
+               WHEN 'category' THEN r.category
+               WHEN 'urgency' THEN r.urgency
+               WHEN 'status' THEN r.status
+           END AS key,
+           SUM(r.count)::BIGINT AS count
+    FROM complaint_rollups r
+    WHERE (p_since IS NULL OR r.day >= p_since)
+      AND (p_until IS NULL OR r.day <= p_until)
+      AND (p_ward IS NULL OR r.ward = p_ward)
+      AND (p_category IS NULL OR r.category = p_category)
+      AND (p_urgency IS NULL OR r.urgency = p_urgency)
+      AND (p_status IS NULL OR r.status = p_status)
+    GROUP BY 1
+    HAVING SUM(r.count) > 0
+    ORDER BY 2 DESC;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION analytics_timeseries(
+    p_since DATE DEFAULT NULL, p_until DATE DEFAULT NULL,
+    p_ward TEXT DEFAULT NULL, p_category TEXT DEFAULT NULL,
+    p_urgency TEXT DEFAULT NULL, p_status TEXT DEFAULT NULL
+) RETURNS TABLE(day DATE, count BIGINT) AS $$
+    SELECT r.day, SUM(r.count)::BIGINT
+    FROM complaint_rollups r
+    WHERE (p_since IS NULL OR r.day >= p_since)
+      AND (p_until IS NULL OR r.day <= p_until)
+      AND (p_ward IS NULL OR r.ward = p_ward)
+      AND (p_category IS NULL OR r.category = p_category)
+      AND (p_urgency IS NULL OR r.urgency = p_urgency)
+      AND (p_status IS NULL OR r.status = p_status)
+    GROUP BY r.day
+    ORDER BY r.day;
+$$ LANGUAGE sql STABLE;
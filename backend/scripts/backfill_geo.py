@@ -0,0 +1,161 @@
+"""
+Backfill ward/area for complaints that were stored without a resolved location.
+
+Complaints submitted while ward data was missing end up with ward "General"
+or "Outside BMC Area". This walks those rows in id order, resolves whole pages
+with the vectorized ward lookup, and writes results back with one UPDATE per
+distinct (ward, area) pair. Progress is checkpointed after every page so an
+interrupted run picks up where it stopped.
+
+Areas come from Nominatim reverse geocoding, which is limited to one request
+per second, so they are only resolved with --with-area; expect roughly one
+second per distinct uncached location.
+
+Usage (from backend/):
+    python scripts/backfill_geo.py --page-size 1000
+    python scripts/backfill_geo.py --dry-run
+    python scripts/backfill_geo.py --with-area --limit 500
+    python scripts/backfill_geo.py --reset
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Allow imports of backend modules when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database import supabase
+from utils.geospatial import detector, get_mumbai_areas, OUTSIDE_BMC_AREA
+
+DEFAULT_CHECKPOINT = ".backfill_geo.checkpoint.json"
+UNRESOLVED_WARDS = ["General", OUTSIDE_BMC_AREA]
+
+
+def load_checkpoint(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {"last_id": None, "scanned": 0, "updated": 0}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: Dict):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def fetch_page(last_id: Optional[str], page_size: int) -> List[Dict]:
+    """Fetch the next page of unresolved complaints that do have coordinates."""
+    ward_filter = ",".join(["ward.is.null"] + [f'ward.eq."{w}"' for w in UNRESOLVED_WARDS])
+    query = supabase.table("complaints") \
+        .select("id, latitude, longitude, ward, area") \
+        .or_(ward_filter) \
+        .not_.is_("latitude", "null") \
+        .not_.is_("longitude", "null")
+    if last_id:
+        query = query.gt("id", last_id)
+    response = query.order("id").limit(page_size).execute()
+    return response.data or []
+
+
+def resolve_page(rows: List[Dict], with_area: bool) -> Dict[Tuple[str, Optional[str]], List[str]]:
+    """
+    Resolve ward/area for a page of rows.
+    Returns changed rows grouped by their new (ward, area) so each group is a single UPDATE.
+    """
+    lats = [row["latitude"] for row in rows]
+    lngs = [row["longitude"] for row in rows]
+    wards = detector.get_wards(lats, lngs)
+    areas = get_mumbai_areas(lats, lngs) if with_area else [None] * len(rows)
+
+    groups: Dict[Tuple[str, Optional[str]], List[str]] = defaultdict(list)
+    for row, ward, area in zip(rows, wards, areas):
+        if ward == row.get("ward") and (area is None or area == row.get("area")):
+            continue
+        groups[(ward, area)].append(row["id"])
+    return groups
+
+
+def apply_updates(groups: Dict[Tuple[str, Optional[str]], List[str]], dry_run: bool) -> int:
+    updated = 0
+    for (ward, area), ids in groups.items():
+        changes = {"ward": ward}
+        if area is not None:
+            changes["area"] = area
+        if not dry_run:
+            supabase.table("complaints").update(changes).in_("id", ids).execute()
+        updated += len(ids)
+    return updated
+
+
+def run(page_size: int, checkpoint_path: str, with_area: bool, dry_run: bool, limit: Optional[int]):
+    if not detector.loaded:
+        print("ERROR: No ward polygons loaded. Run download_wards.py first; refusing to backfill.")
+        sys.exit(1)
+
+    state = load_checkpoint(checkpoint_path)
+    if state["last_id"]:
+        print(f"Resuming after id {state['last_id']} ({state['scanned']} scanned, {state['updated']} updated so far)")
+
+    started = time.perf_counter()
+    scanned_this_run = 0
+
+    while True:
+        rows = fetch_page(state["last_id"], page_size)
+        if not rows:
+            break
+
+        page_started = time.perf_counter()
+        groups = resolve_page(rows, with_area)
+        updated = apply_updates(groups, dry_run)
+
+        scanned_this_run += len(rows)
+        state["last_id"] = rows[-1]["id"]
+        state["scanned"] += len(rows)
+        state["updated"] += updated
+        if not dry_run:
+            save_checkpoint(checkpoint_path, state)
+
+        page_elapsed = time.perf_counter() - page_started
+        total_elapsed = time.perf_counter() - started
+        print(
+            f" [BACKFILL] page={len(rows)} updated={updated} groups={len(groups)} "
+            f"page_rate={len(rows) / max(page_elapsed, 1e-9):.0f} rows/s "
+            f"overall_rate={scanned_this_run / max(total_elapsed, 1e-9):.0f} rows/s"
+        )
+
+        if limit and scanned_this_run >= limit:
+            print(f"Reached --limit of {limit} rows.")
+            break
+
+    total_elapsed = time.perf_counter() - started
+    print(
+        f"Backfill finished: scanned={state['scanned']} updated={state['updated']} "
+        f"in {total_elapsed:.1f}s ({scanned_this_run / max(total_elapsed, 1e-9):.0f} rows/s this run)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill ward/area for unresolved complaints")
+    parser.add_argument("--page-size", type=int, default=1000, help="Rows fetched and resolved per batch")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Path of the resume checkpoint file")
+    parser.add_argument("--reset", action="store_true", help="Discard any existing checkpoint and start over")
+    parser.add_argument("--with-area", action="store_true", help="Also reverse geocode areas (Nominatim, 1 request/s)")
+    parser.add_argument("--dry-run", action="store_true", help="Resolve but do not write updates or checkpoints")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after scanning this many rows")
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    run(args.page_size, args.checkpoint, args.with_area, args.dry_run, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Export complaint history without loading the table into memory.
+
+Pages through the complaints table with keyset cursors and streams rows to a
+file (or stdout) as NDJSON, CSV or Parquet, optionally gzip-compressed.
+
+Usage (from backend/):
+    python scripts/export_complaints.py --format csv --ward K/E --output k_east.csv
+    python scripts/export_complaints.py --format parquet --since 2026-01-01 --output q1.parquet
+    python scripts/export_complaints.py --department water --gzip > water.ndjson.gz
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Allow imports of backend modules when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db import pool
+from services.export import EXPORT_FORMATS, make_encoder, export_complaints
+
+
+async def run(args):
+    encoder = make_encoder(args.format)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    started = time.perf_counter()
+    try:
+        async for chunk in export_complaints(
+            encoder, gzip=args.gzip, page_size=args.page_size,
+            department=args.department, ward=args.ward, since=args.since, until=args.until,
+        ):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+        await pool.close()
+    elapsed = time.perf_counter() - started
+    print(f"Exported {written / 1e6:.1f} MB in {elapsed:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream complaints to NDJSON/CSV/Parquet")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--output", "-o", default=None, help="Output file (default: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--department", default=None)
+    parser.add_argument("--ward", default=None)
+    parser.add_argument("--since", default=None, help="ISO date/time, inclusive")
+    parser.add_argument("--until", default=None, help="ISO date/time, exclusive")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
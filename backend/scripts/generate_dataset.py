@@ -0,0 +1,431 @@
+"""
+Generate a synthetic, city-scale complaint dataset for load and query testing.
+
+Coordinates are sampled inside the BMC ward polygons of data/mumbai_wards.json,
+spread across wards in proportion to their area (reweighted with --ward-weights)
+plus a set of dense hotspots. Texts come from per-category templates carrying
+keywords from ml/keywords.py, so the stored urgency is what ml/urgency.py would
+assign by keyword. A share of rows forms near-duplicate clusters (reworded text,
+jittered location, later timestamp, shared duplicate_group_id), and timestamps
+follow a daily and weekly cycle over the last --days days.
+
+Rows are generated in independent chunks across worker processes, each seeded
+from (--seed, chunk index), so a given seed and chunk size always produce the
+same dataset regardless of --workers. Output is one part file per chunk
+(NDJSON, CSV or Parquet, same columns as scripts/export_complaints.py) or, with
+--load, bulk inserts into the database configured in .env.
+
+Usage (from backend/):
+    python scripts/generate_dataset.py --rows 10000000 --format parquet --output data/synthetic
+    python scripts/generate_dataset.py --rows 200000 --format ndjson --gzip --output /tmp/complaints
+    python scripts/generate_dataset.py --rows 50000 --load --ward-weights "K/E=3,G/N=2"
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import shapely
+
+# Allow imports of backend modules when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ml.keywords import CRITICAL_KEYWORDS, HIGH_KEYWORDS, MEDIUM_KEYWORDS
+from ml.router import route_complaint
+from utils.geospatial import detector
+
+# Templates avoid every urgency keyword; the keyword tier is injected through {detail}
+TEMPLATES = {
+    "sanitation": [
+        "Waste bins near {landmark} on {street} have not been cleared, {detail}.",
+        "Open drain along {street} next to {landmark}, {detail}.",
+        "Public toilet at {landmark} is not maintained, {detail}.",
+    ],
+    "roads_infra": [
+        "Road surface on {street} near {landmark} is badly damaged, {detail}.",
+        "Footpath outside {landmark} on {street} has caved in, {detail}.",
+        "Speed breaker on {street} has no markings, {detail}.",
+    ],
+    "water": [
+        "Supply to our building near {landmark} comes for ten minutes a day, {detail}.",
+        "Pipeline on {street} near {landmark} is leaking onto the road, {detail}.",
+        "Tap water near {landmark} is muddy and smells, {detail}.",
+    ],
+    "electricity": [
+        "Power cuts every evening around {landmark} on {street}, {detail}.",
+        "Transformer box near {landmark} is open, {detail}.",
+        "Lamp post on {street} has been off for {days} days, {detail}.",
+    ],
+    "safety": [
+        "Men gather every night near {landmark} on {street}, {detail}.",
+        "Old building next to {landmark} has cracks in the wall, {detail}.",
+        "Stray dogs chasing people on {street} near {landmark}, {detail}.",
+    ],
+    "traffic": [
+        "Signal at the {street} junction near {landmark} is out of order, {detail}.",
+        "Hawkers occupy the road on {street} outside {landmark}, {detail}.",
+        "Buses stop in the middle of {street} near {landmark}, {detail}.",
+    ],
+    "other": [
+        "Construction work goes on past midnight near {landmark}, {detail}.",
+        "Hoarding on {street} near {landmark} is hanging loose, {detail}.",
+        "Tree trimming pending on {street} near {landmark}, {detail}.",
+    ],
+}
+CATEGORIES = list(TEMPLATES)
+CATEGORY_SHARE = [0.28, 0.22, 0.16, 0.12, 0.08, 0.09, 0.05]
+
+DETAILS = {
+    "critical": ["there is a {keyword} risk here", "residents fear {keyword} any moment", "{keyword} reported this morning"],
+    "high": ["it is {keyword} again", "the spot is {keyword} for {days} days", "neighbours say it is {keyword}"],
+    "medium": ["and there is {keyword} all around", "{keyword} complaints for {days} days", "also {keyword} near the gate"],
+    "low": ["please look into it", "kindly send someone", "requesting action within the week"],
+}
+KEYWORDS = {"critical": CRITICAL_KEYWORDS, "high": HIGH_KEYWORDS, "medium": MEDIUM_KEYWORDS, "low": [""]}
+URGENCIES = ["critical", "high", "medium", "low"]
+URGENCY_SHARE = [0.05, 0.2, 0.45, 0.3]
+
+# Mirrors SLA_MAP in services/complaint_pipeline.py (which loads the models on import)
+SLA_ETA = {"critical": "2 Hours", "high": "2 Hours", "medium": "24 Hours", "low": "3 Days"}
+# Mirrors SLA_HOURS in services/sla.py
+SLA_HOURS = {"critical": 2, "high": 2, "medium": 24, "low": 72}
+
+STREETS = [
+    "SV Road", "LBS Marg", "Linking Road", "Carter Road", "Hill Road", "JP Road", "Tulsi Pipe Road",
+    "Ghodbunder Road", "Senapati Bapat Marg", "Dr Ambedkar Road", "Nehru Road", "MG Road",
+]
+LANDMARKS = [
+    "the railway station", "the bus depot", "the municipal market", "the post office", "the temple",
+    "the petrol pump", "the community hall", "the police chowky", "the housing colony", "the garden",
+]
+DUPLICATE_PREFIXES = ["", "Again: ", "Same issue - ", "Reporting again, ", "Still pending: "]
+DUPLICATE_SUFFIXES = ["", " Please help.", " Nobody has come yet.", " Kindly act fast.", " Second complaint."]
+
+# Relative complaint volume per hour of day (IST) and per weekday (Monday first)
+HOURLY_PROFILE = np.array([
+    0.2, 0.1, 0.1, 0.1, 0.2, 0.4, 0.8, 1.3, 1.8, 2.0, 1.9, 1.7,
+    1.5, 1.4, 1.3, 1.3, 1.4, 1.6, 1.9, 2.0, 1.7, 1.2, 0.7, 0.4,
+])
+WEEKDAY_PROFILE = np.array([1.15, 1.05, 1.0, 1.0, 1.0, 0.85, 0.75])
+IST = timezone(timedelta(hours=5, minutes=30))
+
+METERS_PER_DEGREE = 111_320.0
+
+
+def parse_ward_weights(spec: Optional[str]) -> Dict[str, float]:
+    weights = {}
+    for part in (spec or "").split(","):
+        if part.strip():
+            name, _, weight = part.partition("=")
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+def ward_probabilities(overrides: Dict[str, float]) -> np.ndarray:
+    unknown = set(overrides) - {ward["name"] for ward in detector.wards}
+    if unknown:
+        raise SystemExit(f"Unknown ward(s) in --ward-weights: {', '.join(sorted(unknown))}")
+    weights = np.array([ward["polygon"].area * overrides.get(ward["name"], 1.0) for ward in detector.wards])
+    return weights / weights.sum()
+
+
+def sample_in_ward(rng: np.random.Generator, ward_index: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rejection-sample n points (lat, lng) inside one ward polygon."""
+    polygon = detector.wards[ward_index]["polygon"]
+    min_x, min_y, max_x, max_y = polygon.bounds
+    # Oversample by the polygon's share of its bounding box
+    fill = polygon.area / ((max_x - min_x) * (max_y - min_y))
+    lats, lngs = [], []
+    remaining = n
+    while remaining > 0:
+        batch = int(remaining / fill * 1.2) + 16
+        xs = rng.uniform(min_x, max_x, batch)
+        ys = rng.uniform(min_y, max_y, batch)
+        inside = shapely.contains_xy(polygon, xs, ys)
+        lngs.append(xs[inside][:remaining])
+        lats.append(ys[inside][:remaining])
+        remaining -= len(lngs[-1])
+    return np.concatenate(lats), np.concatenate(lngs)
+
+
+def jitter(rng: np.random.Generator, lats: np.ndarray, lngs: np.ndarray, sigma_m) -> Tuple[np.ndarray, np.ndarray]:
+    """Gaussian offset of sigma_m metres around each point."""
+    d_lat = rng.normal(0, 1, len(lats)) * sigma_m / METERS_PER_DEGREE
+    d_lng = rng.normal(0, 1, len(lngs)) * sigma_m / (METERS_PER_DEGREE * np.cos(np.radians(lats)))
+    return lats + d_lat, lngs + d_lng
+
+
+def make_hotspots(seed: int, count: int, probabilities: np.ndarray) -> List[Dict]:
+    """Fixed per seed so every chunk draws from the same hotspots."""
+    rng = np.random.default_rng([seed, 2**31 - 1])
+    hotspots = []
+    for _ in range(count):
+        ward_index = int(rng.choice(len(probabilities), p=probabilities))
+        lats, lngs = sample_in_ward(rng, ward_index, 1)
+        hotspots.append({
+            "lat": float(lats[0]), "lng": float(lngs[0]),
+            "sigma_m": float(rng.uniform(80, 400)),
+            "category": CATEGORIES[int(rng.choice(len(CATEGORIES), p=CATEGORY_SHARE))],
+            "weight": float(rng.pareto(1.5) + 1),
+        })
+    return hotspots
+
+
+def render_text(rng: np.random.Generator, category: str, urgency: str) -> str:
+    templates = TEMPLATES[category]
+    details = DETAILS[urgency]
+    keywords = KEYWORDS[urgency]
+    days = int(rng.integers(2, 15))
+    detail = details[int(rng.integers(len(details)))].format(
+        keyword=keywords[int(rng.integers(len(keywords)))], days=days
+    )
+    return templates[int(rng.integers(len(templates)))].format(
+        street=STREETS[int(rng.integers(len(STREETS)))],
+        landmark=LANDMARKS[int(rng.integers(len(LANDMARKS)))],
+        days=days, detail=detail,
+    )
+
+
+def reword(rng: np.random.Generator, text: str) -> str:
+    prefix = DUPLICATE_PREFIXES[int(rng.integers(len(DUPLICATE_PREFIXES)))]
+    suffix = DUPLICATE_SUFFIXES[int(rng.integers(len(DUPLICATE_SUFFIXES)))]
+    if prefix:
+        text = text[0].lower() + text[1:]
+    return prefix + text + suffix
+
+
+def sample_timestamps(rng: np.random.Generator, n: int, end: datetime, days: int) -> np.ndarray:
+    """Epoch seconds following HOURLY_PROFILE within the day and WEEKDAY_PROFILE across days."""
+    first_day = (end.astimezone(IST) - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    weekdays = np.array([(first_day + timedelta(days=d)).weekday() for d in range(days)])
+    day_p = WEEKDAY_PROFILE[weekdays] / WEEKDAY_PROFILE[weekdays].sum()
+    day = rng.choice(days, size=n, p=day_p)
+    hour = rng.choice(24, size=n, p=HOURLY_PROFILE / HOURLY_PROFILE.sum())
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, n)
+    return np.minimum(first_day.timestamp() + seconds, end.timestamp())
+
+
+def sample_status(rng: np.random.Generator, age_days: np.ndarray) -> np.ndarray:
+    # Older complaints are more likely to be closed out
+    resolved_p = np.clip(age_days / 14, 0, 0.85)
+    roll = rng.random(len(age_days))
+    status = np.full(len(age_days), "submitted", dtype=object)
+    status[roll < resolved_p + 0.15] = "in_progress"
+    status[roll < resolved_p + 0.05] = "rejected"
+    status[roll < resolved_p] = "resolved"
+    status[(status == "submitted") & (rng.random(len(age_days)) < np.clip(age_days, 0, 1) * 0.5)] = "assigned"
+    return status
+
+
+# Per-process state, set once by init_worker (inherited on fork, rebuilt on spawn)
+_options: Dict = {}
+
+
+def init_worker(options: Dict):
+    _options.clear()
+    _options.update(options)
+    _options["ward_p"] = ward_probabilities(options["ward_weights"])
+    _options["hotspots"] = make_hotspots(options["seed"], options["hotspots"], _options["ward_p"])
+
+
+def generate_chunk(index: int, size: int) -> List[Dict]:
+    options = _options
+    rng = np.random.default_rng([options["seed"], index])
+    end = options["end"]
+
+    # Base locations: ward-weighted background plus hotspots
+    hotspots = options["hotspots"]
+    n_hot = rng.binomial(size, options["hotspot_share"]) if hotspots else 0
+    n_background = size - n_hot
+    lats = np.empty(size)
+    lngs = np.empty(size)
+    categories = rng.choice(len(CATEGORIES), size=size, p=CATEGORY_SHARE)
+    counts = rng.multinomial(n_background, options["ward_p"])
+    position = 0
+    for ward_index in np.flatnonzero(counts):
+        count = counts[ward_index]
+        lats[position:position + count], lngs[position:position + count] = sample_in_ward(rng, ward_index, count)
+        position += count
+    if n_hot:
+        weights = np.array([spot["weight"] for spot in hotspots])
+        which = rng.choice(len(hotspots), size=n_hot, p=weights / weights.sum())
+        centers_lat = np.array([hotspots[i]["lat"] for i in which])
+        centers_lng = np.array([hotspots[i]["lng"] for i in which])
+        sigmas = np.array([hotspots[i]["sigma_m"] for i in which])
+        lats[position:], lngs[position:] = jitter(rng, centers_lat, centers_lng, sigmas)
+        # Most reports at a hotspot are about the same problem
+        same = rng.random(n_hot) < 0.7
+        categories[position:][same] = [CATEGORIES.index(hotspots[i]["category"]) for i in which[same]]
+    order = rng.permutation(size)
+    lats, lngs, categories = lats[order], lngs[order], categories[order]
+
+    urgencies = rng.choice(len(URGENCIES), size=size, p=URGENCY_SHARE)
+    timestamps = sample_timestamps(rng, size, end, options["days"])
+    id_bytes = rng.bytes(16 * size)
+    ids = [str(uuid.UUID(bytes=id_bytes[i * 16:(i + 1) * 16], version=4)) for i in range(size)]
+    texts = [render_text(rng, CATEGORIES[c], URGENCIES[u]) for c, u in zip(categories, urgencies)]
+    group_ids: List[Optional[str]] = [None] * size
+    duplicate_counts = np.zeros(size, dtype=int)
+
+    # Near-duplicate clusters: later rows rewrite an earlier root's report a few metres away
+    n_duplicates = rng.binomial(size, options["duplicate_share"])
+    if n_duplicates:
+        cluster_sizes = rng.geometric(1 / options["cluster_size"], size=max(1, n_duplicates // options["cluster_size"]))
+        members = rng.permutation(size)
+        roots, cursor = members[:len(cluster_sizes)], len(cluster_sizes)
+        for root, cluster_size in zip(roots, cluster_sizes):
+            followers = members[cursor:cursor + cluster_size]
+            cursor += cluster_size
+            if len(followers) == 0:
+                break
+            group_ids[root] = ids[root]
+            duplicate_counts[root] = len(followers)
+            categories[followers] = categories[root]
+            urgencies[followers] = urgencies[root]
+            lats[followers], lngs[followers] = jitter(
+                rng, np.full(len(followers), lats[root]), np.full(len(followers), lngs[root]), 30.0
+            )
+            timestamps[followers] = np.minimum(
+                timestamps[root] + rng.exponential(6 * 3600, len(followers)), end.timestamp()
+            )
+            for follower in followers:
+                texts[follower] = reword(rng, texts[root])
+                group_ids[follower] = ids[root]
+
+    wards = detector.get_wards(lats, lngs)
+    age_days = (end.timestamp() - timestamps) / 86400
+    statuses = sample_status(rng, age_days)
+
+    rows = []
+    for i in range(size):
+        category = CATEGORIES[categories[i]]
+        urgency = URGENCIES[urgencies[i]]
+        rows.append({
+            "id": ids[i],
+            "text": texts[i],
+            "category": category,
+            "urgency": urgency,
+            "department": route_complaint(category, urgency),
+            "status": statuses[i],
+            "timestamp": datetime.fromtimestamp(timestamps[i], timezone.utc).isoformat(),
+            "latitude": round(float(lats[i]), 6),
+            "longitude": round(float(lngs[i]), 6),
+            "ward": wards[i],
+            "area": None,
+            "duplicate_group_id": group_ids[i],
+            "sla_eta": SLA_ETA[urgency],
+            "sla_deadline": datetime.fromtimestamp(timestamps[i] + SLA_HOURS[urgency] * 3600, timezone.utc).isoformat(),
+            "duplicate_count": int(duplicate_counts[i]),
+            "degraded": False,
+        })
+    return rows
+
+
+def write_chunk(task: Tuple[int, int]) -> int:
+    from services.export import EXPORT_FORMATS, make_encoder
+
+    index, size = task
+    rows = generate_chunk(index, size)
+    encoder = make_encoder(_options["format"])
+    extension = EXPORT_FORMATS[_options["format"]][1] + (".gz" if _options["gzip"] else "")
+    path = os.path.join(_options["output"], f"part-{index:05d}.{extension}")
+    data = encoder.header() + encoder.encode(rows) + encoder.footer()
+    if _options["gzip"]:
+        import gzip
+        data = gzip.compress(data, compresslevel=6)
+    # Write-then-rename so a killed run never leaves a truncated part behind
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return len(rows)
+
+
+def rows_for_load(task: Tuple[int, int]) -> List[Dict]:
+    return generate_chunk(*task)
+
+
+async def load_rows(chunks, total: int, started: float):
+    from config import settings
+    from db import complaints_repo, pool
+
+    written = 0
+    try:
+        for rows in chunks:
+            written += await complaints_repo.insert_complaints(rows, chunk_size=settings.BULK_INSERT_CHUNK)
+            report_progress(written, total, started)
+    finally:
+        await pool.close()
+    return written
+
+
+def report_progress(done: int, total: int, started: float):
+    elapsed = time.perf_counter() - started
+    print(f" [GENERATE] {done}/{total} rows ({done / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic complaint dataset inside BMC ward boundaries")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows per part file / worker task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["ndjson", "csv", "parquet"], default="parquet")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress each part file")
+    parser.add_argument("--output", "-o", default=None, help="Directory for part files")
+    parser.add_argument("--load", action="store_true", help="Bulk insert into the configured database instead")
+    parser.add_argument("--days", type=int, default=90, help="Timestamps span this many days back from --end")
+    parser.add_argument("--end", default=None, help="Latest timestamp, ISO (default: now)")
+    parser.add_argument("--ward-weights", default=None, help="Density multipliers, e.g. 'K/E=3,A=0.5'")
+    parser.add_argument("--hotspots", type=int, default=25, help="Number of dense hotspots")
+    parser.add_argument("--hotspot-share", type=float, default=0.15, help="Fraction of rows placed at hotspots")
+    parser.add_argument("--duplicate-share", type=float, default=0.1, help="Fraction of rows in near-duplicate clusters")
+    parser.add_argument("--cluster-size", type=int, default=4, help="Mean rows per duplicate cluster")
+    args = parser.parse_args()
+
+    if not detector.loaded:
+        print("ERROR: No ward polygons loaded. Run download_wards.py first.")
+        sys.exit(1)
+    if args.load == bool(args.output):
+        parser.error("pass exactly one of --output DIR or --load")
+
+    end = datetime.fromisoformat(args.end) if args.end else datetime.now(timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    options = {
+        "seed": args.seed, "end": end, "days": args.days,
+        "ward_weights": parse_ward_weights(args.ward_weights),
+        "hotspots": args.hotspots, "hotspot_share": args.hotspot_share,
+        "duplicate_share": args.duplicate_share, "cluster_size": max(1, args.cluster_size),
+        "format": args.format, "gzip": args.gzip, "output": args.output,
+    }
+    tasks = [
+        (index, min(args.chunk_size, args.rows - start))
+        for index, start in enumerate(range(0, args.rows, args.chunk_size))
+    ]
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(options,)) as workers:
+        if args.load:
+            # Chunks arrive in order so a re-run with the same seed hits the same ids first
+            written = asyncio.run(load_rows(workers.imap(rows_for_load, tasks), args.rows, started))
+        else:
+            written = 0
+            for count in workers.imap_unordered(write_chunk, tasks):
+                written += count
+                report_progress(written, args.rows, started)
+
+    elapsed = time.perf_counter() - started
+    target = "database" if args.load else args.output
+    print(f"Generated {written} complaints into {target} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Re-run the full analysis for complaints that were admitted in degraded mode.
+
+Under overload the admission controller (services/admission.py) analyses
+low-priority complaints with keyword-only classification and urgency and
+defers their vision pass, flagging the rows 'degraded'. This walks those rows
+in id order, runs the zero-shot classifier, sentiment urgency, full reverse
+geocoding and (when the deferred image is still on disk) vision, and writes the
+result back with degraded=false. Rows an officer has already picked up
+(status other than 'submitted') keep their department and urgency.
+
+Run it off-peak. Each update is announced to the running server like any other
+write: cache/ETag invalidation, the new SLA deadline and a COMPLAINT_UPDATED
+event all go out over the broker. That needs the script to share the server's
+broker, i.e. BROKER=unix with the same BROKER_DIR on the same host. With the
+in-process broker (or from another box) the server only sees the new values
+once its complaint caches expire and the SLA tracker next rebuilds, so restart
+the server afterwards in that case.
+
+Usage (from backend/):
+    python scripts/reprocess_degraded.py
+    python scripts/reprocess_degraded.py --limit 500 --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# Allow imports of backend modules when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from broker import broker
+from config import settings
+from db import complaints_repo, pool
+from services.complaint_pipeline import SLA_MAP, analyze_complaint, deferred_image_path, publish_complaint_updated
+from services.sla import sla_deadline
+
+
+def deferred_image(row: Dict[str, Any]) -> Optional[str]:
+    if not row.get("image_url"):
+        return None
+    path = deferred_image_path(row["id"], os.path.basename(row["image_url"]))
+    return path if os.path.exists(path) else None
+
+
+def changes_for(row: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+    changes = {"category": analysis["category"], "degraded": False}
+    if row.get("latitude") and row.get("longitude"):
+        changes["ward"] = analysis["ward"]
+        changes["area"] = analysis["area"]
+    if row.get("status") == "submitted":
+        changes["urgency"] = analysis["urgency"]
+        changes["department"] = analysis["department"]
+        changes["sla_eta"] = SLA_MAP.get(analysis["urgency"], "24 Hours")
+        changes["sla_deadline"] = sla_deadline(analysis["urgency"], row["timestamp"])
+    return changes
+
+
+async def start_broker():
+    """Join the server's broker so its workers hear about every update, as main.py wires it."""
+    if settings.BROKER != "unix":
+        print(" [REPROCESS] WARNING: BROKER is not 'unix'; the server will not see these updates until it restarts.")
+    await broker.start()
+    complaints_repo.on_invalidate = lambda rows, reassigned: broker.publish(
+        "cache", {"rows": rows, "reassigned": reassigned}, local=False
+    )
+
+
+async def run(page_size: int, limit: Optional[int], dry_run: bool):
+    after_id = None
+    processed = upgraded = 0
+    started = time.perf_counter()
+    if not dry_run:
+        await start_broker()
+    try:
+        while True:
+            rows = await complaints_repo.degraded_page(after_id, page_size)
+            if not rows:
+                break
+            for row in rows:
+                image_path = deferred_image(row)
+                analysis = await asyncio.to_thread(
+                    analyze_complaint, row["text"], row.get("latitude"), row.get("longitude"),
+                    image_path, os.path.basename(row["image_url"]) if image_path else None,
+                )
+                changes = changes_for(row, analysis)
+                if changes.get("urgency", row.get("urgency")) != row.get("urgency"):
+                    upgraded += 1
+                if not dry_run:
+                    updated = await complaints_repo.update_complaint(row["id"], changes)
+                    if updated:
+                        await publish_complaint_updated(updated, row.get("department"))
+                    if image_path:
+                        os.remove(image_path)
+                processed += 1
+            after_id = rows[-1]["id"]
+            elapsed = time.perf_counter() - started
+            print(f" [REPROCESS] processed={processed} urgency_changed={upgraded} rate={processed / max(elapsed, 1e-9):.1f} rows/s")
+            if limit and processed >= limit:
+                print(f"Reached --limit of {limit} rows.")
+                break
+    finally:
+        # Flushes the batched invalidation and SLA messages before exiting
+        await broker.close()
+        await pool.close()
+    print(f"Reprocessed {processed} degraded complaints in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run full analysis for complaints flagged as degraded")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many rows")
+    parser.add_argument("--dry-run", action="store_true", help="Analyse but do not write updates")
+    args = parser.parse_args()
+    asyncio.run(run(args.page_size, args.limit, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
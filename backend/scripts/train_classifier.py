@@ -0,0 +1,276 @@
+"""
+Distil the zero-shot category classifier into a small head over MiniLM embeddings.
+
+1. Export: every complaint with a category and its stored embedding. The label is
+   the category BART assigned, unless an officer reassigned the department away
+   from what that category routes to; then the category behind the new department
+   is taken as the corrected label. Degraded rows (keyword-classified under load)
+   are used only when an officer corrected them. The export is cached as NDJSON
+   (--dataset) so repeated training runs do not hit the database.
+2. Train a softmax head (linear, or one hidden layer with --hidden) with class
+   weights, officer corrections weighted up by --officer-weight.
+3. Evaluate on a held-out split chosen by id hash (stable across runs): accuracy
+   and macro-F1 of the head vs the stored BART labels, overall and on the
+   officer-corrected subset, plus per-call latency of head, MiniLM and BART.
+4. Save a versioned artifact under ml/artifacts/complaint-head-v<N>/. Serve it by
+   setting CLASSIFIER_HEAD to that directory (or "latest").
+
+Usage (from backend/):
+    python scripts/train_classifier.py --refresh --dataset data/labelled.ndjson
+    python scripts/train_classifier.py --dataset data/labelled.ndjson --hidden 256 --epochs 40
+    python scripts/train_classifier.py --dataset data/labelled.ndjson --latency --latency-bart --dry-run
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+# Allow imports of backend modules when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ml.router import CATEGORY_TO_DEPT, route_complaint
+from ml.distilled import ComplaintHead, save_artifact
+
+LABELS = list(CATEGORY_TO_DEPT)
+# Departments map back to a category unambiguously except 'safety', which the router
+# also uses for critical 'other' complaints; a move to safety is read as category safety
+DEPT_TO_CATEGORY = {department: category for category, department in CATEGORY_TO_DEPT.items()}
+
+
+def parse_embedding(value: Any) -> Optional[List[float]]:
+    if isinstance(value, str):
+        value = json.loads(value)
+    return [float(x) for x in value] if isinstance(value, list) else None
+
+
+def label_row(row: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """(label, source) for an exported row, or None if it should not be trained on."""
+    category, urgency, department = row.get("category"), row.get("urgency") or "medium", row.get("department")
+    if category not in CATEGORY_TO_DEPT:
+        return None
+    if department and department != route_complaint(category, urgency) and department in DEPT_TO_CATEGORY:
+        return DEPT_TO_CATEGORY[department], "officer"
+    if row.get("degraded"):
+        return None
+    return category, "bart"
+
+
+async def export_dataset(path: str, page_size: int, embed_missing: bool) -> int:
+    from db import complaints_repo, pool
+
+    written = skipped = 0
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        with open(path + ".tmp", "w") as out:
+            async for rows in complaints_repo.iter_labelled(page_size=page_size):
+                examples = []
+                missing = []
+                for row in rows:
+                    labelled = label_row(row)
+                    if labelled is None:
+                        skipped += 1
+                        continue
+                    embedding = parse_embedding(row.get("embedding"))
+                    example = {
+                        "id": row["id"], "text": row["text"], "bart": row["category"],
+                        "label": labelled[0], "source": labelled[1], "embedding": embedding,
+                    }
+                    if embedding is None:
+                        if not embed_missing:
+                            skipped += 1
+                            continue
+                        missing.append(example)
+                    examples.append(example)
+                if missing:
+                    from ml.duplicates import get_embeddings
+                    for example, embedding in zip(missing, await asyncio.to_thread(get_embeddings, [m["text"] for m in missing])):
+                        example["embedding"] = embedding
+                for example in examples:
+                    out.write(json.dumps(example) + "\n")
+                written += len(examples)
+                print(f" [EXPORT] {written} examples ({skipped} skipped) in {time.perf_counter() - started:.1f}s")
+    finally:
+        await pool.close()
+    os.replace(path + ".tmp", path)
+    return written
+
+
+def load_dataset(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def in_holdout(complaint_id: str, percent: int) -> bool:
+    return int(hashlib.sha1(complaint_id.encode()).hexdigest()[:8], 16) % 100 < percent
+
+
+def tensors(examples: List[Dict[str, Any]], officer_weight: float) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    x = torch.tensor([e["embedding"] for e in examples], dtype=torch.float32)
+    y = torch.tensor([LABELS.index(e["label"]) for e in examples])
+    w = torch.tensor([officer_weight if e["source"] == "officer" else 1.0 for e in examples])
+    return x, y, w
+
+
+def train(
+    examples: List[Dict[str, Any]], hidden: int, epochs: int, batch_size: int, lr: float,
+    weight_decay: float, officer_weight: float, seed: int,
+) -> ComplaintHead:
+    torch.manual_seed(seed)
+    x, y, sample_weight = tensors(examples, officer_weight)
+    # Inverse-frequency class weights so 'other' and 'safety' are not drowned out
+    counts = torch.bincount(y, minlength=len(LABELS)).float()
+    class_weight = counts.sum() / (len(LABELS) * counts.clamp(min=1))
+    head = ComplaintHead(x.shape[1], LABELS, hidden=hidden)
+    optimizer = torch.optim.AdamW(head.parameters(), lr=lr, weight_decay=weight_decay)
+    loss_fn = torch.nn.CrossEntropyLoss(weight=class_weight, reduction="none")
+    for epoch in range(epochs):
+        head.train()
+        order = torch.randperm(len(y))
+        total = 0.0
+        for start in range(0, len(y), batch_size):
+            batch = order[start:start + batch_size]
+            loss = (loss_fn(head(x[batch]), y[batch]) * sample_weight[batch]).mean()
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(batch)
+        if epoch == 0 or (epoch + 1) % 10 == 0 or epoch + 1 == epochs:
+            print(f" [TRAIN] epoch {epoch + 1}/{epochs} loss={total / len(y):.4f}")
+    head.eval()
+    return head
+
+
+def scores(predicted: List[str], actual: List[str]) -> Dict[str, float]:
+    if not actual:
+        return {"n": 0, "accuracy": None, "macro_f1": None}
+    accuracy = sum(p == a for p, a in zip(predicted, actual)) / len(actual)
+    f1s = []
+    for label in set(actual):
+        tp = sum(p == label and a == label for p, a in zip(predicted, actual))
+        fp = sum(p == label and a != label for p, a in zip(predicted, actual))
+        fn = sum(p != label and a == label for p, a in zip(predicted, actual))
+        f1s.append(2 * tp / (2 * tp + fp + fn) if tp else 0.0)
+    return {"n": len(actual), "accuracy": round(accuracy, 4), "macro_f1": round(statistics.mean(f1s), 4)}
+
+
+def evaluate(head: ComplaintHead, examples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    predicted = [p["category"] for p in head.predict([e["embedding"] for e in examples])] if examples else []
+    report = {}
+    for subset, members in (("all", range(len(examples))), ("officer", [i for i, e in enumerate(examples) if e["source"] == "officer"])):
+        members = list(members)
+        actual = [examples[i]["label"] for i in members]
+        report[subset] = {
+            "head": scores([predicted[i] for i in members], actual),
+            "bart": scores([examples[i]["bart"] for i in members], actual),
+        }
+    return report
+
+
+def median_ms(fn, repeat: int) -> float:
+    fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def measure_latency(head: ComplaintHead, examples: List[Dict[str, Any]], with_bart: bool, repeat: int) -> Dict[str, float]:
+    """Median single-complaint latency; the serving path is MiniLM encode + head."""
+    sample = examples[0]
+    latency = {"head_ms": median_ms(lambda: head.predict([sample["embedding"]]), repeat)}
+    from ml.duplicates import get_embedding
+    latency["minilm_ms"] = median_ms(lambda: get_embedding(sample["text"]), repeat)
+    latency["distilled_ms"] = round(latency["head_ms"] + latency["minilm_ms"], 3)
+    if with_bart:
+        from transformers import pipeline
+        bart = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+        latency["bart_ms"] = median_ms(lambda: bart(sample["text"], LABELS), max(3, repeat // 10))
+        latency["speedup"] = round(latency["bart_ms"] / latency["distilled_ms"], 1)
+    return latency
+
+
+def print_report(report: Dict[str, Any], latency: Optional[Dict[str, float]]):
+    print(f"\n{'subset':<10} {'n':>7} {'head acc':>9} {'bart acc':>9} {'head F1':>8} {'bart F1':>8}")
+    for subset, result in report.items():
+        head, bart = result["head"], result["bart"]
+        if not head["n"]:
+            print(f"{subset:<10} {0:>7}")
+            continue
+        print(f"{subset:<10} {head['n']:>7} {head['accuracy']:>9.3f} {bart['accuracy']:>9.3f} {head['macro_f1']:>8.3f} {bart['macro_f1']:>8.3f}")
+    if latency:
+        print("\nLatency per complaint (median ms): " + ", ".join(f"{k}={v}" for k, v in latency.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a distilled complaint classifier head from labelled history")
+    parser.add_argument("--dataset", default="data/labelled_complaints.ndjson", help="Cached export (NDJSON)")
+    parser.add_argument("--refresh", action="store_true", help="Re-export from the database even if --dataset exists")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--embed-missing", action="store_true", help="Encode rows that have no stored embedding")
+    parser.add_argument("--holdout", type=int, default=20, help="Percent of complaints held out for evaluation")
+    parser.add_argument("--hidden", type=int, default=0, help="Hidden units (0 = logistic regression)")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-2)
+    parser.add_argument("--weight-decay", type=float, default=1e-4)
+    parser.add_argument("--officer-weight", type=float, default=3.0, help="Loss weight of officer-corrected labels")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--latency", action="store_true", help="Measure head and MiniLM latency (loads MiniLM)")
+    parser.add_argument("--latency-bart", action="store_true", help="Also measure BART for the speedup ratio")
+    parser.add_argument("--min-accuracy", type=float, default=None, help="Refuse to save below this held-out accuracy")
+    parser.add_argument("--dry-run", action="store_true", help="Train and report, but do not save an artifact")
+    args = parser.parse_args()
+
+    if args.refresh or not os.path.exists(args.dataset):
+        count = asyncio.run(export_dataset(args.dataset, args.page_size, args.embed_missing))
+        print(f"Exported {count} labelled complaints to {args.dataset}")
+    examples = load_dataset(args.dataset)
+    if not examples:
+        print("ERROR: No labelled complaints to train on.")
+        sys.exit(1)
+
+    train_set = [e for e in examples if not in_holdout(e["id"], args.holdout)]
+    holdout = [e for e in examples if in_holdout(e["id"], args.holdout)]
+    sources = Counter(e["source"] for e in examples)
+    print(f"{len(train_set)} training / {len(holdout)} held-out examples ({sources['officer']} officer-corrected)")
+    print("Label counts: " + ", ".join(f"{k}={v}" for k, v in Counter(e["label"] for e in train_set).most_common()))
+
+    started = time.perf_counter()
+    head = train(
+        train_set, args.hidden, args.epochs, args.batch_size, args.lr,
+        args.weight_decay, args.officer_weight, args.seed,
+    )
+    train_seconds = time.perf_counter() - started
+    report = evaluate(head, holdout)
+    latency = measure_latency(head, holdout or train_set, args.latency_bart, repeat=200) if args.latency or args.latency_bart else None
+    print_report(report, latency)
+
+    accuracy = report["all"]["head"]["accuracy"]
+    if args.min_accuracy is not None and (accuracy is None or accuracy < args.min_accuracy):
+        print(f"\nHeld-out accuracy {accuracy} is below --min-accuracy {args.min_accuracy}; not saving.")
+        sys.exit(1)
+    if args.dry_run:
+        return
+    metrics = {
+        "train_examples": len(train_set), "holdout_examples": len(holdout),
+        "officer_examples": sources["officer"], "train_seconds": round(train_seconds, 1),
+        "holdout": report, "latency": latency,
+        "params": {k: getattr(args, k) for k in ("hidden", "epochs", "batch_size", "lr", "weight_decay", "officer_weight", "seed")},
+    }
+    path = save_artifact(head, len(examples[0]["embedding"]), metrics)
+    print(f"\nSaved {path}\nServe it with CLASSIFIER_HEAD={path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Tuple
+
+from fastapi import HTTPException, status
+
+from config import settings
+from utils.metrics import registry
+
+# Lower runs first; critical/high are never degraded or shed
+PRIORITY = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+PROTECTED = {"critical", "high"}
+
+decisions = registry.counter("admission_decisions", "Pipeline admissions, by pre-scored urgency and outcome.")
+
+
+class AdmissionController:
+    """
+    Gate in front of the model stage of the complaint pipeline.
+
+    At most 'concurrency' analyses run at once; the rest wait in a priority queue
+    ordered by keyword pre-score, FIFO within a tier, so a gas leak overtakes a
+    backlog of garbage reports. The controller enters degraded mode when the queue
+    is 'degrade_queue' deep or the p95 of full analyses over the last 'window'
+    seconds exceeds 'degrade_p95_ms', and leaves it once both fall below 'recover'
+    times those thresholds. While degraded, medium/low work skips the queue and runs
+    the cheap path; when 'max_queue' analyses are already queued or running degraded,
+    sheddable medium/low work is refused with 503.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        degrade_queue: int = 32,
+        degrade_p95_ms: float = 5000,
+        max_queue: int = 256,
+        window: float = 60.0,
+        recover: float = 0.5,
+    ):
+        self.concurrency = concurrency
+        self.degrade_queue = degrade_queue
+        self.degrade_p95 = degrade_p95_ms / 1000
+        self.max_queue = max_queue
+        self.window = window
+        self.recover = recover
+        self.degraded = False
+        self._running = 0
+        self._degraded_running = 0
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._durations: Deque[Tuple[float, float]] = deque()
+        registry.gauge("admission_queue_depth", "Complaints waiting for an inference slot.", lambda: len(self._waiting))
+        registry.gauge("admission_degraded", "1 while low-priority work takes the degraded path.", lambda: int(self.degraded))
+
+    def p95(self) -> float:
+        cutoff = time.monotonic() - self.window
+        while self._durations and self._durations[0][0] < cutoff:
+            self._durations.popleft()
+        if not self._durations:
+            return 0.0
+        ordered = sorted(duration for _, duration in self._durations)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _update_mode(self):
+        depth, p95 = len(self._waiting), self.p95()
+        if not self.degraded and (depth >= self.degrade_queue or p95 >= self.degrade_p95):
+            self.degraded = True
+            print(f" [ADMISSION] Entering degraded mode (queue={depth}, p95={p95 * 1000:.0f}ms)")
+        elif self.degraded and depth < self.degrade_queue * self.recover and p95 < self.degrade_p95 * self.recover:
+            self.degraded = False
+            print(f" [ADMISSION] Leaving degraded mode (queue={depth}, p95={p95 * 1000:.0f}ms)")
+
+    async def _acquire(self, priority: int):
+        if self._running < self.concurrency and not self._waiting:
+            self._running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._order), waiter)
+        heapq.heappush(self._waiting, entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self._release()
+            else:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+            raise
+
+    def _release(self):
+        # Hand the slot straight to the next waiter so nobody can barge in between
+        while self._waiting:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    @asynccontextmanager
+    async def admit(self, urgency: str, sheddable: bool = True) -> AsyncIterator[bool]:
+        """
+        Wait for an inference slot for work pre-scored at 'urgency'.
+        Yields True when the caller should take the degraded path instead.
+        Queued work (the outbox) passes sheddable=False; it waits rather than fail.
+        """
+        self._update_mode()
+        protected = urgency in PROTECTED
+        if not protected and sheddable and len(self._waiting) + self._degraded_running >= self.max_queue:
+            decisions.inc(urgency=urgency, outcome="shed")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Complaint analysis is overloaded, please retry",
+                headers={"Retry-After": "5"},
+            )
+        if self.degraded and not protected:
+            decisions.inc(urgency=urgency, outcome="degraded")
+            self._degraded_running += 1
+            try:
+                yield True
+            finally:
+                self._degraded_running -= 1
+            return
+
+        await self._acquire(PRIORITY.get(urgency, PRIORITY["low"]))
+        decisions.inc(urgency=urgency, outcome="full")
+        started = time.monotonic()
+        try:
+            yield False
+        finally:
+            self._durations.append((time.monotonic(), time.monotonic() - started))
+            self._release()
+            self._update_mode()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "degraded": self.degraded,
+            "running": self._running,
+            "running_degraded": self._degraded_running,
+            "queued": len(self._waiting),
+            "p95_ms": round(self.p95() * 1000, 1),
+            "concurrency": self.concurrency,
+        }
+
+
+admission = AdmissionController(
+    concurrency=settings.ADMISSION_CONCURRENCY,
+    degrade_queue=settings.ADMISSION_DEGRADE_QUEUE,
+    degrade_p95_ms=settings.ADMISSION_DEGRADE_P95_MS,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+)
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from db import complaints_repo
+from models.complaint import ComplaintCreate
+from ml.classifier import classify_complaints
+from ml.urgency import calculate_urgency_batch
+from ml.router import route_complaint
+from ml.duplicates import get_embeddings, group_duplicates
+from utils.geospatial import get_mumbai_wards, get_cached_mumbai_area
+from services.complaint_pipeline import SLA_MAP, normalize_text, complaint_event
+from services.sla import sla_deadline, sla_tracker
+from services.hotspots import hotspot_detector
+from sockets import manager
+from utils.metrics import span
+
+
+def _line(payload: Dict[str, Any]) -> bytes:
+    return (json.dumps(payload, default=str) + "\n").encode("utf-8")
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[Tuple[int, Optional[bytes], Optional[str]]]:
+    """
+    Split a streamed body into lines without buffering more than one line.
+    Yields (line_number, line, error); over-long lines are skipped with an error.
+    """
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            newline = buffer.find(b"\n")
+            if newline == -1:
+                if len(buffer) > max_line_bytes:
+                    # Drop the oversized line's prefix now, report it once its end arrives
+                    buffer = b""
+                    skipping = True
+                break
+            line, buffer = buffer[:newline], buffer[newline + 1:]
+            line_no += 1
+            if skipping or len(line) > max_line_bytes:
+                skipping = False
+                yield line_no, None, f"Line exceeds {max_line_bytes} bytes"
+            elif line.strip():
+                yield line_no, line, None
+    if buffer.strip() or skipping:
+        line_no += 1
+        if skipping:
+            yield line_no, None, f"Line exceeds {max_line_bytes} bytes"
+        else:
+            yield line_no, buffer, None
+
+
+def analyze_batch(records: List[ComplaintCreate]) -> List[Dict[str, Any]]:
+    """
+    Blocking model stage for a whole batch: one classifier, sentiment and encoder call each,
+    and one vectorized ward lookup. Area comes from the reverse-geocode cache only;
+    the per-point geocoder is far too slow for bulk loads.
+    """
+    texts = [normalize_text(r.text) for r in records]
+    # Encoded first so the distilled classifier head reuses the embeddings
+    with span("bulk.embedding"):
+        embeddings = get_embeddings(texts)
+    with span("bulk.classify"):
+        categories = classify_complaints(texts, embeddings=embeddings)
+    with span("bulk.urgency"):
+        urgencies = calculate_urgency_batch(texts)
+
+    located = [i for i, r in enumerate(records) if r.latitude and r.longitude]
+    with span("bulk.geo.ward"):
+        wards = get_mumbai_wards([records[i].latitude for i in located], [records[i].longitude for i in located])
+    ward_by_index = dict(zip(located, wards))
+
+    analyses = []
+    for i, record in enumerate(records):
+        category = categories[i]["category"]
+        urgency = urgencies[i]["urgency"]
+        analyses.append({
+            "text": texts[i],
+            "category": category,
+            "urgency": urgency,
+            "department": route_complaint(category, urgency),
+            "ward": ward_by_index.get(i, "General"),
+            "area": get_cached_mumbai_area(record.latitude, record.longitude) if i in ward_by_index else "Mumbai",
+            "embedding": embeddings[i],
+        })
+    return analyses
+
+
+async def ingest_batch(
+    batch: List[Tuple[int, ComplaintCreate]], user_id: Optional[str], insert_chunk: int
+) -> List[Dict[str, Any]]:
+    """Enrich, dedup and bulk-insert one batch. Returns one result per record."""
+    records = [record for _, record in batch]
+    analyses = await asyncio.to_thread(analyze_batch, records)
+    ids = [str(uuid.uuid4()) for _ in records]
+    categories = [a["category"] for a in analyses]
+
+    # Dedup against recent complaints (one query per category) and within the batch
+    candidates_by_category: Dict[str, List[dict]] = {}
+    for category in set(categories):
+        try:
+            candidates_by_category[category] = await complaints_repo.recent_by_category(category)
+        except Exception as e:
+            print(f" [BULK] Candidate lookup failed for {category}: {e}")
+    with span("bulk.dedup"):
+        groups = group_duplicates(ids, [a["embedding"] for a in analyses], categories, candidates_by_category)
+
+    # duplicate_count mirrors the single-complaint path: members already stored in the group
+    batch_ids = set(ids)
+    existing_counts: Dict[str, int] = {}
+    for group in {g for g in groups if g and g not in batch_ids}:
+        try:
+            existing_counts[group] = await complaints_repo.count_duplicates(group)
+        except Exception:
+            existing_counts[group] = 0
+    seen_in_batch: Counter = Counter()
+
+    timestamp = datetime.now().isoformat()
+    rows = []
+    for complaint_id, record, analysis, group in zip(ids, records, analyses, groups):
+        duplicate_count = 0
+        if group:
+            duplicate_count = existing_counts.get(group, 0) + seen_in_batch[group]
+            seen_in_batch[group] += 1
+        rows.append({
+            "id": complaint_id,
+            "text": analysis["text"],
+            "location": record.location,
+            "image_url": record.image_url,
+            "audio_url": record.audio_url,
+            "category": analysis["category"],
+            "urgency": analysis["urgency"],
+            "department": analysis["department"],
+            "status": "submitted",
+            "latitude": record.latitude,
+            "longitude": record.longitude,
+            "ward": analysis["ward"],
+            "area": analysis["area"],
+            "user_id": user_id,
+            "timestamp": timestamp,
+            "embedding": analysis["embedding"],
+            "duplicate_group_id": group,
+            "sla_eta": SLA_MAP.get(analysis["urgency"], "24 Hours"),
+            "sla_deadline": sla_deadline(analysis["urgency"], timestamp),
+            "duplicate_count": duplicate_count,
+        })
+
+    try:
+        await complaints_repo.insert_complaints(rows, chunk_size=insert_chunk)
+    except Exception as e:
+        print(f" [BULK] Insert failed for batch of {len(rows)}: {e}")
+        return [{"line": line_no, "status": "error", "error": f"Insert failed: {e}"} for line_no, _ in batch]
+
+    sla_tracker.observe(rows)
+    hotspot_detector.observe(rows)
+
+    # One real-time event per department per batch instead of one per record
+    by_department: Dict[str, List[dict]] = defaultdict(list)
+    for row in rows:
+        by_department[row["department"]].append(complaint_event(row))
+    for department, complaints in by_department.items():
+        await manager.broadcast_to_channel(department, {
+            "type": "NEW_COMPLAINTS_BULK",
+            "data": {"count": len(complaints), "ids": [c["id"] for c in complaints], "complaints": complaints}
+        })
+
+    return [
+        {
+            "line": line_no,
+            "status": "created",
+            "id": row["id"],
+            "category": row["category"],
+            "urgency": row["urgency"],
+            "department": row["department"],
+            "ward": row["ward"],
+            "duplicate_group_id": row["duplicate_group_id"],
+        }
+        for (line_no, _), row in zip(batch, rows)
+    ]
+
+
+async def stream_bulk_ingest(
+    chunks: AsyncIterator[bytes],
+    user_id: Optional[str],
+    batch_size: int,
+    insert_chunk: int,
+    max_line_bytes: int,
+) -> AsyncIterator[bytes]:
+    """
+    Consume an NDJSON body and yield one NDJSON result line per input record,
+    followed by a summary line. At most one batch is held in memory.
+    """
+    summary = {"received": 0, "created": 0, "failed": 0}
+    batch: List[Tuple[int, ComplaintCreate]] = []
+
+    async def flush():
+        results = await ingest_batch(batch, user_id, insert_chunk)
+        for result in results:
+            summary["created" if result["status"] == "created" else "failed"] += 1
+        return results
+
+    async for line_no, line, error in iter_ndjson_lines(chunks, max_line_bytes):
+        summary["received"] += 1
+        if error is None:
+            try:
+                batch.append((line_no, ComplaintCreate.model_validate_json(line)))
+            except ValidationError as e:
+                error = f"Invalid record: {e.errors()[0]['msg']}"
+        if error is not None:
+            summary["failed"] += 1
+            yield _line({"line": line_no, "status": "error", "error": error})
+            continue
+
+        if len(batch) >= batch_size:
+            for result in await flush():
+                yield _line(result)
+            batch = []
+
+    if batch:
+        for result in await flush():
+            yield _line(result)
+
+    yield _line({"summary": summary})
@@ -0,0 +1,253 @@
+import asyncio
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Import async data access layer
+from db import complaints_repo
+from db.complaints import COMPLAINT_COLUMNS
+# Import ML pipeline functions
+from ml.classifier import classify_complaint, classify_by_keywords
+from ml.urgency import calculate_urgency, keyword_urgency
+from ml.router import route_complaint
+from ml.duplicates import get_embedding, match_duplicate
+from ml.vision import analyze_image, get_visual_urgency_boost
+# Import Geospatial utilities
+from utils.geospatial import get_mumbai_ward, get_mumbai_area, get_cached_mumbai_area
+# Import WebSocket manager
+from sockets import manager
+# Import stage timing
+from utils.metrics import span
+# Import priority admission for the model stage
+from services.admission import admission
+# Import SLA deadlines and the breach tracker
+from services.sla import sla_deadline, sla_tracker
+# Import the streaming hotspot detector
+from services.hotspots import hotspot_detector
+from config import settings
+
+# SLA Estimation: HIGH/CRITICAL -> 2 hrs, MEDIUM -> 24 hrs, LOW -> 3 days
+SLA_MAP = {
+    "critical": "2 Hours",
+    "high": "2 Hours",
+    "medium": "24 Hours",
+    "low": "3 Days"
+}
+
+def normalize_text(text: str) -> str:
+    # Pre-Processing (Normalization & Noise Removal)
+    return text.strip().replace("\n", " ")
+
+def analyze_complaint(
+    text: str,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    image_path: Optional[str] = None,
+    image_name: Optional[str] = None,
+    degraded: bool = False,
+) -> Dict[str, Any]:
+    """
+    Blocking model and geocoding stage of the pipeline.
+    Call it through asyncio.to_thread from async code so the event loop stays free.
+
+    degraded=True is the overload path: keyword category and urgency instead of the
+    zero-shot and sentiment models, cached reverse geocoding only, and no vision pass.
+    """
+    # 1. AI Analysis (NLP)
+    print(" [NEURAL] Initiating Multi-modal Analysis Protocol...")
+    # Embedding for deduplication, computed first because the distilled classifier head reuses it
+    with span("embedding"):
+        embedding = get_embedding(text)
+    if degraded:
+        print(" [NLP] Degraded mode: keyword classification & urgency")
+        with span("classify.keywords"):
+            cat_result = classify_by_keywords(text)
+        urg_result = keyword_urgency(text)
+    else:
+        print(" [NLP] Executing Zero-Shot Classification & Urgency Calculation...")
+        with span("classify"):
+            cat_result = classify_complaint(text, embedding=embedding)
+        with span("urgency"):
+            urg_result = calculate_urgency(text)
+    
+    category = cat_result["category"]
+    urgency = urg_result["urgency"]
+    with span("route"):
+        department = route_complaint(category, urgency)
+    print(f" [ANALYSIS] Category: {category} | Urgency: {urgency} | Dispatch: {department}")
+    
+    # 1.1 Geospatial Enrichment
+    ward = "General"
+    area = "Mumbai"
+    if latitude and longitude:
+        print(f"DEBUG: Performing geosearch for {latitude}, {longitude}")
+        with span("geo.ward"):
+            ward = get_mumbai_ward(latitude, longitude)
+        if degraded:
+            area = get_cached_mumbai_area(latitude, longitude)
+        else:
+            with span("geo.area"):
+                area = get_mumbai_area(latitude, longitude)
+        print(f"DEBUG: Geo Result - Ward: {ward}, Area: {area}")
+
+    # 1.2 Multi-modal analysis (If image provided)
+    image_url = None
+    if image_path and degraded:
+        # Vision is deferred; scripts/reprocess_degraded.py runs it later
+        image_url = f"uploads/{image_name}"
+    elif image_path:
+        print(f" [VISION] Processing visual signal: {image_name}")
+        with span("vision"):
+            detections = analyze_image(image_path)
+        boost = get_visual_urgency_boost(detections)
+        if boost > 0 and urgency != 'critical':
+            urgency = 'high'
+        image_url = f"uploads/{image_name}"
+        print(" [VISION] Visual triage cycle complete.")
+
+    return {
+        "category": category,
+        "urgency": urgency,
+        "department": department,
+        "ward": ward,
+        "area": area,
+        "image_url": image_url,
+        "embedding": embedding,
+        "degraded": degraded,
+    }
+
+async def build_complaint(
+    text: str,
+    location: Optional[str],
+    latitude: Optional[float],
+    longitude: Optional[float],
+    user_id: Optional[str],
+    image_path: Optional[str] = None,
+    image_name: Optional[str] = None,
+    complaint_id: Optional[str] = None,
+    timestamp: Optional[str] = None,
+    sheddable: bool = True,
+) -> Dict[str, Any]:
+    """
+    Run the full analysis pipeline and return the row ready to be persisted.
+    The model stage is scheduled by keyword pre-score through the admission controller;
+    under overload low-priority complaints get the degraded path (flagged 'degraded'),
+    and sheddable ones may be refused with 503.
+    """
+    prescore = keyword_urgency(text)["urgency"]
+    async with admission.admit(prescore, sheddable=sheddable) as degraded:
+        with span("analysis"):
+            analysis = await asyncio.to_thread(
+                analyze_complaint, text, latitude, longitude, image_path, image_name, degraded
+            )
+    if degraded and image_path and os.path.exists(image_path):
+        # Callers delete their upload afterwards, so keep a copy under the complaint's id
+        complaint_id = complaint_id or str(uuid.uuid4())
+        os.makedirs(settings.DEFERRED_UPLOAD_DIR, exist_ok=True)
+        await asyncio.to_thread(shutil.copyfile, image_path, deferred_image_path(complaint_id, image_name))
+    category = analysis["category"]
+    urgency = analysis["urgency"]
+
+    # 1.4 Deduplication Check
+    print(" [DEDUPLICATION] Checking for existing clusters...")
+    duplicate_group_id = None
+    try:
+        with span("dedup"):
+            candidates = await complaints_repo.recent_by_category(category)
+            duplicate_group_id = match_duplicate(analysis["embedding"], candidates)
+    except Exception as e:
+        print(f" [DEDUPLICATION] Candidate lookup failed: {e}")
+    print(f" [DEDUPLICATION] Cluster analysis result: {duplicate_group_id or 'New Signal'}")
+
+    # 2. Prepare Data for Database
+    timestamp = timestamp or datetime.now().isoformat()
+    complaint_data = {
+        "text": text,
+        "location": location,
+        "image_url": analysis["image_url"],
+        "category": category,
+        "urgency": urgency,
+        "department": analysis["department"],
+        "status": "submitted",
+        "latitude": latitude,
+        "longitude": longitude,
+        "ward": analysis["ward"],
+        "area": analysis["area"],
+        "user_id": user_id,
+        "timestamp": timestamp,
+        "embedding": analysis["embedding"],
+        "duplicate_group_id": duplicate_group_id,
+        "sla_eta": SLA_MAP.get(urgency.lower(), "24 Hours"),
+        "sla_deadline": sla_deadline(urgency, timestamp),
+        "degraded": analysis["degraded"],
+    }
+    if complaint_id:
+        complaint_data["id"] = complaint_id
+
+    # 2.1 Determine Duplicate Count
+    duplicate_count = 0
+    if duplicate_group_id:
+        try:
+            duplicate_count = await complaints_repo.count_duplicates(str(duplicate_group_id))
+        except Exception:
+            pass
+    complaint_data["duplicate_count"] = duplicate_count
+
+    return complaint_data
+
+def deferred_image_path(complaint_id: str, image_name: Optional[str]) -> str:
+    extension = os.path.splitext(image_name or "")[1] or ".jpg"
+    return os.path.join(settings.DEFERRED_UPLOAD_DIR, f"{complaint_id}{extension}")
+
+def complaint_event(complaint: Dict[str, Any]) -> Dict[str, Any]:
+    """The full public record (no embedding), so dashboards can patch local state without re-fetching."""
+    return {column: complaint.get(column) for column in COMPLAINT_COLUMNS}
+
+async def publish_new_complaint(complaint: Dict[str, Any]):
+    sla_tracker.observe([complaint])
+    hotspot_detector.observe([complaint])
+    # Broadcast Real-time Alert
+    await manager.broadcast_to_channel(complaint["department"], {
+        "type": "NEW_COMPLAINT",
+        "data": complaint_event(complaint)
+    })
+
+async def publish_complaint_updated(complaint: Dict[str, Any], previous_department: Optional[str] = None):
+    # Resolving or rejecting stops the SLA clock; an urgency change moved the deadline
+    sla_tracker.observe([complaint])
+    message = {"type": "COMPLAINT_UPDATED", "data": complaint_event(complaint)}
+    await manager.broadcast_to_channel(complaint["department"], message)
+    # A reassigned complaint must also leave the old department's dashboards
+    if previous_department and previous_department != complaint["department"]:
+        await manager.broadcast_to_channel(previous_department, message, include_admin=False)
+
+async def publish_complaints_updated(
+    complaints: List[Dict[str, Any]], changes: Dict[str, Any], previous_departments: Optional[Dict[str, str]] = None
+):
+    """
+    One COMPLAINTS_UPDATED_BULK event per department for a bulk update instead of one
+    per complaint. 'previous_departments' maps id -> department before a reassignment.
+    """
+    sla_tracker.observe(complaints)
+    by_department: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    departed: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for complaint in complaints:
+        by_department[complaint["department"]].append(complaint)
+        previous = (previous_departments or {}).get(str(complaint["id"]))
+        if previous and previous != complaint["department"]:
+            departed[previous].append(complaint)
+
+    def message(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "type": "COMPLAINTS_UPDATED_BULK",
+            "data": {"count": len(rows), "ids": [row["id"] for row in rows], "changes": changes, "complaints": rows},
+        }
+
+    for department, rows in by_department.items():
+        await manager.broadcast_to_channel(department, message(rows))
+    # Reassigned complaints must also leave the old departments' dashboards
+    for department, rows in departed.items():
+        await manager.broadcast_to_channel(department, message(rows), include_admin=False)
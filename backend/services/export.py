@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from db import complaints_repo
+from db.complaints import COMPLAINT_COLUMNS
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Parquet column types; everything not listed is a string
+_FLOAT_COLUMNS = {"latitude", "longitude"}
+_INT_COLUMNS = {"duplicate_count"}
+_BOOL_COLUMNS = {"degraded"}
+
+
+class ExportFormatError(ValueError):
+    pass
+
+
+class NDJSONEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode("utf-8")
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class CSVEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=COMPLAINT_COLUMNS, extrasaction="ignore")
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self._writer.writeheader()
+        return self._drain()
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        self._writer.writerows(rows)
+        return self._drain()
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents can be taken out as they are produced."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ParquetEncoder:
+    """Writes one Parquet row group per page; bytes are flushed out after every group."""
+
+    def __init__(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportFormatError("Parquet export requires pyarrow to be installed")
+        self._pa = pa
+        self._schema = pa.schema([(column, self._column_type(column)) for column in COMPLAINT_COLUMNS])
+        self._sink = _DrainableSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="snappy")
+
+    def _column_type(self, column: str):
+        if column in _FLOAT_COLUMNS:
+            return self._pa.float64()
+        if column in _INT_COLUMNS:
+            return self._pa.int64()
+        if column in _BOOL_COLUMNS:
+            return self._pa.bool_()
+        return self._pa.string()
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        columns = {}
+        for field in self._schema:
+            values = [row.get(field.name) for row in rows]
+            if field.type == self._pa.string():
+                values = [None if v is None else str(v) for v in values]
+            columns[field.name] = values
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+        return self._sink.drain()
+
+    def footer(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+def make_encoder(fmt: str):
+    if fmt == "ndjson":
+        return NDJSONEncoder()
+    if fmt == "csv":
+        return CSVEncoder()
+    if fmt == "parquet":
+        return ParquetEncoder()
+    raise ExportFormatError(f"Unknown export format '{fmt}'")
+
+
+async def export_complaints(
+    encoder,
+    gzip: bool = False,
+    page_size: int = 1000,
+    department: Optional[str] = None,
+    ward: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Stream the filtered complaints table through an encoder from make_encoder.
+    Memory use is one page plus the encoder's buffer, regardless of table size.
+    """
+    # wbits=31 produces a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    chunk = emit(encoder.header())
+    if chunk:
+        yield chunk
+    async for rows in complaints_repo.iter_complaints(
+        page_size=page_size, department=department, ward=ward, since=since, until=until
+    ):
+        chunk = emit(encoder.encode(rows))
+        if chunk:
+            yield chunk
+    tail = emit(encoder.footer())
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,279 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from broker import broker
+from config import settings
+from db import complaints_repo
+from services.sla import parse_timestamp
+from sockets import manager
+from utils.leader import leader
+from utils.metrics import registry
+
+# Metres per degree of latitude; a degree of longitude is this times cos(latitude)
+METRES_PER_DEGREE = 111_320.0
+
+events_fired = registry.counter("hotspot_events", "HOTSPOT / HOTSPOT_CLEARED events broadcast, by type.")
+
+CellKey = Tuple[int, int, str]
+
+
+class _Cell:
+    """Decayed complaint counts of one (grid cell, category), both as of 'last'."""
+
+    __slots__ = ("recent", "baseline", "last", "ward", "department", "active", "reported")
+
+    def __init__(self, t: float):
+        self.recent = 0.0
+        self.baseline = 0.0
+        self.last = t
+        self.ward: Optional[str] = None
+        self.department: Optional[str] = None
+        self.active = False
+        # 'recent' when the last HOTSPOT event went out; it is re-sent when the count doubles
+        self.reported = 0.0
+
+
+class HotspotDetector:
+    """
+    Streaming spatio-temporal hotspot detection over new complaints.
+
+    Each complaint lands in a (grid cell, category) counter holding two exponentially
+    decayed counts: 'recent' with a time constant of 'window' seconds (the sliding
+    window) and 'baseline' with 'baseline_window' seconds (the learned normal rate of
+    that cell). Decay is applied lazily from the cell's last update, so ingesting a
+    complaint touches one cell whatever the history length, and counts are order
+    independent, which lets late rows and the startup replay be added in any order.
+
+    A cell becomes a hotspot when its recent count reaches 'min_count' and 'ratio'
+    times what its baseline predicts for one window; it clears once both fall below
+    half of that. Only the leader worker broadcasts; every worker keeps the state.
+    """
+
+    def __init__(
+        self,
+        cell_metres: float = 500,
+        window: float = 3600,
+        baseline_window: float = 7 * 86400,
+        min_count: int = 5,
+        ratio: float = 3.0,
+        history: float = 21 * 86400,
+    ):
+        self.lat_step = cell_metres / METRES_PER_DEGREE
+        self.window = window
+        self.baseline_window = baseline_window
+        self.min_count = min_count
+        self.ratio = ratio
+        self.history = history
+        self.cells: Dict[CellKey, _Cell] = {}
+        self.active: Set[CellKey] = set()
+        # Baselines are only as old as the data they were learned from
+        self.observed_since = time.time() - history
+        self.ready = False
+        # Ids reported while the replay was paging, so they are not counted twice
+        self._seen: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        registry.gauge("hotspot_cells", "Grid cells (per category) with complaint history.", lambda: len(self.cells))
+        registry.gauge("hotspots_active", "Cells currently flagged as hotspots.", lambda: len(self.active))
+
+    # -- grid --
+
+    def cell_of(self, lat: float, lng: float, category: str) -> CellKey:
+        row = math.floor(lat / self.lat_step)
+        # Columns are sized per row so cells stay roughly square away from the equator
+        lng_step = self.lat_step / max(math.cos(math.radians((row + 0.5) * self.lat_step)), 1e-6)
+        return row, math.floor(lng / lng_step), category
+
+    def bounds(self, key: CellKey) -> Dict[str, float]:
+        row, column, _ = key
+        lng_step = self.lat_step / max(math.cos(math.radians((row + 0.5) * self.lat_step)), 1e-6)
+        return {
+            "south": row * self.lat_step, "north": (row + 1) * self.lat_step,
+            "west": column * lng_step, "east": (column + 1) * lng_step,
+        }
+
+    # -- counting --
+
+    def _decay(self, cell: _Cell, now: float) -> Tuple[float, float]:
+        """Both counts as of 'now' (never earlier than the cell's last update)."""
+        elapsed = max(now - cell.last, 0.0)
+        return cell.recent * math.exp(-elapsed / self.window), cell.baseline * math.exp(-elapsed / self.baseline_window)
+
+    def expected(self, cell: _Cell, now: float) -> float:
+        """Complaints the cell's baseline rate predicts for one window."""
+        _, baseline = self._decay(cell, now)
+        # A decayed sum over a span shorter than its time constant undercounts the rate
+        age = max(now - self.observed_since, self.window)
+        rate = baseline / (self.baseline_window * (1 - math.exp(-age / self.baseline_window)))
+        return rate * self.window
+
+    def _add(self, key: CellKey, t: float, ward: Optional[str], department: Optional[str]) -> _Cell:
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = _Cell(t)
+        if t >= cell.last:
+            cell.recent, cell.baseline = self._decay(cell, t)
+            cell.recent += 1
+            cell.baseline += 1
+            cell.last = t
+            cell.ward, cell.department = ward or cell.ward, department or cell.department
+        else:
+            # Late or replayed complaint: add its contribution as of the cell's last update
+            cell.recent += math.exp(-(cell.last - t) / self.window)
+            cell.baseline += math.exp(-(cell.last - t) / self.baseline_window)
+            cell.ward, cell.department = cell.ward or ward, cell.department or department
+        return cell
+
+    def _state(self, key: CellKey, cell: _Cell, now: float) -> str:
+        """'onset', 'grew', 'cleared' or '' after re-evaluating the cell at 'now'."""
+        recent, _ = self._decay(cell, now)
+        threshold = max(self.min_count, self.ratio * self.expected(cell, now))
+        # A burst of N complaints has decayed to just under N by the time the last one lands
+        if not cell.active and recent >= 0.95 * threshold:
+            cell.active, cell.reported = True, recent
+            self.active.add(key)
+            return "onset"
+        if cell.active and recent < threshold / 2:
+            cell.active = False
+            self.active.discard(key)
+            return "cleared"
+        if cell.active and recent >= 2 * cell.reported:
+            cell.reported = recent
+            return "grew"
+        return ""
+
+    def describe(self, key: CellKey, now: float) -> Dict[str, Any]:
+        cell = self.cells[key]
+        recent, _ = self._decay(cell, now)
+        bounds = self.bounds(key)
+        return {
+            "id": f"{key[0]}:{key[1]}:{key[2]}",
+            "category": key[2],
+            "ward": cell.ward,
+            "department": cell.department,
+            "latitude": round((bounds["south"] + bounds["north"]) / 2, 6),
+            "longitude": round((bounds["west"] + bounds["east"]) / 2, 6),
+            "bounds": {side: round(value, 6) for side, value in bounds.items()},
+            "count": round(recent, 2),
+            "expected": round(self.expected(cell, now), 3),
+            "last_complaint_at": datetime.fromtimestamp(cell.last, timezone.utc).isoformat(),
+        }
+
+    # -- stream --
+
+    @staticmethod
+    def _item(row: Dict[str, Any]) -> Optional[list]:
+        if row.get("latitude") is None or row.get("longitude") is None or not row.get("category"):
+            return None
+        t = parse_timestamp(row["timestamp"]).timestamp() if row.get("timestamp") else time.time()
+        return [
+            str(row["id"]), float(row["latitude"]), float(row["longitude"]),
+            row["category"], row.get("ward"), row.get("department"), t,
+        ]
+
+    def observe(self, rows: Iterable[Dict[str, Any]]):
+        """Feed created complaints to every worker's detector; rows without coordinates are skipped."""
+        items = [item for item in map(self._item, rows) if item]
+        if items:
+            broker.publish("hotspots", items)
+
+    def apply(self, items: List[list]):
+        """Broker handler: count each complaint, then re-evaluate the touched and active cells."""
+        touched = set()
+        for complaint_id, lat, lng, category, ward, department, t in items:
+            if not self.ready:
+                self._seen.add(complaint_id)
+            key = self.cell_of(lat, lng, category)
+            self._add(key, t, ward, department)
+            touched.add(key)
+        if self.ready:
+            self._evaluate(touched | self.active, time.time())
+
+    def _evaluate(self, keys: Iterable[CellKey], now: float):
+        for key in list(keys):
+            change = self._state(key, self.cells[key], now)
+            if change and leader.acquire():
+                asyncio.get_running_loop().create_task(self._publish(key, change, now))
+
+    async def _publish(self, key: CellKey, change: str, now: float):
+        hotspot = self.describe(key, now)
+        message_type = "HOTSPOT_CLEARED" if change == "cleared" else "HOTSPOT"
+        try:
+            await manager.broadcast_to_channel(hotspot["department"] or "admin", {
+                "type": message_type,
+                "data": {**hotspot, "change": change},
+            })
+            events_fired.inc(type=message_type)
+        except Exception as e:
+            print(f" [HOTSPOT] Failed to broadcast {change} for {hotspot['id']}: {e}")
+        if change == "onset":
+            print(f" [HOTSPOT] {hotspot['category']} in {hotspot['ward']}: {hotspot['count']} recent vs {hotspot['expected']} expected")
+
+    async def replay(self):
+        """Learn baselines from the last 'history' seconds of complaints without broadcasting."""
+        started = time.perf_counter()
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.history)
+        fields = ["id", "latitude", "longitude", "category", "ward", "department"]
+        replayed = 0
+        async for rows in complaints_repo.iter_complaints(page_size=5000, fields=fields, since=since.isoformat()):
+            for row in rows:
+                item = self._item(row)
+                if item and item[0] not in self._seen:
+                    key = self.cell_of(item[1], item[2], item[3])
+                    self._add(key, item[6], item[4], item[5])
+                    replayed += 1
+            await asyncio.sleep(0)
+        # Hotspots already under way are flagged silently; the previous process announced them
+        now = time.time()
+        for key, cell in self.cells.items():
+            self._state(key, cell, now)
+        self._seen.clear()
+        self.ready = True
+        print(f" [HOTSPOT] Replayed {replayed} complaints into {len(self.cells)} cells, {len(self.active)} active hotspots ({time.perf_counter() - started:.1f}s)")
+
+    async def _run(self):
+        try:
+            await self.replay()
+        except Exception as e:
+            # Baselines start empty and fill from the live stream
+            self.observed_since = time.time()
+            self._seen.clear()
+            self.ready = True
+            print(f" [HOTSPOT] History replay failed, learning from new complaints only: {e}")
+
+    def start(self):
+        broker.subscribe("hotspots", self.apply)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    # -- queries --
+
+    def current(self, category: Optional[str] = None, ward: Optional[str] = None) -> Dict[str, Any]:
+        """Active hotspots, largest first. Cells that cooled down since the last complaint clear here."""
+        now = time.time()
+        self._evaluate(self.active, now)
+        hotspots = [
+            self.describe(key, now) for key in self.active
+            if (not category or key[2] == category) and (not ward or self.cells[key].ward == ward)
+        ]
+        hotspots.sort(key=lambda hotspot: hotspot["count"], reverse=True)
+        return {"ready": self.ready, "hotspots": hotspots}
+
+
+hotspot_detector = HotspotDetector(
+    cell_metres=settings.HOTSPOT_CELL_METRES,
+    window=settings.HOTSPOT_WINDOW_MINUTES * 60,
+    baseline_window=settings.HOTSPOT_BASELINE_HOURS * 3600,
+    min_count=settings.HOTSPOT_MIN_COUNT,
+    ratio=settings.HOTSPOT_RATIO,
+    history=settings.HOTSPOT_HISTORY_DAYS * 86400,
+)
@@ -0,0 +1,374 @@
+import asyncio
+import heapq
+import itertools
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from broker import broker
+from config import settings
+from db import complaints_repo
+from sockets import manager
+from utils.leader import leader
+from utils.metrics import registry
+
+# Resolution window per urgency; sla_eta is the human-readable form of the same thing
+SLA_HOURS = {"critical": 2, "high": 2, "medium": 24, "low": 72}
+CLOSED_STATUSES = {"resolved", "rejected"}
+
+# How often a worker that is not firing events retries the leader lock
+LEADER_RETRY_SECONDS = 5.0
+
+events_fired = registry.counter("sla_events", "SLA_AT_RISK / SLA_BREACHED events broadcast, by kind.")
+
+Key = Tuple[float, str]
+Entry = Tuple[float, str, str, Optional[str], Optional[str], str]
+
+
+def parse_timestamp(value: Union[str, datetime]) -> datetime:
+    """Aware datetime from a stored value; naive ones come from datetime.now() on this server."""
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return moment if moment.tzinfo else moment.astimezone()
+
+
+def sla_deadline(urgency: Optional[str], timestamp: Union[str, datetime, None] = None) -> str:
+    """Absolute deadline (UTC ISO 8601) of a complaint filed at 'timestamp' with this urgency."""
+    start = parse_timestamp(timestamp) if timestamp else datetime.now(timezone.utc)
+    hours = SLA_HOURS.get((urgency or "").lower(), 24)
+    return (start + timedelta(hours=hours)).astimezone(timezone.utc).isoformat()
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+class DeadlineIndex:
+    """
+    (deadline, id) pairs in sorted order, held as a list of bounded sorted chunks
+    plus the max of each chunk and a Fenwick tree over the chunk lengths.
+    Insert and remove are a bisect over the maxes and one inside a chunk
+    (O(log n) + a memmove of at most 2 * chunk entries) plus an O(log n) tree
+    update; splitting or dropping a chunk rebuilds the tree in O(n / chunk), which
+    happens at most once every 'chunk' inserts. count_before is two bisects and a
+    prefix sum, O(log n); head walks from the front, O(limit).
+    """
+
+    def __init__(self, chunk: int = 512):
+        self.chunk = chunk
+        self._chunks: List[List[Key]] = []
+        self._maxes: List[Key] = []
+        # 1-based Fenwick tree: prefix sums of len(self._chunks[i])
+        self._tree: List[int] = [0]
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _rebuild(self):
+        tree = [0] * (len(self._chunks) + 1)
+        for i, chunk in enumerate(self._chunks, 1):
+            tree[i] += len(chunk)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, index: int, delta: int):
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, index: int) -> int:
+        """Total length of the first 'index' chunks."""
+        total, i = 0, index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, key: Key):
+        self._len += 1
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._rebuild()
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._chunks[i], key)
+        if len(self._chunks[i]) > 2 * self.chunk:
+            chunk = self._chunks[i]
+            self._chunks.insert(i + 1, chunk[self.chunk:])
+            del chunk[self.chunk:]
+            self._maxes.insert(i, chunk[-1])
+            self._rebuild()
+        else:
+            self._update(i, 1)
+
+    def remove(self, key: Key) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            return False
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            return False
+        del chunk[j]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[i]
+            del self._maxes[i]
+            self._rebuild()
+            return True
+        if j == len(chunk):
+            self._maxes[i] = chunk[-1]
+        self._update(i, -1)
+        return True
+
+    def count_before(self, t: float) -> int:
+        """Entries with deadline < t."""
+        key = (t, "")
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            return self._len
+        return self._prefix(i) + bisect_left(self._chunks[i], key)
+
+    def head(self, before: float, limit: int) -> List[Key]:
+        """Up to 'limit' earliest entries with deadline < before, in deadline order."""
+        result: List[Key] = []
+        for chunk in self._chunks:
+            for key in chunk:
+                if key[0] >= before or len(result) >= limit:
+                    return result
+                result.append(key)
+        return result
+
+
+class SLATracker:
+    """
+    In-memory deadline index of every open complaint, rebuilt from the database at
+    startup and kept current from the write paths through the broker, so every worker
+    can answer the at-risk query. A single asyncio task sleeps until the earliest
+    pending timer (min-heap, stale timers skipped lazily) and broadcasts SLA_AT_RISK
+    once 'at_risk_fraction' of the window remains and SLA_BREACHED at the deadline.
+    Only the leader worker (utils/leader.py) broadcasts; the others drain their
+    timers silently and take over within LEADER_RETRY_SECONDS if it exits.
+    """
+
+    def __init__(self, at_risk_fraction: float = 0.2, page_size: int = 5000):
+        self.at_risk_fraction = at_risk_fraction
+        self.page_size = page_size
+        self.ready = False
+        # id -> (deadline, department, urgency, ward, category, status); the last three
+        # let SLA events reach dashboards subscribed with those filters
+        self._entries: Dict[str, Entry] = {}
+        self._all = DeadlineIndex()
+        self._by_department: Dict[str, DeadlineIndex] = defaultdict(DeadlineIndex)
+        # (fire_at, order, kind, id, deadline); a timer is stale once its id's deadline changed
+        self._timers: List[Tuple[float, int, str, str, float]] = []
+        self._order = itertools.count()
+        # Ids written while the rebuild was paging; their rebuild rows may be older
+        self._touched: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        registry.gauge("sla_open", "Open complaints tracked for SLA breaches.", lambda: len(self._entries))
+        registry.gauge("sla_overdue", "Open complaints past their SLA deadline.", lambda: self._all.count_before(time.time()))
+
+    # -- index maintenance --
+
+    def _forget(self, complaint_id: str):
+        entry = self._entries.pop(complaint_id, None)
+        if entry is None:
+            return
+        deadline, department = entry[0], entry[1]
+        self._all.remove((deadline, complaint_id))
+        index = self._by_department.get(department)
+        if index is not None:
+            index.remove((deadline, complaint_id))
+            if not index:
+                del self._by_department[department]
+
+    def _push_timer(self, fire_at: float, kind: str, complaint_id: str, deadline: float):
+        heapq.heappush(self._timers, (fire_at, next(self._order), kind, complaint_id, deadline))
+        if self._timers[0][0] == fire_at and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _track(self, complaint_id: str, entry: Entry):
+        deadline, department, urgency = entry[:3]
+        previous = self._entries.get(complaint_id)
+        if previous is not None:
+            self._forget(complaint_id)
+        self._entries[complaint_id] = entry
+        self._all.add((deadline, complaint_id))
+        self._by_department[department].add((deadline, complaint_id))
+        if previous is not None and previous[0] == deadline:
+            # Same deadline (reassigned or a status change): the pending timers still apply
+            return
+
+        now = time.time()
+        at_risk_at = deadline - self.at_risk_fraction * SLA_HOURS.get(urgency, 24) * 3600
+        if at_risk_at > now:
+            self._push_timer(at_risk_at, "at_risk", complaint_id, deadline)
+        if deadline > now:
+            self._push_timer(deadline, "breach", complaint_id, deadline)
+        if len(self._timers) > 2 * len(self._entries) + 1024:
+            self._compact()
+
+    def _compact(self):
+        self._timers = [
+            timer for timer in self._timers
+            if self._entries.get(timer[3], (None,))[0] == timer[4]
+        ]
+        heapq.heapify(self._timers)
+
+    def apply(self, items: List[list]):
+        """
+        Broker handler: [id, deadline epoch or None (closed), department, urgency,
+        ward, category, status] per complaint.
+        """
+        for complaint_id, *entry in items:
+            if not self.ready:
+                self._touched.add(complaint_id)
+            if entry[0] is None:
+                self._forget(complaint_id)
+            else:
+                self._track(complaint_id, tuple(entry))
+
+    @staticmethod
+    def _item(row: Dict[str, Any]) -> list:
+        complaint_id = str(row["id"])
+        urgency = (row.get("urgency") or "medium").lower()
+        status = (row.get("status") or "submitted").lower()
+        if status in CLOSED_STATUSES:
+            return [complaint_id, None, None, None, None, None, None]
+        deadline = row.get("sla_deadline") or sla_deadline(urgency, row.get("timestamp"))
+        return [
+            complaint_id, parse_timestamp(deadline).timestamp(), row.get("department") or "General", urgency,
+            row.get("ward"), row.get("category"), status,
+        ]
+
+    def observe(self, rows: Iterable[Dict[str, Any]]):
+        """Record created or updated complaints in every worker's index."""
+        items = [self._item(row) for row in rows]
+        if items:
+            broker.publish("sla", items)
+
+    async def rebuild(self):
+        started = time.perf_counter()
+        async for rows in complaints_repo.iter_open(self.page_size):
+            for row in rows:
+                if str(row["id"]) in self._touched:
+                    continue
+                complaint_id, *entry = self._item(row)
+                if entry[0] is not None:
+                    self._track(complaint_id, tuple(entry))
+            # Paging is I/O bound but indexing a page is not; let requests in between
+            await asyncio.sleep(0)
+        self._touched.clear()
+        self.ready = True
+        print(f" [SLA] Tracking {len(self._entries)} open complaints (rebuilt in {time.perf_counter() - started:.1f}s)")
+
+    # -- timers --
+
+    def _describe(self, complaint_id: str, now: float) -> Dict[str, Any]:
+        deadline, department, urgency, ward, category, status = self._entries[complaint_id]
+        return {
+            "id": complaint_id,
+            "department": department,
+            "urgency": urgency,
+            "ward": ward,
+            "category": category,
+            "status": status,
+            "sla_deadline": _iso(deadline),
+            "seconds_left": round(deadline - now),
+        }
+
+    async def _fire(self, kind: str, complaint_id: str, now: float):
+        data = self._describe(complaint_id, now)
+        await manager.broadcast_to_channel(data["department"], {
+            "type": "SLA_BREACHED" if kind == "breach" else "SLA_AT_RISK",
+            "data": data,
+        })
+        events_fired.inc(kind=kind)
+
+    async def _run(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            # Keep serving what the write paths report; restart the worker to retry
+            self.ready = True
+            print(f" [SLA] Rebuild failed, tracking new writes only: {e}")
+        while True:
+            leading = leader.acquire()
+            self._wakeup.clear()
+            now = time.time()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, kind, complaint_id, deadline = heapq.heappop(self._timers)
+                entry = self._entries.get(complaint_id)
+                if entry is None or entry[0] != deadline or not leading:
+                    continue
+                try:
+                    await self._fire(kind, complaint_id, now)
+                except Exception as e:
+                    print(f" [SLA] Failed to broadcast {kind} for {complaint_id}: {e}")
+            timeout = self._timers[0][0] - time.time() if self._timers else None
+            if not leading:
+                timeout = min(timeout, LEADER_RETRY_SECONDS) if timeout is not None else LEADER_RETRY_SECONDS
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        broker.subscribe("sla", self.apply)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    # -- queries --
+
+    def at_risk(self, within: float, department: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Open complaints whose deadline passed or falls within 'within' seconds, earliest first."""
+        now = time.time()
+        index = self._by_department.get(department, DeadlineIndex()) if department else self._all
+        cutoff = now + within
+        complaints = []
+        for deadline, complaint_id in index.head(cutoff, limit):
+            complaints.append({**self._describe(complaint_id, now), "breached": deadline <= now})
+        return {
+            "ready": self.ready,
+            "open": len(index),
+            "overdue": index.count_before(now),
+            "at_risk": index.count_before(cutoff),
+            "complaints": complaints,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "leader": leader.held,
+            "open": len(self._entries),
+            "overdue": self._all.count_before(time.time()),
+            "pending_timers": len(self._timers),
+            "next_timer": _iso(self._timers[0][0]) if self._timers else None,
+        }
+
+
+sla_tracker = SLATracker(
+    at_risk_fraction=settings.SLA_AT_RISK_FRACTION,
+    page_size=settings.SLA_REBUILD_PAGE,
+)
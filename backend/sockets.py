@@ -1,37 +1,415 @@
+import asyncio
+import itertools
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import orjson
 from fastapi import WebSocket
-from typing import List, Dict
 
-class ConnectionManager:
+from broker import Broker, broker
+from config import settings
+from utils.metrics import registry, span
+
+# What to do when a client's send queue is full:
+#   drop_oldest  - discard the oldest queued frame to make room (client sees the latest state)
+#   drop_newest  - discard the incoming frame
+#   disconnect   - close the socket; the client reconnects and re-fetches
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+events_published = registry.counter("ws_events_published", "Events broadcast, by channel.")
+frames_dropped = registry.counter("ws_frames_dropped", "Frames dropped by the slow-consumer policy, by channel.")
+clients_reaped = registry.counter("ws_clients_reaped", "Dead or too-slow WebSocket clients closed by the server.")
+
+# Subscription filter name -> complaint field it matches
+FILTER_FIELDS = {"wards": "ward", "urgency": "urgency", "categories": "category", "statuses": "status"}
+MAX_FILTER_VALUES = 100
+
+# Filterable values of an event: {field: [values]}, or None for events every subscriber gets
+Attributes = Optional[Dict[str, List[str]]]
+
+
+def event_attributes(message: dict) -> Attributes:
+    """Collect the filterable fields of the complaint(s) an event carries."""
+    data = message.get("data")
+    if isinstance(data, dict) and isinstance(data.get("complaints"), list):
+        complaints = data["complaints"]
+    elif isinstance(data, dict) and "id" in data:
+        complaints = [data]
+    else:
+        return None
+    attributes: Dict[str, Set[str]] = defaultdict(set)
+    for complaint in complaints:
+        for field in FILTER_FIELDS.values():
+            if complaint.get(field) is not None:
+                attributes[field].add(str(complaint[field]))
+    return {field: sorted(values) for field, values in attributes.items()}
+
+
+class ChannelStream:
+    """Per-channel sequence counter plus a ring buffer of recent frames for replay."""
+
+    def __init__(self, capacity: int):
+        self.seq = 0
+        self.buffer: Deque[Tuple[int, str, Attributes]] = deque(maxlen=capacity)
+
+    def append(self, body: str, epoch: str, attributes: Attributes) -> str:
+        """Stamp a serialized event object with the next sequence number and retain it."""
+        self.seq += 1
+        # Splice the envelope fields in rather than re-serializing the event
+        frame = f'{{"seq":{self.seq},"epoch":"{epoch}",{body[1:]}'
+        self.buffer.append((self.seq, frame, attributes))
+        return frame
+
+    def since(self, seq: int) -> Optional[List[Tuple[str, Attributes]]]:
+        """Frames after 'seq', or None if some of them already rolled out of the buffer."""
+        if seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self.buffer or self.buffer[0][0] > seq + 1:
+            return None
+        start = seq + 1 - self.buffer[0][0]
+        return [(frame, attributes) for _, frame, attributes in itertools.islice(self.buffer, start, None)]
+
+
+class ClientConnection:
+    """
+    One WebSocket plus its bounded send queue, drained by a dedicated writer task.
+    With a coalescing window, frames are held and sent as one BATCH frame per window.
+    """
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, channel: str, max_queue: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.channel = channel
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+        self.writer: Optional[asyncio.Task] = None
+        # {field: allowed values}; a field that is absent is unfiltered
+        self.filters: Dict[str, Set[str]] = {}
+        self.coalesce: float = 0.0
+        self._held: List[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self):
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def matches(self, attributes: Attributes) -> bool:
+        if attributes is None:
+            return True
+        return all(
+            not allowed.isdisjoint(attributes.get(field, ()))
+            for field, allowed in self.filters.items()
+        )
+
+    def send(self, frame: str, policy: str):
+        """Deliver an event frame, holding it for the next BATCH when coalescing."""
+        if not self.coalesce:
+            self.offer(frame, policy)
+            return
+        self._held.append(frame)
+        if len(self._held) >= self.queue.maxsize:
+            self.flush_held(policy)
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.coalesce, self.flush_held, policy)
+
+    def flush_held(self, policy: str):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        held, self._held = self._held, []
+        if len(held) == 1:
+            self.offer(held[0], policy)
+        elif held:
+            self.offer('{"type":"BATCH","events":[' + ",".join(held) + "]}", policy)
+
+    def offer(self, frame: str, policy: str) -> bool:
+        """Queue a pre-serialized frame without waiting. Returns False if the client was dropped."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if policy == "disconnect":
+            print(f"WS client on {self.channel} is too slow, disconnecting")
+            self.manager.reap(self)
+            return False
+        self.dropped += 1
+        frames_dropped.inc(channel=self.channel)
+        if policy == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(frame)
+        return True
+
+    async def _write_loop(self):
+        while True:
+            frame = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(frame), timeout=settings.WS_SEND_TIMEOUT)
+            except Exception as e:
+                print(f"Failed to send WS message on {self.channel}: {e}")
+                self.manager.reap(self)
+                return
+
+    async def close(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+
+class SubscriptionIndex:
+    """
+    A channel's subscribers, indexed by filter value so an event is matched with
+    set lookups on its own field values instead of testing every subscriber.
+    """
+
     def __init__(self):
-        # Active connections: { "department_name": [websocket1, websocket2], "admin": [ws3] }
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.members: Set[ClientConnection] = set()
+        self._by_value: Dict[str, Dict[str, Set[ClientConnection]]] = {
+            field: defaultdict(set) for field in FILTER_FIELDS.values()
+        }
+        # Subscribers that do not filter on a field match any value of it
+        self._unfiltered: Dict[str, Set[ClientConnection]] = {field: set() for field in FILTER_FIELDS.values()}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def add(self, connection: ClientConnection):
+        self.members.add(connection)
+        for field in FILTER_FIELDS.values():
+            if field in connection.filters:
+                for value in connection.filters[field]:
+                    self._by_value[field][value].add(connection)
+            else:
+                self._unfiltered[field].add(connection)
+
+    def discard(self, connection: ClientConnection):
+        if connection not in self.members:
+            return
+        self.members.discard(connection)
+        for field in FILTER_FIELDS.values():
+            self._unfiltered[field].discard(connection)
+            for value in connection.filters.get(field, ()):
+                subscribers = self._by_value[field].get(value)
+                if subscribers is not None:
+                    subscribers.discard(connection)
+                    if not subscribers:
+                        del self._by_value[field][value]
+
+    def match(self, attributes: Attributes) -> Set[ClientConnection]:
+        """
+        Subscribers whose filters accept the event. For multi-complaint events each
+        field may match on a different complaint; clients should filter the batch.
+        """
+        if attributes is None:
+            return set(self.members)
+        candidates: Optional[Set[ClientConnection]] = None
+        # Most selective fields first keeps the intersections small
+        for field in sorted(FILTER_FIELDS.values(), key=lambda f: len(self._unfiltered[f])):
+            matched = set(self._unfiltered[field])
+            for value in attributes.get(field, ()):
+                matched |= self._by_value[field].get(value, set())
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                break
+        return candidates or set()
+
+
+class ConnectionManager:
+    """
+    Tracks this process's WebSocket clients. Broadcasts go through the broker,
+    so subscribers connected to other worker processes receive them too.
+
+    Every frame carries a per-channel 'seq' and this process's 'epoch'. Clients that
+    reconnect with ?since=<seq>&epoch=<epoch> get the frames they missed replayed, or
+    a RESYNC frame when those are gone (buffer rolled over, or a different process).
+
+    Clients may narrow and batch their feed with a message such as
+    {"type": "SUBSCRIBE", "filters": {"wards": [...], "urgency": [...]}, "coalesce_ms": 250}.
+    Filtered clients see gaps in 'seq'; that is expected, not a reason to resync.
+    """
+
+    def __init__(self, broker: Broker, max_queue: int = 256, policy: str = "drop_oldest", replay_size: int = 1000):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy '{policy}'")
+        self.broker = broker
+        self.broker.subscribe("ws", self._deliver)
+        self.max_queue = max_queue
+        self.policy = policy
+        # Active connections: { "department_name": index of conns, "admin": index of conns }
+        self.active_connections: Dict[str, SubscriptionIndex] = {}
+        self.reaped = 0
+        self.epoch = uuid.uuid4().hex[:8]
+        self.replay_size = replay_size
+        self.streams: Dict[str, ChannelStream] = {}
+
+    def _stream(self, channel: str) -> ChannelStream:
+        stream = self.streams.get(channel)
+        if stream is None:
+            stream = self.streams[channel] = ChannelStream(self.replay_size)
+        return stream
 
-    async def connect(self, websocket: WebSocket, channel: str):
+    def _missed(self, channel: str, since: int, epoch: Optional[str]) -> Optional[List[Tuple[str, Attributes]]]:
+        if epoch is not None and epoch != self.epoch:
+            # The client's sequence numbers were issued by another (or a restarted) process
+            return None
+        stream = self.streams.get(channel)
+        if stream is None:
+            return [] if since == 0 else None
+        missed = stream.since(since)
+        if missed is not None and len(missed) >= self.max_queue:
+            # Replaying would overflow the send queue and silently drop frames
+            return None
+        return missed
+
+    def _resume(self, connection: ClientConnection, since: Optional[int], epoch: Optional[str]):
+        """Send HELLO plus the missed frames the client's filters accept, or RESYNC."""
+        channel = connection.channel
+        last_seq = self.streams[channel].seq if channel in self.streams else 0
+        missed = [] if since is None else self._missed(channel, since, epoch)
+        if missed is None:
+            connection.offer(orjson.dumps({"type": "RESYNC", "epoch": self.epoch, "seq": last_seq}).decode("utf-8"), self.policy)
+            return
+        connection.offer(orjson.dumps({"type": "HELLO", "epoch": self.epoch, "seq": last_seq}).decode("utf-8"), self.policy)
+        for frame, attributes in missed:
+            if connection.matches(attributes):
+                connection.send(frame, self.policy)
+
+    async def connect(
+        self, websocket: WebSocket, channel: str, since: Optional[int] = None, epoch: Optional[str] = None
+    ) -> ClientConnection:
         await websocket.accept()
-        if channel not in self.active_connections:
-            self.active_connections[channel] = []
-        self.active_connections[channel].append(websocket)
+        connection = ClientConnection(self, websocket, channel, self.max_queue)
+        connection.start()
+        # No awaits from here on: the replay and live registration cannot miss an event in between
+        self._resume(connection, since, epoch)
+        self.active_connections.setdefault(channel, SubscriptionIndex()).add(connection)
         print(f"WS client connected to channel: {channel}")
+        return connection
+
+    def subscribe(self, connection: ClientConnection, request: Dict[str, Any]):
+        """Apply a SUBSCRIBE message: replace filters and coalescing, optionally replay from 'since'."""
+        filters: Dict[str, Set[str]] = {}
+        for name, values in (request.get("filters") or {}).items():
+            if name not in FILTER_FIELDS:
+                raise ValueError(f"Unknown filter '{name}'; expected one of: {', '.join(FILTER_FIELDS)}")
+            if not isinstance(values, list) or len(values) > MAX_FILTER_VALUES:
+                raise ValueError(f"Filter '{name}' must be a list of at most {MAX_FILTER_VALUES} values")
+            if values:
+                filters[FILTER_FIELDS[name]] = {str(value) for value in values}
+        coalesce_ms = request.get("coalesce_ms") or 0
+        if not isinstance(coalesce_ms, (int, float)) or not 0 <= coalesce_ms <= settings.WS_MAX_COALESCE_MS:
+            raise ValueError(f"coalesce_ms must be between 0 and {settings.WS_MAX_COALESCE_MS:g}")
+
+        index = self.active_connections.get(connection.channel)
+        if index is None or connection.closed:
+            return
+        index.discard(connection)
+        connection.flush_held(self.policy)
+        connection.filters = filters
+        connection.coalesce = coalesce_ms / 1000
+        index.add(connection)
+        connection.offer(orjson.dumps({
+            "type": "SUBSCRIBED",
+            "filters": {name: sorted(filters.get(field, ())) for name, field in FILTER_FIELDS.items()},
+            "coalesce_ms": coalesce_ms,
+        }).decode("utf-8"), self.policy)
+        if request.get("since") is not None:
+            self._resume(connection, int(request["since"]), request.get("epoch"))
+
+    def handle_message(self, connection: ClientConnection, text: str):
+        """Control messages sent by the client; anything else is ignored as a keepalive."""
+        try:
+            request = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return
+        if not isinstance(request, dict) or request.get("type") != "SUBSCRIBE":
+            return
+        try:
+            self.subscribe(connection, request)
+        except (ValueError, TypeError) as e:
+            connection.offer(orjson.dumps({"type": "ERROR", "detail": str(e)}).decode("utf-8"), self.policy)
+
+    def disconnect(self, connection: ClientConnection):
+        """Forget a connection and stop its writer. Safe to call more than once."""
+        if connection.closed:
+            return
+        connection.closed = True
+        if connection._flush_handle is not None:
+            connection._flush_handle.cancel()
+        subscribers = self.active_connections.get(connection.channel)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.active_connections[connection.channel]
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        print(f"WS client disconnected from channel: {connection.channel}")
+
+    def reap(self, connection: ClientConnection):
+        """Drop a dead or hopelessly slow client and close its socket in the background."""
+        if connection.closed:
+            return
+        self.reaped += 1
+        clients_reaped.inc()
+        self.disconnect(connection)
+        asyncio.get_running_loop().create_task(connection.close())
+
+    async def broadcast_to_channel(self, channel: str, message: dict, include_admin: bool = True):
+        """Serialize once and publish to every worker; never waits on a client."""
+        with span("ws.broadcast"):
+            frame = orjson.dumps(message, default=str).decode("utf-8")
+            self.broker.publish("ws", [channel, frame, include_admin, event_attributes(message)])
+        events_published.inc(channel=channel)
+
+    def _deliver(self, event):
+        """Broker handler: sequence the event and enqueue it for matching subscribers."""
+        channel, body, include_admin, attributes = event
+        # Broadcast to admin too, which has its own sequence
+        targets = (channel, "admin") if include_admin and channel != "admin" else (channel,)
+        for target in targets:
+            frame = self._stream(target).append(body, self.epoch, attributes)
+            index = self.active_connections.get(target)
+            if index is None:
+                continue
+            for connection in index.match(attributes):
+                connection.send(frame, self.policy)
+
+    def stats(self) -> Dict[str, Any]:
+        connections = [c for subscribers in self.active_connections.values() for c in subscribers]
+        return {
+            "channels": {channel: len(subscribers) for channel, subscribers in self.active_connections.items()},
+            "connections": len(connections),
+            "filtered": sum(1 for c in connections if c.filters),
+            "coalescing": sum(1 for c in connections if c.coalesce),
+            "queued": sum(c.queue.qsize() for c in connections),
+            "dropped": sum(c.dropped for c in connections),
+            "reaped": self.reaped,
+            "policy": self.policy,
+            "epoch": self.epoch,
+            "sequences": {channel: stream.seq for channel, stream in self.streams.items()},
+            "broker": self.broker.stats(),
+        }
+
+
+manager = ConnectionManager(
+    broker, max_queue=settings.WS_SEND_QUEUE_SIZE, policy=settings.WS_SLOW_CONSUMER_POLICY,
+    replay_size=settings.WS_REPLAY_BUFFER,
+)
 
-    def disconnect(self, websocket: WebSocket, channel: str):
-        if channel in self.active_connections:
-            self.active_connections[channel].remove(websocket)
-            print(f"WS client disconnected from channel: {channel}")
-
-    async def broadcast_to_channel(self, channel: str, message: dict):
-        if channel in self.active_connections:
-            for connection in self.active_connections[channel]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Failed to send WS message: {e}")
-        
-        # Always broadcast to admin
-        if channel != "admin" and "admin" in self.active_connections:
-            for connection in self.active_connections["admin"]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    pass
-
-manager = ConnectionManager()
+registry.gauge(
+    "ws_connections", "Connected WebSocket clients in this process, by channel.",
+    lambda: {channel: len(subscribers) for channel, subscribers in manager.active_connections.items()}, label="channel",
+)
+registry.gauge(
+    "ws_queued_frames", "Frames waiting in per-connection send queues.",
+    lambda: sum(c.queue.qsize() for subscribers in manager.active_connections.values() for c in subscribers),
+)
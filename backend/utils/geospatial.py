@@ -1,7 +1,11 @@
 import json
 import os
-from typing import Optional, Tuple, Dict
+import time
+from typing import Optional, Tuple, Dict, List, Sequence
+import numpy as np
+import shapely
 from shapely.geometry import shape, Point
+from shapely.strtree import STRtree
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import functools
@@ -17,9 +21,16 @@ geolocator = Nominatim(user_agent="civicsense_app")
 # Key: (round(lat, 4), round(lng, 4)), Value: Area Name
 geo_cache: Dict[Tuple[float, float], str] = {}
 
+OUTSIDE_BMC_AREA = "Outside BMC Area"
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL = 1.0
+
 class WardDetector:
     def __init__(self):
         self.wards = []
+        self._tree: Optional[STRtree] = None
+        self._names = np.array([], dtype=object)
         self._load_wards()
 
     def _load_wards(self):
@@ -35,16 +46,45 @@ class WardDetector:
                     polygon = shape(feature["geometry"])
                     name = feature["properties"].get("name", "Unknown")
                     self.wards.append({"name": name, "polygon": polygon})
+            # Spatial index for batch lookups (see get_wards)
+            self._tree = STRtree([ward["polygon"] for ward in self.wards])
+            self._names = np.array([ward["name"] for ward in self.wards], dtype=object)
             print(f"Loaded {len(self.wards)} BMC wards.")
         except Exception as e:
             print(f"Error loading ward data: {e}")
 
+    @property
+    def loaded(self) -> bool:
+        return len(self.wards) > 0
+
     def get_ward(self, lat: float, lng: float) -> str:
         point = Point(lng, lat)  # GeoJSON is [lng, lat]
         for ward in self.wards:
             if ward["polygon"].contains(point):
                 return ward["name"]
-        return "Outside BMC Area"
+        return OUTSIDE_BMC_AREA
+
+    def get_wards(self, lats: Sequence[float], lngs: Sequence[float]) -> List[str]:
+        """
+        Vectorized ward lookup for a batch of coordinates.
+        Points are only tested against wards whose bounding boxes they fall in,
+        and ties resolve to the first ward in file order, same as get_ward.
+        """
+        result = np.full(len(lats), OUTSIDE_BMC_AREA, dtype=object)
+        if self._tree is None or len(lats) == 0:
+            return result.tolist()
+
+        points = shapely.points(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        point_idx, ward_idx = self._tree.query(points, predicate="within")
+        if len(point_idx) == 0:
+            return result.tolist()
+
+        # Keep the lowest ward index per point
+        order = np.lexsort((ward_idx, point_idx))
+        point_idx, ward_idx = point_idx[order], ward_idx[order]
+        _, first = np.unique(point_idx, return_index=True)
+        result[point_idx[first]] = self._names[ward_idx[first]]
+        return result.tolist()
 
 # Singleton instance
 detector = WardDetector()
@@ -52,6 +92,9 @@ detector = WardDetector()
 def get_mumbai_ward(lat: float, lng: float) -> str:
     return detector.get_ward(lat, lng)
 
+def get_mumbai_wards(lats: Sequence[float], lngs: Sequence[float]) -> List[str]:
+    return detector.get_wards(lats, lngs)
+
 def get_mumbai_area(lat: float, lng: float) -> str:
     """
     Reverse geocode to get suburb/area name.
@@ -74,6 +117,33 @@ def get_mumbai_area(lat: float, lng: float) -> str:
     
     return "Mumbai"
 
+def get_cached_mumbai_area(lat: float, lng: float, default: str = "Mumbai") -> str:
+    """Area from the reverse-geocoding cache only; never calls the geocoder."""
+    return geo_cache.get((round(lat, 4), round(lng, 4)), default)
+
+def get_mumbai_areas(lats: Sequence[float], lngs: Sequence[float]) -> List[str]:
+    """
+    Batch variant of get_mumbai_area for scripts.
+    Coordinates are grouped by their cache key so each distinct spot is geocoded once,
+    cached spots never reach the geocoder, and lookups that do are spaced
+    NOMINATIM_MIN_INTERVAL apart. This blocks, so keep it off the request path.
+    """
+    keys = [(round(lat, 4), round(lng, 4)) for lat, lng in zip(lats, lngs)]
+    resolved: Dict[Tuple[float, float], str] = {}
+    last_request = 0.0
+    for key in keys:
+        if key in resolved:
+            continue
+        if key in geo_cache:
+            resolved[key] = geo_cache[key]
+            continue
+        wait = last_request + NOMINATIM_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        last_request = time.monotonic()
+        resolved[key] = get_mumbai_area(*key)
+    return [resolved[key] for key in keys]
+
 if __name__ == "__main__":
     # Test coordinates (Marine Drive / Ward A approx)
     test_lat, test_lng = 18.944, 72.823 
@@ -0,0 +1,42 @@
+import fcntl
+from typing import Optional, TextIO
+
+from config import settings
+
+
+class LeaderLock:
+    """
+    Elects one worker process on the host to broadcast events that every worker
+    computes (SLA timers, hotspot onsets), so clients get them once.
+    A non-blocking exclusive flock on a shared file: whoever takes it first keeps it,
+    and the kernel releases it when that process exits, so the others just retry.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.held = False
+        self._file: Optional[TextIO] = None
+
+    def acquire(self) -> bool:
+        """Take the lock if it is free; cheap once held, so callers can ask per event."""
+        if self.held:
+            return True
+        if self._file is None:
+            self._file = open(self.path, "a")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.held = True
+        print(f" [LEADER] This worker holds {self.path} and broadcasts SLA and hotspot events")
+        return True
+
+    def release(self):
+        if self._file is not None:
+            # Closing the file drops the lock for the next worker
+            self._file.close()
+            self._file = None
+        self.held = False
+
+
+leader = LeaderLock(settings.LEADER_LOCK)
@@ -0,0 +1,237 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; spans from sub-millisecond cache hits up to slow model cold starts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Per-request stage timings {stage: seconds}. asyncio.to_thread copies the context,
+# so spans inside executor threads add to the same request's breakdown.
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.type = "counter"
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any):
+        with self._lock:
+            self._values[_key(labels)] += amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.type = "histogram"
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (non-cumulative) + overflow, sum, count]
+        self._series: Dict[LabelKey, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        key = _key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+class Gauge:
+    """
+    Value read at scrape time from a callback, for depths and sizes that already live
+    elsewhere (queues, caches). The callback returns a number or {label value: number}.
+    """
+
+    def __init__(self, name: str, help: str, callback: Callable[[], Any], label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.type = "gauge"
+        self.callback = callback
+        self.label = label
+
+    def samples(self) -> Iterator[str]:
+        try:
+            value = self.callback()
+        except Exception as e:
+            print(f" [METRICS] Gauge {self.name} failed: {e}")
+            return
+        if isinstance(value, dict):
+            for label_value, number in value.items():
+                yield f"{self.name}{_format_labels(((self.label, str(label_value)),))} {_format_value(number)}"
+        elif value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(self.prefix + name, help))
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable[[], Any], label: Optional[str] = None) -> Gauge:
+        # Re-registering replaces the callback (e.g. a singleton recreated in scripts)
+        gauge = Gauge(self.prefix + name, help, callback, label)
+        self._metrics[gauge.name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(prefix="civicsense_")
+
+stage_seconds = registry.histogram("stage_duration_seconds", "Duration of pipeline stages, model calls and broadcasts.")
+stage_errors = registry.counter("stage_errors", "Pipeline stages that raised.")
+request_seconds = registry.histogram("http_request_duration_seconds", "HTTP request latency by route.")
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a block: feeds the stage histogram and the current request's breakdown.
+    Works in async code and in threads started with asyncio.to_thread.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def record(stage: str, seconds: float):
+    """Record an externally measured duration as a stage."""
+    stage_seconds.observe(seconds, stage=stage)
+    add_timing(stage, seconds)
+
+
+def add_timing(stage: str, seconds: float):
+    """Add to the current request's breakdown only (for callers with their own histogram)."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def _server_timing(timings: Dict[str, float], total: float) -> str:
+    entries = [f"{stage.replace('.', '-')};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """
+    Records request latency per route template (not raw path, to keep cardinality bounded)
+    and optionally returns the request's stage breakdown in a Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", _server_timing(timings, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            request_seconds.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
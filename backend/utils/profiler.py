@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Frames where a thread is parked rather than working (event loop select, idle executor
+# workers, blocked queue gets). Stacks ending in one are dropped unless include_idle.
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_base.py", "result"),
+}
+
+Frame = Tuple[str, str, int]
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _short_path(filename: str, roots: List[str]) -> str:
+    for root in roots:
+        if filename.startswith(root):
+            return filename[len(root):].lstrip(os.sep)
+    return filename
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler for every thread of this process: a daemon thread reads
+    sys._current_frames() every interval and counts identical stacks. Nothing is
+    installed in the profiled threads, so a blocked event loop is still sampled.
+    Frames are keyed by function (first line), not by the executing line, so a hot
+    function aggregates into one node.
+    """
+
+    def __init__(self, interval: float = 0.01, thread_filter: Optional[str] = None, include_idle: bool = False):
+        self.interval = interval
+        self.thread_filter = thread_filter
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_tracing = False
+        # Longest prefix first so site-packages wins over its parent directory
+        self._roots = sorted({os.path.abspath(p) for p in sys.path if p}, key=len, reverse=True)
+
+    def start(self, trace_memory: bool = False):
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._started_tracing = True
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        """Stop tracemalloc if start() turned it on; tracing slows every allocation."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _run(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        started = time.perf_counter()
+        next_tick = started
+        while not self._stop.is_set():
+            frames = sys._current_frames()
+            if not names.keys() >= frames.keys():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                name = names.get(ident, f"thread-{ident}")
+                if self.thread_filter and not name.startswith(self.thread_filter):
+                    continue
+                stack = self._walk(frame)
+                if not self.include_idle and (os.path.basename(stack[-1][1]), stack[-1][0]) in _IDLE_FRAMES:
+                    continue
+                self.stacks[(name,) + tuple(stack)] += 1
+            self.samples += 1
+            next_tick += self.interval
+            # Fixed-rate schedule; if sampling overran, skip ahead instead of bursting
+            delay = next_tick - time.perf_counter()
+            if delay < 0:
+                next_tick = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+        self.elapsed = time.perf_counter() - started
+
+    def _walk(self, frame) -> List[Frame]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, _short_path(code.co_filename, self._roots), code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format: 'thread;outer (file:line);...;leaf (file:line) count'."""
+        lines = []
+        for key, count in self.stacks.most_common():
+            thread, frames = key[0], key[1:]
+            names = [thread] + [f"{name} ({path}:{line})" for name, path, line in frames]
+            lines.append(";".join(part.replace(";", ":") for part in names) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """One sampled profile per thread in speedscope's file format (weights in seconds)."""
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict[str, Any]] = []
+        profiles: Dict[str, Dict[str, Any]] = {}
+        for key, count in self.stacks.items():
+            thread = key[0]
+            indices = []
+            for frame in key[1:]:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(frame_index[frame])
+            profile = profiles.setdefault(thread, {
+                "type": "sampled", "name": thread, "unit": "seconds",
+                "startValue": 0, "endValue": 0, "samples": [], "weights": [],
+            })
+            profile["samples"].append(indices)
+            profile["weights"].append(count * self.interval)
+            profile["endValue"] += count * self.interval
+        ordered = sorted(profiles.values(), key=lambda p: p["endValue"], reverse=True)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"civicsense {self.elapsed:.1f}s @ {self.interval * 1000:g}ms",
+            "exporter": "civicsense-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": ordered,
+        }
+
+    def top_allocations(self, limit: int = 25) -> List[Dict[str, Any]]:
+        """Largest live allocations by source line, from tracemalloc."""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        top = []
+        for stat in snapshot.statistics("lineno")[:limit]:
+            frame = stat.traceback[0]
+            top.append({
+                "file": _short_path(frame.filename, self._roots),
+                "line": frame.lineno,
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            })
+        return top
+
+
+# One profile at a time per process; concurrent requests would distort each other
+_active = threading.Lock()
+
+
+def acquire():
+    if not _active.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this process")
+
+
+def release():
+    _active.release()
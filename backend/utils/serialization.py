@@ -0,0 +1,44 @@
+from typing import Any, Dict, List, Optional
+
+import orjson
+from fastapi.responses import Response
+
+# Computed alias fields of ComplaintRead, mapped to the column they copy
+ALIAS_FIELDS = {
+    "classification": "category",
+    "classification_label": "category",
+    "assigned_department": "department",
+    "urgency_score": "urgency",
+    "cluster": "duplicate_group_id",
+}
+
+
+class RowsResponse(Response):
+    """JSON response encoded with orjson; FastAPI's ORJSONResponse is deprecated."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def with_aliases(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Add ComplaintRead's alias fields to a raw row, without building a model."""
+    aliased = dict(row)
+    for alias, column in ALIAS_FIELDS.items():
+        if column in row:
+            aliased[alias] = row[column]
+    return aliased
+
+
+def rows_response(
+    rows: List[Dict[str, Any]], aliases: bool = False, headers: Optional[Dict[str, str]] = None
+) -> RowsResponse:
+    """
+    Encode database rows straight to JSON with orjson.
+    Rows come from PostgREST already typed by the database, so re-validating them
+    through ComplaintRead (UUID/datetime parsing plus five computed fields) is skipped.
+    """
+    if aliases:
+        rows = [with_aliases(row) for row in rows]
+    return RowsResponse(content=rows, headers=headers)
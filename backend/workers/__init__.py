@@ -0,0 +1,14 @@
+from config import settings
+from utils.metrics import registry
+from .outbox import Outbox
+from .enrichment import EnrichmentWorkers, discard_upload
+
+outbox = Outbox(
+    settings.OUTBOX_PATH,
+    lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    on_failed=discard_upload,
+)
+enrichment_workers = EnrichmentWorkers(outbox, concurrency=settings.INGEST_WORKERS)
+
+registry.gauge("outbox_jobs", "Ingestion outbox jobs by status.", outbox.depth, label="status")
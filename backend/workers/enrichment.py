@@ -0,0 +1,106 @@
+import asyncio
+import os
+import traceback
+from typing import List, Optional
+
+from db import complaints_repo
+from services.complaint_pipeline import build_complaint, publish_new_complaint
+from utils.metrics import registry, span
+from workers.outbox import Outbox
+
+jobs_finished = registry.counter("ingest_jobs", "Enrichment jobs finished, by outcome.")
+
+
+def discard_upload(job: dict):
+    """Outbox on_failed hook: a permanently failed job's stored image will never be processed."""
+    image_path = job["payload"].get("image_path")
+    if image_path and os.path.exists(image_path):
+        os.remove(image_path)
+        print(f" [INGEST] Removed upload of failed job {job['id']}")
+
+
+class EnrichmentWorkers:
+    """
+    Pool of asyncio tasks that drain the outbox: run the analysis pipeline,
+    write the enriched row and broadcast it. The complaint id is the job id,
+    so a redelivered job never creates a second row.
+    """
+
+    def __init__(self, outbox: Outbox, concurrency: int = 2, poll_interval: float = 1.0):
+        self.outbox = outbox
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+        print(f" [INGEST] Started {self.concurrency} enrichment workers.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after an enqueue instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self, worker_id: int):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.outbox.claim)
+            except Exception as e:
+                print(f" [INGEST] Worker {worker_id} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                with span("ingest.job"):
+                    result = await self.process(job)
+                await asyncio.to_thread(self.outbox.complete, job["id"], result)
+                jobs_finished.inc(outcome="done")
+            except asyncio.CancelledError:
+                # Lease expiry hands the job to another worker after restart
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                jobs_finished.inc(outcome="error")
+                await asyncio.to_thread(self.outbox.fail, job["id"], str(e))
+
+    async def process(self, job: dict) -> dict:
+        payload = job["payload"]
+        print(f" [INGEST] Processing job {job['id']} (attempt {job['attempts']})")
+
+        complaint_data = await build_complaint(
+            payload["text"],
+            payload.get("location"),
+            payload.get("latitude"),
+            payload.get("longitude"),
+            payload.get("user_id"),
+            image_path=payload.get("image_path"),
+            image_name=payload.get("image_name"),
+            complaint_id=job["id"],
+            timestamp=payload.get("timestamp"),
+            sheddable=False,
+        )
+        created = await complaints_repo.insert_complaint_once(complaint_data)
+        if not created:
+            raise RuntimeError("Failed to create complaint record")
+
+        await publish_new_complaint(created)
+
+        image_path = payload.get("image_path")
+        if image_path and os.path.exists(image_path):
+            os.remove(image_path)
+        return created
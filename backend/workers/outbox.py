@@ -0,0 +1,189 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Job lifecycle: queued -> processing -> done | failed
+# A 'processing' job whose lease expired (worker crashed) is claimable again,
+# which is what makes delivery at-least-once, until it has used max_attempts.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, available_at);
+"""
+
+
+class Outbox:
+    """
+    Durable SQLite-backed job queue for complaint ingestion.
+    Each call is a short transaction; use asyncio.to_thread from async code.
+    'on_failed' is called with each job that becomes permanently failed, e.g. to
+    delete its stored upload.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 300,
+        max_attempts: int = 5,
+        on_failed: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.on_failed = on_failed
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: an accepted complaint survives a power loss, not just a process crash
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Persist a new job. Returns (job, created).
+        Re-submitting with an idempotency key that was already used returns the original job.
+        """
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, idempotency_key, payload, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, idempotency_key, json.dumps(payload), now, now, now),
+                )
+                created = True
+            except sqlite3.IntegrityError:
+                row = self._conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                job_id = row["id"]
+                created = False
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row), created
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest runnable job, or return None if the queue is idle.
+        An expired lease on the last attempt means the job keeps killing its worker
+        (crash, OOM) before fail() can run; it is marked failed instead of re-leased.
+        """
+        now = time.time()
+        job = None
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                exhausted = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'processing' AND lease_until < ? AND attempts >= ?",
+                    (now, self.max_attempts),
+                ).fetchall()
+                for expired in exhausted:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                        (f"Lease expired on attempt {expired['attempts']}; the worker died while processing it", now, expired["id"]),
+                    )
+                row = self._conn.execute(
+                    "SELECT id FROM jobs "
+                    "WHERE (status = 'queued' AND available_at <= ?) "
+                    "   OR (status = 'processing' AND lease_until < ? AND attempts < ?) "
+                    "ORDER BY available_at LIMIT 1",
+                    (now, now, self.max_attempts),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'processing', attempts = attempts + 1, "
+                        "lease_until = ?, updated_at = ? WHERE id = ?",
+                        (now + self.lease_seconds, now, row["id"]),
+                    )
+                    job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._failed([self._to_dict(expired) for expired in exhausted])
+        return self._to_dict(job) if job else None
+
+    def _failed(self, jobs: List[Dict[str, Any]]):
+        if self.on_failed is None:
+            return
+        for job in jobs:
+            try:
+                self.on_failed(job)
+            except Exception as e:
+                print(f" [INGEST] Cleanup of failed job {job['id']} failed: {e}")
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (json.dumps(result, default=str), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str):
+        """Record a failed attempt; retry with exponential backoff until max_attempts."""
+        now = time.time()
+        failed = []
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            if row["attempts"] >= self.max_attempts:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (error, now, job_id),
+                )
+                failed.append(self._to_dict(row))
+            else:
+                backoff = min(2 ** row["attempts"], 300)
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, lease_until = NULL, "
+                    "available_at = ?, updated_at = ? WHERE id = ?",
+                    (error, now + backoff, now, job_id),
+                )
+        self._failed(failed)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def depth(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Drop finished jobs once clients no longer need to poll them."""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
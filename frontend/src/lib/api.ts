@@ -0,0 +1,69 @@
+import { API_BASE_URL } from "../config";
+
+export interface ComplaintPage<T> {
+    items: T[];
+    /** Cursor for the next page, or null on the last one */
+    nextCursor: string | null;
+}
+
+export interface ComplaintQuery {
+    limit?: number;
+    after?: string | null;
+    fields?: string[];
+    department?: string;
+    urgency?: string;
+    status?: string;
+}
+
+function authHeaders(): HeadersInit {
+    return { "Authorization": `Bearer ${localStorage.getItem("token")}` };
+}
+
+/**
+ * Fetches one page of complaints visible to the current user, newest first.
+ * Pass the returned nextCursor as 'after' to load the following page on demand.
+ * @param query - Page size, cursor, column projection and server-side filters
+ * @returns The page and the cursor of the next one
+ */
+export async function fetchComplaintsPage<T>(query: ComplaintQuery = {}): Promise<ComplaintPage<T>> {
+    const params = new URLSearchParams({ limit: String(query.limit ?? 50) });
+    if (query.after) params.set("after", query.after);
+    if (query.fields) params.set("fields", query.fields.join(","));
+    for (const key of ["department", "urgency", "status"] as const) {
+        if (query[key]) params.set(key, query[key] as string);
+    }
+    const response = await fetch(`${API_BASE_URL}/complaints/?${params}`, { headers: authHeaders() });
+    if (!response.ok) throw new Error("Failed to fetch complaints");
+    return {
+        items: await response.json(),
+        nextCursor: response.headers.get("X-Next-Cursor"),
+    };
+}
+
+/**
+ * Fetches a pre-aggregated analytics endpoint (admin only).
+ * @param path - Endpoint under /complaints/analytics, e.g. "breakdown"
+ * @param params - Query parameters such as dimension, since or status
+ */
+export async function fetchAnalytics<T>(path: string, params: Record<string, string> = {}): Promise<T> {
+    const query = new URLSearchParams(params);
+    const response = await fetch(`${API_BASE_URL}/complaints/analytics/${path}?${query}`, { headers: authHeaders() });
+    if (!response.ok) throw new Error(`Failed to fetch analytics/${path}`);
+    return response.json();
+}
+
+/**
+ * Merges complaints from a real-time event into local state by id.
+ * Known rows are patched in place (events may carry only the changed columns);
+ * unknown ones are prepended when 'insertMissing' is set, so lists stay newest first.
+ */
+export function mergeComplaints<T extends { id: string }>(current: T[], incoming: Partial<T>[], insertMissing: boolean): T[] {
+    const byId = new Map(incoming.filter(c => c.id).map(c => [c.id as string, c]));
+    const merged = current.map(c => {
+        const update = byId.get(c.id);
+        if (!update) return c;
+        byId.delete(c.id);
+        return { ...c, ...update };
+    });
+    return insertMissing ? [...(Array.from(byId.values()) as T[]), ...merged] : merged;
+}
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useLocalization } from '../context/LocalizationContext';
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
@@ -24,6 +24,7 @@ import {
 import { motion } from "framer-motion";
 import { CategoryPieChart, ResolutionTrendChart } from '@/components/DashboardCharts';
 import GeospatialHeatmap from '@/components/Heatmap';
+import { fetchAnalytics, fetchComplaintsPage, mergeComplaints } from "@/lib/api";
 import { API_BASE_URL, WS_BASE_URL } from '../config';
 
 interface Complaint {
@@ -35,12 +36,31 @@ interface Complaint {
     status: string;
     timestamp: string;
     ward?: string;
+    latitude?: number;
+    longitude?: number;
     duplicate_count?: number;
     rejection_reason?: string;
     resolution_note?: string;
     resolution_image_url?: string;
 }
 
+interface Analytics {
+    status: Record<string, number>;
+    urgency: Record<string, number>;
+    category: { name: string; value: number }[];
+    trend: { date: string; resolved: number; total: number }[];
+}
+
+// Rows per "Load more"; the service log never downloads the whole table
+const PAGE_SIZE = 50;
+// Columns the service log and heatmap render
+const LIST_FIELDS = [
+    "id", "text", "category", "urgency", "department", "status", "timestamp", "ward",
+    "latitude", "longitude", "duplicate_count", "rejection_reason", "resolution_note", "resolution_image_url",
+];
+// Real-time events patch the list directly; the aggregate cards refresh at most this often
+const ANALYTICS_REFRESH_MS = 10000;
+
 export default function AdminDashboard() {
     const { t } = useLocalization();
     const [complaints, setComplaints] = useState<Complaint[]>([]);
@@ -59,20 +79,10 @@ export default function AdminDashboard() {
         }
     }, [userRole, userDept]);
 
-    const trendData = [
-        { date: 'Mon', resolved: 10, total: 15 },
-        { date: 'Tue', resolved: 12, total: 18 },
-        { date: 'Wed', resolved: 15, total: 20 },
-        { date: 'Thu', resolved: 18, total: 24 },
-        { date: 'Fri', resolved: 22, total: 28 },
-    ];
-
-    const categoryData = [
-        { name: 'Roads', value: 400 },
-        { name: 'Waste', value: 300 },
-        { name: 'Safety', value: 200 },
-        { name: 'Water', value: 100 },
-    ];
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [analytics, setAnalytics] = useState<Analytics | null>(null);
+    const analyticsTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
 
     useEffect(() => {
         fetchComplaints();
@@ -80,28 +90,96 @@ export default function AdminDashboard() {
         const socket = new WebSocket(`${WS_BASE_URL}/ws/admin`);
         socket.onmessage = (event) => {
             const update = JSON.parse(event.data);
-            if (update.type === 'NEW_COMPLAINT') {
-                fetchComplaints();
+            // Officers only list their own department, as the API does; reassigned complaints leave it
+            const visible = (c: Complaint) => userRole !== 'officer' || !userDept || c.department?.toLowerCase() === userDept.toLowerCase();
+            // Events carry the complaint record, so local state is patched instead of re-fetched
+            switch (update.type) {
+                case 'NEW_COMPLAINT':
+                    setComplaints(prev => mergeComplaints(prev, [update.data].filter(visible), true));
+                    break;
+                case 'NEW_COMPLAINTS_BULK':
+                    setComplaints(prev => mergeComplaints(prev, update.data.complaints.filter(visible), true));
+                    break;
+                case 'COMPLAINT_UPDATED':
+                    setComplaints(prev => mergeComplaints(prev, [update.data], false).filter(visible));
+                    break;
+                case 'COMPLAINTS_UPDATED_BULK':
+                    setComplaints(prev => mergeComplaints(prev, update.data.complaints, false).filter(visible));
+                    break;
+                default:
+                    return;
             }
+            scheduleAnalytics();
+        };
+        return () => {
+            socket.close();
+            if (analyticsTimer.current) clearTimeout(analyticsTimer.current);
         };
-        return () => socket.close();
     }, []);
 
     const fetchComplaints = async () => {
         try {
-            const response = await fetch(`${API_BASE_URL}/complaints/`, {
-                headers: {
-                    "Authorization": `Bearer ${localStorage.getItem("token")}`
-                }
-            });
-            if (!response.ok) throw new Error("Failed to fetch complaints");
-            const data = await response.json();
-            setComplaints(data);
+            const page = await fetchComplaintsPage<Complaint>({ limit: PAGE_SIZE, fields: LIST_FIELDS });
+            setComplaints(page.items);
+            setNextCursor(page.nextCursor);
         } catch (err: any) {
             console.error(err);
         } finally {
             setLoading(false);
         }
+        loadAnalytics();
+    };
+
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await fetchComplaintsPage<Complaint>({ limit: PAGE_SIZE, fields: LIST_FIELDS, after: nextCursor });
+            setComplaints(prev => {
+                const known = new Set(prev.map(c => c.id));
+                return [...prev, ...page.items.filter(c => !known.has(c.id))];
+            });
+            setNextCursor(page.nextCursor);
+        } catch (err: any) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    const loadAnalytics = async () => {
+        const since = new Date(Date.now() - 6 * 86400000).toISOString().slice(0, 10);
+        try {
+            const [status, urgency, category, total, resolved] = await Promise.all([
+                fetchAnalytics<{ status: string; count: number }[]>("breakdown", { dimension: "status" }),
+                fetchAnalytics<{ urgency: string; count: number }[]>("breakdown", { dimension: "urgency" }),
+                fetchAnalytics<{ category: string; count: number }[]>("breakdown", { dimension: "category" }),
+                fetchAnalytics<{ day: string; count: number }[]>("timeseries", { since }),
+                fetchAnalytics<{ day: string; count: number }[]>("timeseries", { since, status: "resolved" }),
+            ]);
+            const resolvedByDay = new Map(resolved.map(r => [r.day, r.count]));
+            setAnalytics({
+                status: Object.fromEntries(status.map(r => [r.status, r.count])),
+                urgency: Object.fromEntries(urgency.map(r => [r.urgency, r.count])),
+                category: category.map(r => ({ name: r.category, value: r.count })),
+                trend: total.map(r => ({
+                    date: new Date(`${r.day}T00:00`).toLocaleDateString(undefined, { weekday: 'short' }),
+                    resolved: resolvedByDay.get(r.day) ?? 0,
+                    total: r.count,
+                })),
+            });
+        } catch (err) {
+            // Analytics are admin-only; officers see counts of the loaded rows instead
+            console.error(err);
+        }
+    };
+
+    const scheduleAnalytics = () => {
+        if (analyticsTimer.current) return;
+        analyticsTimer.current = setTimeout(() => {
+            analyticsTimer.current = null;
+            loadAnalytics();
+        }, ANALYTICS_REFRESH_MS);
     };
 
     const handleUpdateStatus = async (id: string, newStatus: string) => {
@@ -132,7 +210,9 @@ export default function AdminDashboard() {
                 })
             });
             if (res.ok) {
-                fetchComplaints();
+                const updated: Complaint = await res.json();
+                setComplaints(prev => mergeComplaints(prev, [updated], false));
+                scheduleAnalytics();
             } else {
                 const errData = await res.json();
                 console.error("Status Update Failed:", errData);
@@ -155,7 +235,13 @@ export default function AdminDashboard() {
         }
     };
 
-    const stats = {
+    const statusTotal = analytics ? Object.values(analytics.status).reduce((sum, count) => sum + count, 0) : 0;
+    const stats = analytics ? {
+        total: statusTotal,
+        pending: statusTotal - (analytics.status.resolved ?? 0),
+        urgent: analytics.urgency.critical ?? 0,
+        resolved: analytics.status.resolved ?? 0
+    } : {
         total: complaints.length,
         pending: complaints.filter(c => c.status !== 'resolved').length,
         urgent: complaints.filter(c => c.urgency === 'critical').length,
@@ -304,7 +390,7 @@ export default function AdminDashboard() {
                             </div>
                         </div>
                         <div className="h-[350px]">
-                            <ResolutionTrendChart data={trendData} />
+                            <ResolutionTrendChart data={analytics?.trend ?? []} />
                         </div>
                     </motion.div>
 
@@ -318,7 +404,7 @@ export default function AdminDashboard() {
                             <p className="text-xs text-zinc-500 font-medium">Neural distribution across municipal zones.</p>
                         </div>
                         <div className="h-[250px]">
-                            <CategoryPieChart data={categoryData} />
+                            <CategoryPieChart data={analytics?.category ?? []} />
                         </div>
                     </motion.div>
 
@@ -407,6 +493,22 @@ export default function AdminDashboard() {
                                         </div>
                                     </motion.div>
                                 ))}
+                                {nextCursor && (
+                                    <div className="p-8 flex justify-center">
+                                        <Button
+                                            onClick={loadMore}
+                                            disabled={loadingMore}
+                                            variant="ghost"
+                                            className="h-12 rounded-xl px-8 text-[10px] font-black uppercase tracking-widest hover:bg-muted border border-border text-primary"
+                                        >
+                                            {loadingMore ? (
+                                                <span className="flex items-center gap-3">
+                                                    <Loader2 className="w-4 h-4 animate-spin" /> Loading...
+                                                </span>
+                                            ) : "Load More Reports"}
+                                        </Button>
+                                    </div>
+                                )}
                             </div>
                         </div>
 
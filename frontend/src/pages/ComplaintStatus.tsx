@@ -4,7 +4,7 @@ import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
 import { Loader2, Activity, Shield, CheckCircle2, Clock } from "lucide-react";
 import { motion, AnimatePresence } from "framer-motion";
-import { API_BASE_URL } from '../config';
+import { fetchComplaintsPage } from "@/lib/api";
 
 interface Complaint {
     id: string;
@@ -25,6 +25,8 @@ export default function ComplaintStatus() {
     const { } = useLocalization();
     const [complaints, setComplaints] = useState<Complaint[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchComplaints();
@@ -32,14 +34,9 @@ export default function ComplaintStatus() {
 
     const fetchComplaints = async () => {
         try {
-            const response = await fetch(`${API_BASE_URL}/complaints/`, {
-                headers: {
-                    "Authorization": `Bearer ${localStorage.getItem("token")}`
-                }
-            });
-            if (!response.ok) throw new Error("Failed to fetch complaints");
-            const data = await response.json();
-            setComplaints(data);
+            const page = await fetchComplaintsPage<Complaint>();
+            setComplaints(page.items);
+            setNextCursor(page.nextCursor);
         } catch (err: any) {
             console.error(err.message);
         } finally {
@@ -47,6 +44,20 @@ export default function ComplaintStatus() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await fetchComplaintsPage<Complaint>({ after: nextCursor });
+            setComplaints(prev => [...prev, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (err: any) {
+            console.error(err.message);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) {
         return (
             <div className="flex flex-col items-center justify-center min-h-screen bg-background gap-4">
@@ -173,6 +184,18 @@ export default function ComplaintStatus() {
                             ))}
                         </AnimatePresence>
                     )}
+                    {nextCursor && (
+                        <div className="flex justify-center">
+                            <Button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                variant="outline"
+                                className="h-12 rounded-2xl px-8 text-[10px] font-black uppercase tracking-widest text-primary"
+                            >
+                                {loadingMore ? <Loader2 className="w-4 h-4 animate-spin" /> : "Load Older Reports"}
+                            </Button>
+                        </div>
+                    )}
                 </div>
             </div>
         </div >